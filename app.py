@@ -1,11 +1,9 @@
 # app.py
 import streamlit as st # Streamlit import
 import time
-import json
 import pandas as pd
 import plotly.express as px
 from streamlit_agraph import agraph, Node, Edge, Config
-import pickle
 import os
 from datetime import datetime
 from dotenv import load_dotenv
@@ -22,35 +20,43 @@ st.set_page_config(
 )
 
 # Import your fact checker components (after load_dotenv and page_config)
+_import_start = time.perf_counter()
 from fact_checker import FactChecker
+FACT_CHECKER_IMPORT_TIME = time.perf_counter() - _import_start
+from history_store import HistoryStore
+from result_view import build_result_view, EVIDENCE_COLUMNS, SPAN_COLUMNS
+
+HISTORY_PAGE_SIZE = 20
+
+# Widgets inside a fragment rerun only that fragment, so paging the history or working in one
+# result tab doesn't redraw the rest of the page (st.fragment needs Streamlit 1.37; older
+# versions fall back to experimental_fragment, or to plain full-page reruns)
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
 
 # Initialize session state for history (Now after set_page_config)
-if 'history' not in st.session_state:
-    st.session_state.history = []
-if 'selected_history' not in st.session_state:
-    st.session_state.selected_history = None
-
-# Load existing history if available
-history_file = "fact_check_history.pkl"
-if os.path.exists(history_file):
-    if not st.session_state.history: # Load only if session history is empty
-        try:
-            with open(history_file, 'rb') as f:
-                st.session_state.history = pickle.load(f)
-        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError) as e: # Added more specific exceptions
-            st.session_state.history = [] # Start fresh if unpickling fails
-            if os.path.exists(history_file): # Remove corrupted file
-                 try:
-                     os.remove(history_file)
-                     st.warning(f"Corrupted history file ({history_file}) found and removed. Starting with a fresh history. Error: {e}")
-                 except Exception as remove_err:
-                     st.error(f"Could not remove corrupted history file {history_file}. Error: {remove_err}")
+if 'active_result' not in st.session_state:
+    st.session_state.active_result = None # Result shown in the main panel, with its precomputed "view"
+if 'history_page' not in st.session_state:
+    st.session_state.history_page = 0
+
+# Past checks live in one SQLite store shared by all sessions; a session only reads the
+# summaries of the page it shows, and a full result when it is opened
+@st.cache_resource
+def get_history_store():
+    return HistoryStore()
+
+history_store = get_history_store()
 
 
 # Initialize the fact checker (using st.cache_resource, now after set_page_config)
 @st.cache_resource
 def get_fact_checker_instance():
-    return FactChecker()
+    # Cheap: heavy components load lazily. KB_INDEX_BACKEND=numpy selects the in-process vector index.
+    fact_checker = FactChecker(kb_index_backend=os.getenv("KB_INDEX_BACKEND", "chroma"), trace_log=os.getenv("TRACE_LOG"))
+    if os.getenv("METRICS_PORT"): # Prometheus scrape endpoint for the per-stage metrics
+        fact_checker.trace_metrics.serve(int(os.getenv("METRICS_PORT")))
+    fact_checker.warmup(background=True) # Start loading models without blocking the first page render
+    return fact_checker
 
 fact_checker = get_fact_checker_instance()
 
@@ -88,123 +94,168 @@ st.markdown("""
 
 
 # --- Helper Functions for Visualization ---
-def extract_entities_from_analysis(analysis_text):
-    try:
-        if "Key Entities:" in analysis_text:
-            # Ensure we split correctly even if "Facts to Check:" is missing
-            parts = analysis_text.split("Key Entities:", 1)
-            if len(parts) > 1:
-                entities_section = parts[1].split("Facts to Check:")[0] # Take section before "Facts to Check:"
-                entities = [e.strip() for e in entities_section.splitlines() if e.strip() and not e.strip().startswith("- ") and not e.strip().lower().startswith("facts to check")]
-                # Further refine by splitting by comma if entities are on one line
-                refined_entities = []
-                for entity_line in entities:
-                    refined_entities.extend([e.strip() for e in entity_line.split(',') if e.strip()])
-                return [e for e in refined_entities if e][:5] # Limit for viz
-        return []
-    except Exception as e:
-        # st.warning(f"Error extracting entities: {e}")
-        return []
-
-def extract_evidence_snippets_from_combined(combined_evidence, max_snippets=3):
-    snippets = []
-    if not combined_evidence or not isinstance(combined_evidence, str):
-        return snippets
-    query_blocks = combined_evidence.split("Query:")[1:]
-    for block in query_blocks:
-        if "Result:" in block:
-            query_part, result_part = block.split("Result:", 1)
-            query_text = query_part.strip()
-            result_summary = "\n".join(result_part.strip().splitlines()[:3]) # First 3 lines of result
-            snippets.append(f"Q: {query_text[:30].strip()}...\nA: {result_summary[:70].strip()}...")
-            if len(snippets) >= max_snippets:
-                break
-    return snippets
-
-
-def create_reasoning_visualization(claim_text, analysis_text, combined_evidence, verdict_data):
-    nodes = []
-    edges = []
-
-    claim_node_id = "claim_node"
-    nodes.append(Node(id=claim_node_id, label=f"Claim: {claim_text[:50]}...", size=20, color="#FF6347")) # Tomato Red
-
-    entities = extract_entities_from_analysis(analysis_text)
-    for i, entity in enumerate(entities):
-        entity_id = f"entity_{i}"
-        nodes.append(Node(id=entity_id, label=f"Entity: {entity}", size=15, color="#4682B4")) # Steel Blue
-        edges.append(Edge(source=claim_node_id, target=entity_id, label="mentions", length=150))
-
-    evidence_snippets = extract_evidence_snippets_from_combined(combined_evidence)
-    evidence_node_ids = []
-    for i, snippet in enumerate(evidence_snippets):
-        evidence_id = f"evidence_{i}"
-        evidence_node_ids.append(evidence_id)
-        nodes.append(Node(id=evidence_id, label=snippet, size=18, color="#3CB371", shape="box")) # Medium Sea Green
-        edges.append(Edge(source=claim_node_id, target=evidence_id, label="checked by", length=200))
-
-    verdict_text = verdict_data.get("verdict", "N/A") if isinstance(verdict_data, dict) else "N/A"
-    verdict_color_map = {
-        "true": "#2E8B57", "false": "#DC143C",
-        "partially true": "#FFD700", "unverifiable": "#808080", "error": "#A9A9A9"
-    }
-    verdict_node_color = verdict_color_map.get(verdict_text.lower(), "#D3D3D3") # Default color
-    verdict_node_id = "verdict_node"
-    nodes.append(Node(id=verdict_node_id, label=f"Verdict: {verdict_text}", size=25, color=verdict_node_color))
-
-    for ev_id in evidence_node_ids:
-        edges.append(Edge(source=ev_id, target=verdict_node_id, label="informs", length=150))
-
-    confidence = verdict_data.get("confidence_score", 0) if isinstance(verdict_data, dict) else 0
-    confidence_node_id = "confidence_node"
-    nodes.append(Node(id=confidence_node_id, label=f"Confidence: {confidence}%", size=15, color="#BA55D3")) # Medium Orchid
-    edges.append(Edge(source=verdict_node_id, target=confidence_node_id, label="has score", length=100))
-
+def render_reasoning_graph(graph):
+    # The nodes and edges were worked out when the result was produced (see result_view.py)
     config = Config(width=700, height=450, directed=True, physics=True, hierarchical=False,
                     node={'font': {'size': 10, 'strokeWidth':0, 'strokeColor':'#fff'}}, # Smaller font
                     edge={'font': {'size': 8}},
                     minVelocity=0.75)
     try:
-        return agraph(nodes=nodes, edges=edges, config=config)
+        return agraph(nodes=[Node(**node) for node in graph["nodes"]], edges=[Edge(**edge) for edge in graph["edges"]], config=config)
     except Exception as e:
         st.error(f"Failed to generate reasoning graph: {e}")
         return None
 
-# --- Sidebar ---
-with st.sidebar:
-    st.header("📜 Fact Check History")
-    if st.session_state.history:
-        if st.button("Clear All History", type="secondary", key="clear_history_btn"):
-            st.session_state.history = []
-            st.session_state.selected_history = None
-            if os.path.exists(history_file):
-                try:
-                    os.remove(history_file)
-                except Exception as e:
-                    st.error(f"Could not delete history file: {e}")
-            st.rerun()
-
-        # Display history items
-        for i, item in enumerate(reversed(st.session_state.history)): # Show newest first
-            claim_display = item.get("claim", "Unknown Claim")[:30] + "..."
-            verdict_val = "N/A"
-            if isinstance(item.get("verdict"), dict): # Make sure verdict is a dict
-                verdict_val = item["verdict"].get("verdict", "N/A")
-            
-            button_label = f"{claim_display} ({verdict_val})"
-            if st.button(button_label, key=f"history_{i}"):
-                st.session_state.selected_history = item
-                # No rerun here; main panel will check st.session_state.selected_history
+
+def show_result(result):
+    # Results saved before view models existed get one built when they are opened
+    if "view" not in result:
+        result = dict(result, view=build_result_view(result))
+    st.session_state.active_result = result
+
+
+def next_history_page(step):
+    st.session_state.history_page += step
+
+
+def clear_history():
+    history_store.clear()
+    st.session_state.history_page = 0
+
+
+@fragment
+def render_history():
+    history_search = st.text_input("Search past claims", key="history_search")
+    if history_search != st.session_state.get("history_last_search"): # New search starts at the first page
+        st.session_state.history_last_search = history_search
+        st.session_state.history_page = 0
+    history_total = history_store.count(history_search)
+    if history_total:
+        if not history_search:
+            st.button("Clear All History", type="secondary", key="clear_history_btn", on_click=clear_history)
+
+        page_count = (history_total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+        st.session_state.history_page = min(st.session_state.history_page, page_count - 1)
+        first = st.session_state.history_page * HISTORY_PAGE_SIZE
+        # Display history items (newest first)
+        for item in history_store.page(first, HISTORY_PAGE_SIZE, history_search, claim_chars=30):
+            claim_display = item["claim"] + "..."
+            button_label = f"{claim_display} ({item['verdict'] or 'N/A'})"
+            checked_at = datetime.fromtimestamp(item["created_at"]).strftime("%Y-%m-%d %H:%M")
+            if st.button(button_label, key=f"history_{item['id']}", help=checked_at):
+                selected = history_store.get(item["id"]) # None if the history was cleared meanwhile
+                if selected:
+                    show_result(selected)
+                    st.rerun() # The main panel lives outside this fragment
+
+        st.caption(f"{first + 1}–{min(first + HISTORY_PAGE_SIZE, history_total)} of {history_total}")
+        if page_count > 1:
+            previous_column, next_column = st.columns(2)
+            previous_column.button("◀ Newer", disabled=st.session_state.history_page == 0, key="history_newer",
+                                   on_click=next_history_page, args=(-1,))
+            next_column.button("Older ▶", disabled=st.session_state.history_page >= page_count - 1, key="history_older",
+                               on_click=next_history_page, args=(1,))
+    elif history_search:
+        st.info("No past checks match this search.")
     else:
         st.info("No previous fact checks.")
 
-# --- Main Content Area ---
-active_result = None # To store either selected history or new result
 
-if st.session_state.get('selected_history'):
-    active_result = st.session_state.selected_history
-    st.session_state.selected_history = None # Clear after processing to avoid re-display on simple interactions
+# --- Result tabs: each is a fragment drawn from the stored view model ---
+@fragment
+def render_explanation_tab(view):
+    verdict_data = view["verdict"]
+    st.subheader("Explanation of Verdict")
+    st.markdown(f"**Confidence Reasoning:** {verdict_data.get('confidence_reasoning', 'N/A')}")
+    st.markdown(f"{verdict_data.get('explanation', 'No explanation provided.')}")
+
+    cols = st.columns(2)
+    with cols[0]:
+        st.subheader("Key Evidence Points")
+        key_ev = verdict_data.get("key_evidence_points", [])
+        if key_ev and isinstance(key_ev, list):
+            for item in key_ev: st.markdown(f"- {item}")
+        else: st.info("No key evidence listed.")
+
+    with cols[1]:
+        st.subheader("Supporting Sources")
+        sources = verdict_data.get("supporting_sources_domains", [])
+        if sources and isinstance(sources, list):
+            for src in sources: st.markdown(f"- {src}")
+        else: st.info("No supporting sources listed.")
+
+    contr_ev = verdict_data.get("contradicting_evidence_points", [])
+    if contr_ev and isinstance(contr_ev, list) and (len(contr_ev) > 1 or (len(contr_ev) == 1 and contr_ev[0] != 'No significant contradicting evidence found.')):
+        st.subheader("Contradicting Evidence")
+        for item in contr_ev: st.markdown(f"- {item}")
+
+
+@fragment
+def render_evidence_tab(view, evidence_budget, retrieval, key_suffix):
+    st.subheader("Claim Analysis")
+    st.text_area("LLM Analysis Output", value=view["analysis"], height=200, disabled=True, key=f"analysis_text_{key_suffix}")
+    st.subheader("Collected Evidence Snippets")
+    if view["evidence_rows"]:
+        st.dataframe(pd.DataFrame(view["evidence_rows"])[EVIDENCE_COLUMNS], use_container_width=True, hide_index=True)
+    st.text_area("Raw Evidence Data", value=view["evidence_text"], height=300, disabled=True, key=f"evidence_text_{key_suffix}")
+    if evidence_budget:
+        st.caption(
+            f"The verdict prompt used {evidence_budget['selected']} of {evidence_budget['candidates']} results "
+            f"(~{evidence_budget['tokens_used']} of {evidence_budget['token_budget']} tokens), ranked by relevance to the claim."
+        )
+        if evidence_budget["dropped"]:
+            with st.expander(f"Left out of the verdict prompt ({len(evidence_budget['dropped'])})"):
+                st.dataframe(pd.DataFrame(evidence_budget["dropped"]), use_container_width=True, hide_index=True)
+    if retrieval:
+        stop_reasons = {"covered": "every fact to check was covered", "max_queries": "the query limit was reached",
+                        "no_queries": "no new queries were left for the uncovered facts"}
+        st.caption(f"Searched {len(retrieval['queries'])} queries in {retrieval['rounds']} round(s); stopped because "
+                   f"{stop_reasons.get(retrieval['stop_reason'], retrieval['stop_reason'])}.")
+        with st.expander("Coverage of the facts to check"):
+            st.dataframe(pd.DataFrame(retrieval["coverage"]), use_container_width=True, hide_index=True)
+
+
+@fragment
+def render_reasoning_tab(view):
+    st.subheader("Visualized Reasoning Network")
+    if view["graph"]:
+        render_reasoning_graph(view["graph"]) # agraph renders itself
+    else:
+        st.info("Insufficient data to generate reasoning graph.")
+
+
+@fragment
+def render_timing_tab(view):
+    st.subheader("Where the Time Went")
+    if view["spans"]:
+        spans_df = pd.DataFrame(view["spans"])
+        # Waterfall: each bar starts at the span's offset into the check
+        waterfall = px.bar(
+            spans_df, x="duration", y="label", base="start", orientation="h", color="name",
+            hover_data=["cache", "llm_calls", "prompt_tokens", "response_tokens", "error"],
+            labels={"duration": "seconds", "label": ""}
+        )
+        waterfall.update_yaxes(autorange="reversed")
+        waterfall.update_layout(showlegend=False, height=120 + 28 * len(spans_df))
+        st.plotly_chart(waterfall, use_container_width=True)
+        st.caption(f"Total {view['trace_duration']:.2f}s. Token counts are estimated when the model does not report usage.")
+        st.dataframe(spans_df[SPAN_COLUMNS], use_container_width=True, hide_index=True)
+    else:
+        st.info("No timing trace recorded for this result.")
+
+# --- Sidebar ---
+with st.sidebar:
+    if fact_checker.warmup_error:
+        st.error(f"Model warm-up failed: {fact_checker.warmup_error}")
+    elif not fact_checker.ready.is_set():
+        st.caption("⏳ Models are still loading in the background. Previously checked claims are answered immediately.")
+    with st.expander("Startup timings"):
+        st.text(f"Import of fact_checker: {FACT_CHECKER_IMPORT_TIME * 1000:.1f} ms\n" + fact_checker.startup_report())
+
+    st.header("📜 Fact Check History")
+    render_history()
 
+# --- Main Content Area ---
 # Input form for new claims (always visible)
 st.markdown("---") # Visual separator
 st.header("🔍 Fact Check a New Claim")
@@ -213,24 +264,72 @@ with st.form("fact_check_form"):
     submit_button_main = st.form_submit_button("✨ Verify Claim")
 
 if submit_button_main and claim_input_main:
-    with st.spinner("🕵️‍♀️ Fact-checking in progress... This might take a moment."):
+    # Stages, the analysis, the evidence count and the verdict are shown as they arrive
+    stage_labels = {
+        "analysis": "Analyzing the claim",
+        "search": "Searching the web",
+        "ranking": "Ranking evidence",
+        "sources": "Rating sources",
+        "knowledge_base": "Checking the knowledge base",
+        "verdict": "Writing the verdict",
+    }
+    with st.status("🕵️‍♀️ Fact-checking in progress...", expanded=True) as progress:
         start_time = time.time()
-        current_result_data = fact_checker.process_claim(claim_input_main)
+        current_result_data = None
+        verdict_placeholder = st.empty()
+        explanation_placeholder = st.empty()
+        streamed_verdict = {}
+        explanation_so_far = ""
+        try:
+            for event in fact_checker.stream_claim(claim_input_main):
+                if event["type"] == "stage":
+                    label = stage_labels.get(event["stage"], event["stage"])
+                    if event["status"] == "started":
+                        progress.update(label=f"🕵️‍♀️ {label}...")
+                    else:
+                        st.write(f"✅ {label} ({event['elapsed']:.1f}s)")
+                elif event["type"] == "analysis":
+                    with st.expander("Claim analysis", expanded=False):
+                        st.text(event["analysis"])
+                elif event["type"] == "evidence":
+                    budget = event.get("evidence_budget")
+                    kept = f", {budget['selected']} used for the verdict" if budget else ""
+                    retrieval = event.get("retrieval")
+                    searched = f" from {len(retrieval['queries'])} queries" if retrieval else ""
+                    st.write(f"Collected {len(event['evidence'])} search results{searched}{kept}.")
+                elif event["type"] == "field" and event["name"] in ("verdict", "confidence_score"):
+                    streamed_verdict[event["name"]] = event["value"]
+                    verdict_placeholder.markdown(
+                        f"**Verdict:** {streamed_verdict.get('verdict', '…')} &nbsp;·&nbsp; "
+                        f"**Confidence:** {streamed_verdict.get('confidence_score', '…')}/100"
+                    )
+                elif event["type"] == "field_delta" and event["name"] == "explanation":
+                    explanation_so_far += event["text"]
+                    explanation_placeholder.markdown(explanation_so_far)
+                elif event["type"] == "result":
+                    current_result_data = dict(event["result"])
+            if current_result_data is None:
+                raise RuntimeError("the pipeline ended without a result")
+        except Exception as e:
+            st.error(f"Fact check failed: {e}")
         processing_time = time.time() - start_time
+        if current_result_data is None:
+            progress.update(label="Fact check failed.", state="error", expanded=True)
+        else:
+            progress.update(label=f"Fact check complete! ({processing_time:.2f}s)", state="complete", expanded=False)
 
+    # Nothing is stamped, saved or shown for a check that raised or ended without a result
+    if current_result_data is not None:
         current_result_data['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         current_result_data['processing_time'] = processing_time
-        st.session_state.history.append(current_result_data) # Append to keep order
-        st.session_state.history = st.session_state.history[-50:] # Keep last 50
-
+        current_result_data['view'] = build_result_view(current_result_data) # Saved with the result, so it's derived only once
         try:
-            with open(history_file, 'wb') as f:
-                pickle.dump(st.session_state.history, f)
+            history_store.append(current_result_data)
+            st.session_state.history_page = 0 # The newest check heads the first page
         except Exception as e:
             st.error(f"Failed to save history: {e}")
-        
-        active_result = current_result_data # Set the new result as active for display
-        st.success(f"Fact check complete! ({processing_time:.2f}s)")
+
+        st.session_state.active_result = current_result_data # Set the new result as active for display
         # We don't rerun here immediately to allow the active_result to be displayed below.
         # The next natural interaction or a targeted rerun will refresh the sidebar.
 
@@ -239,82 +338,50 @@ elif not claim_input_main and submit_button_main:
 
 
 # Display area for the active result (either selected history or new result)
+active_result = st.session_state.active_result
 if active_result:
+    view = active_result["view"]
     with st.container(): # Use a container to group the display
         st.markdown("---") # Separator before displaying result
-        
-        claim_text = active_result.get("claim", "N/A")
-        analysis_text = active_result.get("analysis", "N/A")
-        evidence_text = active_result.get("evidence", "No evidence collected.")
-        verdict_data = active_result.get("verdict", {}) # Ensure verdict_data is a dict
-        if not isinstance(verdict_data, dict): # Handle case where verdict might be a string (e.g. error)
-            verdict_data = {"verdict": str(verdict_data), "confidence_score": 0, "explanation": "Could not parse verdict."}
 
         processing_time_display = active_result.get("processing_time", 0)
         timestamp_display = active_result.get("timestamp", "N/A")
 
-        st.caption(f"Displaying result for: \"{claim_text[:70]}...\"")
+        st.caption(f"Displaying result for: \"{view['claim'][:70]}...\"")
         st.caption(f"Fact check performed on: {timestamp_display} | Processing time: {processing_time_display:.2f}s")
+        semantic_match = active_result.get("semantic_cache_match")
+        if semantic_match:
+            st.caption(f"Served from cache: similar to \"{semantic_match['matched_claim'][:70]}\" (similarity {semantic_match['score']:.2f})")
+        kb_match = active_result.get("knowledge_base_match")
+        if active_result.get("kb_fast_path") and kb_match:
+            st.caption(f"Answered from the knowledge base without web search: matches \"{kb_match['matched_claim'][:70]}\" (similarity {kb_match['score']:.2f})")
 
         # Verdict Card
-        verdict_value = verdict_data.get("verdict", "N/A")
-        confidence_value = verdict_data.get("confidence_score", 0)
-        verdict_color_map = {"True": "#e6ffe6", "False": "#ffe6e6", "Partially True": "#fff0e6", "Unverifiable": "#f2f2f2", "Error": "#ffcccc"}
-        card_bg_color = verdict_color_map.get(verdict_value, "#e6f7ff") # Default blueish
-
         st.markdown(f"""
-        <div style="padding:15px; margin-bottom:15px; border-radius:10px; background-color:{card_bg_color}; border: 1px solid #ccc;">
-            <h2 style="color:black; margin-top:0;">Verdict: {verdict_value}</h2>
-            <h4 style="color:black;">Confidence: {confidence_value}/100</h4>
+        <div style="padding:15px; margin-bottom:15px; border-radius:10px; background-color:{view['card_color']}; border: 1px solid #ccc;">
+            <h2 style="color:black; margin-top:0;">Verdict: {view['verdict_value']}</h2>
+            <h4 style="color:black;">Confidence: {view['confidence']}/100</h4>
         </div>
         """, unsafe_allow_html=True)
 
         # Tabs for details
-        detail_tab1, detail_tab2, detail_tab3, detail_tab4 = st.tabs(["📝 Explanation", "📊 Analysis & Evidence", "🧠 Reasoning Flow", "📚 Knowledge Base Info"])
+        detail_tab1, detail_tab2, detail_tab3, detail_tab4, detail_tab5 = st.tabs(["📝 Explanation", "📊 Analysis & Evidence", "🧠 Reasoning Flow", "📚 Knowledge Base Info", "⏱️ Timing"])
 
         with detail_tab1:
-            st.subheader("Explanation of Verdict")
-            st.markdown(f"**Confidence Reasoning:** {verdict_data.get('confidence_reasoning', 'N/A')}")
-            st.markdown(f"{verdict_data.get('explanation', 'No explanation provided.')}")
-            
-            cols = st.columns(2)
-            with cols[0]:
-                st.subheader("Key Evidence Points")
-                key_ev = verdict_data.get("key_evidence_points", [])
-                if key_ev and isinstance(key_ev, list):
-                    for item in key_ev: st.markdown(f"- {item}")
-                else: st.info("No key evidence listed.")
-            
-            with cols[1]:
-                st.subheader("Supporting Sources")
-                sources = verdict_data.get("supporting_sources_domains", [])
-                if sources and isinstance(sources, list):
-                    for src in sources: st.markdown(f"- {src}")
-                else: st.info("No supporting sources listed.")
-
-            contr_ev = verdict_data.get("contradicting_evidence_points", [])
-            if contr_ev and isinstance(contr_ev, list) and (len(contr_ev) > 1 or (len(contr_ev) == 1 and contr_ev[0] != 'No significant contradicting evidence found.')):
-                st.subheader("Contradicting Evidence")
-                for item in contr_ev: st.markdown(f"- {item}")
-        
+            render_explanation_tab(view)
+
         with detail_tab2:
-            st.subheader("Claim Analysis")
-            st.text_area("LLM Analysis Output", value=analysis_text, height=200, disabled=True, key=f"analysis_text_{timestamp_display}")
-            st.subheader("Collected Evidence Snippets")
-            st.text_area("Raw Evidence Data", value=evidence_text, height=300, disabled=True, key=f"evidence_text_{timestamp_display}")
+            render_evidence_tab(view, active_result.get("evidence_budget"), active_result.get("retrieval"), timestamp_display)
 
         with detail_tab3:
-            st.subheader("Visualized Reasoning Network")
-            if claim_text and analysis_text and evidence_text and verdict_data: # Ensure data is present
-                 graph_viz = create_reasoning_visualization(claim_text, analysis_text, evidence_text, verdict_data)
-                 if graph_viz:
-                     pass # agraph renders itself if it's the last expression in the block
-            else:
-                st.info("Insufficient data to generate reasoning graph.")
+            render_reasoning_tab(view)
 
         with detail_tab4:
             st.subheader("Knowledge Base Interaction")
-            st.markdown(f"**Relevance to Verdict:** {verdict_data.get('knowledge_base_relevance', 'N/A')}")
+            st.markdown(f"**Relevance to Verdict:** {view['verdict'].get('knowledge_base_relevance', 'N/A')}")
+
+        with detail_tab5:
+            render_timing_tab(view)
 
 
 # Instructions / About section at the bottom
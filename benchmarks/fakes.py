@@ -0,0 +1,231 @@
+"""Deterministic offline stand-ins for the LLM, the search tool and the embedding model.
+
+They let the benchmarks drive FactChecker without a Google API key, network
+access or a sentence-transformer download. Responses and delays depend only on
+the input and the seed, so two runs with the same settings do the same work.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.runnables import Runnable
+
+DIM = 384 # all-MiniLM-L6-v2
+
+VERDICTS = ("True", "False", "Partially True", "Unverifiable")
+SEARCH_DOMAINS = ("www.reuters.com", "www.bbc.co.uk", "en.wikipedia.org", "www.nature.com", "data.gov",
+                  "news.example.com", "blog.example.org", "localpaper.net", "forum.example.net", "www.theonion.com")
+FILLER = ("according to officials", "in a statement released on Monday", "data published last year shows",
+          "experts say", "a spokesperson confirmed", "the report notes", "researchers found", "records indicate")
+
+def _seed(*parts):
+    return zlib.crc32("\x1f".join(str(part) for part in parts).encode("utf-8"))
+
+def _delay(base, jitter, *key):
+    # Deterministic latency in [base * (1 - jitter), base * (1 + jitter)]
+    if base <= 0:
+        return 0.0
+    return base * (1 + jitter * (2 * np.random.default_rng(_seed(*key)).random() - 1))
+
+
+class SyntheticEmbeddings:
+    # Deterministic pseudo-random unit vectors keyed by text, so rebuilds are identical
+    def __init__(self, dim=DIM):
+        self.dim = dim
+
+    def _vector(self, text):
+        return np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(self.dim, dtype=np.float32)
+
+    def embed_documents(self, texts):
+        return [self._vector(text).tolist() for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text).tolist()
+
+
+class FakeChatModel(Runnable):
+    """Stand-in for ChatGoogleGenerativeAI that answers every prompt FactChecker sends.
+
+    Recognizes the claim-analysis, source-evaluation (single and batched) and verdict
+    prompts and returns well-formed output for each. Every call sleeps `latency`
+    seconds (+/- jitter) before the first token plus `token_latency` per output token,
+    in stream() as well as invoke().
+    """
+    model = "fake-chat"
+
+    def __init__(self, latency=0.5, token_latency=0.0, jitter=0.2, seed=0):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.jitter = jitter
+        self.seed = seed
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def _identifying_params(self):
+        return {"model": self.model, "seed": self.seed} # What CachedLLM keys responses on
+
+    def _prompt_text(self, input):
+        if hasattr(input, "to_string"): # PromptValue
+            return input.to_string()
+        if isinstance(input, list):
+            return "\n".join(str(getattr(message, "content", message)) for message in input)
+        return str(input)
+
+    def _claim(self, prompt):
+        match = re.search(r"CLAIM:\s*(.+)", prompt)
+        return match.group(1).strip() if match else prompt[:80]
+
+    def _scores(self, domain):
+        rng = np.random.default_rng(_seed(self.seed, domain))
+        reliability, expertise, bias = (int(score) for score in rng.integers(2, 10, size=3))
+        return {"source_domain": domain, "reliability_score": reliability, "expertise_score": expertise, "bias_score": bias,
+                "overall_score": round((reliability + expertise + bias) / 3, 1), "reasoning": f"Synthetic assessment of {domain}."}
+
+    def respond(self, prompt):
+        if "SOURCES (JSON array" in prompt:
+            sources = re.findall(r'"id":\s*(\d+),\s*"domain":\s*"([^"]*)"', prompt)
+            return "```json\n" + json.dumps([dict(self._scores(domain), id=int(source_id)) for source_id, domain in sources]) + "\n```"
+        if "Evaluate the reliability" in prompt:
+            match = re.search(r"https?://([^/\s]+)", prompt)
+            return json.dumps(self._scores(match.group(1) if match else "unknown"))
+        if "Analyze the following claim" in prompt:
+            claim = self._claim(prompt)
+            words = [word for word in re.findall(r"\w+", claim) if len(word) > 3] or [claim]
+            return "\n".join([
+                f"Main Assertion: {claim}",
+                f"Key Entities: {', '.join(words[:3])}",
+                "Facts to Check:",
+                f"- Is it accurate that {claim.rstrip('.')}?",
+                f"- What do official sources say about {' '.join(words[:2])}?",
+                "Search Queries:",
+                f'- "{claim.rstrip(".")}"',
+                f'- "{" ".join(words[:3])} facts"',
+                f'- "{" ".join(words[-2:])} official statistics"',
+            ])
+        if "impartial fact-checker" in prompt:
+            claim = self._claim(prompt)
+            rng = np.random.default_rng(_seed(self.seed, claim))
+            verdict = VERDICTS[int(rng.integers(len(VERDICTS)))]
+            domains = sorted(set(re.findall(r"\[([a-z0-9.-]+\.[a-z]+)\]", prompt)))[:3]
+            return "```json\n" + json.dumps({
+                "verdict": verdict,
+                "confidence_score": int(rng.integers(40, 96)),
+                "confidence_reasoning": "Synthetic verdict derived from the claim text.",
+                "explanation": f"The collected evidence was weighed against the claim \"{claim}\". " + " ".join(
+                    f"Source {i + 1} {FILLER[int(rng.integers(len(FILLER)))]}." for i in range(6)),
+                "key_evidence_points": [f"Synthetic evidence point {i + 1}." for i in range(3)],
+                "supporting_sources_domains": domains,
+                "contradicting_evidence_points": ["No significant contradicting evidence found."],
+                "knowledge_base_relevance": "Synthetic run; knowledge base facts were not weighed.",
+            }, indent=2) + "\n```"
+        return "OK"
+
+    def _start(self, prompt):
+        with self._lock:
+            self.calls += 1
+        text = self.respond(prompt)
+        return text, _delay(self.latency, self.jitter, self.seed, prompt), len(text) // 4 * self.token_latency
+
+    def _chunks(self, text):
+        # Roughly four tokens per chunk, like a streaming API
+        pieces = re.findall(r"\S*\s*", text)
+        return ["".join(pieces[i:i + 4]) for i in range(0, len(pieces), 4) if "".join(pieces[i:i + 4])]
+
+    def invoke(self, input, config=None, **kwargs):
+        text, first_token, generation = self._start(self._prompt_text(input))
+        time.sleep(first_token + generation)
+        return AIMessage(content=text)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        text, first_token, generation = self._start(self._prompt_text(input))
+        await asyncio.sleep(first_token + generation)
+        return AIMessage(content=text)
+
+    def stream(self, input, config=None, **kwargs):
+        text, first_token, generation = self._start(self._prompt_text(input))
+        time.sleep(first_token)
+        chunks = self._chunks(text)
+        for chunk in chunks:
+            time.sleep(generation / len(chunks))
+            yield AIMessageChunk(content=chunk)
+
+    async def astream(self, input, config=None, **kwargs):
+        text, first_token, generation = self._start(self._prompt_text(input))
+        await asyncio.sleep(first_token)
+        chunks = self._chunks(text)
+        for chunk in chunks:
+            await asyncio.sleep(generation / len(chunks))
+            yield AIMessageChunk(content=chunk)
+
+
+class FakeSearchTool:
+    """Stand-in for DuckDuckGoSearchAPIWrapper.results(query, max_results).
+
+    Returns max_results deterministic hits spread over a fixed set of domains, after
+    `latency` seconds (+/- jitter). A share of queries (error_rate) raises instead,
+    like a rate-limited or failed search.
+    """
+    def __init__(self, latency=0.8, jitter=0.3, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def results(self, query, max_results=5):
+        with self._lock:
+            self.calls += 1
+        rng = np.random.default_rng(_seed(self.seed, query))
+        time.sleep(_delay(self.latency, self.jitter, self.seed, "search", query))
+        if rng.random() < self.error_rate:
+            raise RuntimeError(f"Simulated search failure for {query!r}")
+        words = re.findall(r"\w+", query.lower()) or ["result"]
+        hits = []
+        for i in range(max_results):
+            domain = SEARCH_DOMAINS[int(rng.integers(len(SEARCH_DOMAINS)))]
+            # Slugs come from a small vocabulary, so related queries share some URLs
+            slug = "-".join(words[int(rng.integers(len(words)))] for _ in range(2))
+            hits.append({
+                "snippet": f"{query.capitalize()}: {FILLER[int(rng.integers(len(FILLER)))]}, "
+                           f"{' '.join(words[::-1])} ({int(rng.integers(1990, 2025))}). {FILLER[int(rng.integers(len(FILLER)))]}.",
+                "title": f"{' '.join(words[:4]).title()} | {domain}",
+                "link": f"https://{domain}/{slug}-{hashlib.md5(f'{query}{i}'.encode()).hexdigest()[:6]}",
+            })
+        return hits
+
+
+SUBJECTS = ("The Eiffel Tower", "The Great Wall of China", "Mount Everest", "The Amazon river", "The city of Tokyo",
+            "The human brain", "The planet Mars", "Vitamin C", "The Pacific Ocean", "The printing press",
+            "Electric cars", "The Roman Empire", "Coffee", "The moon", "Honey bees", "The Sahara desert")
+PREDICATES = ("is visible from space", "was built in {year}", "has a population of {number} million",
+              "is taller than {number} meters", "cures the common cold", "was discovered in {year}",
+              "produces {number} percent of the world's oxygen", "is older than {number} years",
+              "causes more accidents than it prevents", "was invented by a single person")
+PARAPHRASES = ("It is true that {claim}", "Reportedly, {claim}", "{claim}, according to some sources", "Many people say {claim}")
+
+def make_claims(count, repeat_ratio=0.2, paraphrase_ratio=0.1, seed=0):
+    """Synthetic claim corpus: mostly distinct claims, plus exact repeats and paraphrases of earlier ones
+    so the verdict, semantic and knowledge-base tiers all see traffic."""
+    rng = np.random.default_rng(seed)
+    claims = []
+    for _ in range(count):
+        roll = rng.random()
+        if claims and roll < repeat_ratio:
+            claims.append(claims[int(rng.integers(len(claims)))])
+        elif claims and roll < repeat_ratio + paraphrase_ratio:
+            original = claims[int(rng.integers(len(claims)))].rstrip(".")
+            template = PARAPHRASES[int(rng.integers(len(PARAPHRASES)))]
+            claims.append(template.format(claim=original[0].lower() + original[1:]) + ".")
+        else:
+            predicate = PREDICATES[int(rng.integers(len(PREDICATES)))].format(
+                year=int(rng.integers(1000, 2020)), number=int(rng.integers(2, 900)))
+            claims.append(f"{SUBJECTS[int(rng.integers(len(SUBJECTS)))]} {predicate}.")
+    return claims
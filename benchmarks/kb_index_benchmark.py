@@ -0,0 +1,114 @@
+"""Query latency and memory of the KnowledgeBase index backends (Chroma vs. NumPy).
+
+Builds each index with synthetic 384-dimensional embeddings (the size of
+all-MiniLM-L6-v2) so no model is loaded, then measures top-k query latency and
+resident memory in a fresh process that loads the persisted index.
+
+    python -m benchmarks.kb_index_benchmark --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fakes import SyntheticEmbeddings
+
+BUILD_BATCH = 5000 # Chroma rejects very large single adds
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # Peak, in KB on Linux
+
+
+def open_index(backend, directory):
+    embeddings = SyntheticEmbeddings()
+    if backend == "numpy":
+        from numpy_index import NumpyIndex
+        return NumpyIndex(embedding_function=embeddings, persist_directory=directory)
+    from langchain_community.vectorstores import Chroma
+    return Chroma(persist_directory=directory, embedding_function=embeddings)
+
+
+def build(backend, size, directory):
+    index = open_index(backend, directory)
+    start_time = time.perf_counter()
+    for start in range(0, size, BUILD_BATCH):
+        texts = [f"Synthetic fact number {i}." for i in range(start, min(start + BUILD_BATCH, size))]
+        index.add_texts(texts, ids=[str(i) for i in range(start, start + len(texts))])
+    index.persist()
+    return {"build_seconds": time.perf_counter() - start_time}
+
+
+def query(backend, directory, queries, k):
+    rss_before = rss_mb()
+    start_time = time.perf_counter()
+    index = open_index(backend, directory)
+    index.similarity_search("warm-up query", k=k)
+    load_seconds = time.perf_counter() - start_time
+    latencies = []
+    for i in range(queries):
+        start_time = time.perf_counter()
+        index.similarity_search(f"Benchmark query {i}", k=k)
+        latencies.append((time.perf_counter() - start_time) * 1000)
+    latencies.sort()
+    return {
+        "load_seconds": load_seconds,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "mean_ms": sum(latencies) / len(latencies),
+        "rss_mb": rss_mb() - rss_before, # Includes memory-mapped pages touched by the search
+    }
+
+
+def run_phase(args, phase, backend, size, directory):
+    # Each phase runs in its own process so memory numbers aren't polluted by earlier runs
+    command = [sys.executable, "-m", "benchmarks.kb_index_benchmark", "--phase", phase, "--backend", backend,
+               "--sizes", str(size), "--directory", directory, "--queries", str(args.queries), "--k", str(args.k)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark KnowledgeBase index backends.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--backends", nargs="+", choices=["chroma", "numpy"], default=["chroma", "numpy"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--phase", choices=["build", "query"], help=argparse.SUPPRESS)
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    parser.add_argument("--directory", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase == "build":
+        print(json.dumps(build(args.backend, args.sizes[0], args.directory)))
+        return
+    if args.phase == "query":
+        print(json.dumps(query(args.backend, args.directory, args.queries, args.k)))
+        return
+
+    print(f"{'backend':<8} {'facts':>9} {'build s':>9} {'load s':>8} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'rss MB':>8}")
+    for size in args.sizes:
+        for backend in args.backends:
+            directory = tempfile.mkdtemp(prefix=f"kb_bench_{backend}_")
+            try:
+                result = run_phase(args, "build", backend, size, directory)
+                result.update(run_phase(args, "query", backend, size, directory))
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+            print(f"{backend:<8} {size:>9} {result['build_seconds']:>9.1f} {result['load_seconds']:>8.2f} {result['p50_ms']:>8.2f} "
+                  f"{result['p95_ms']:>8.2f} {result['mean_ms']:>8.2f} {result['rss_mb']:>8.1f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Micro-benchmarks for the hot helpers on the request path.
+
+    cache        CacheManager search/verdict/LLM get and set, and the semantic verdict lookup
+    kb_query     KnowledgeBase.query_knowledge_base over a store of synthetic facts
+    domain       SourceEvaluator.extract_domain over a mix of URLs
+
+Everything runs in a temporary directory with synthetic embeddings and the fake
+LLM, so results are comparable run over run on the same machine:
+
+    python -m benchmarks.micro_benchmark --output micro.json
+    python -m benchmarks.micro_benchmark --baseline micro.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.reporting import compare_with_baseline, latency_summary, save_results
+
+BENCHMARKS = ("cache", "kb_query", "domain")
+URL_SAMPLES = ("https://www.bbc.co.uk/news/world-123", "https://en.wikipedia.org/wiki/Mount_Everest", "http://data.gov/dataset/9",
+               "https://news.example.com/2024/05/story.html?ref=home", "https://www.cam.ac.uk/research", "reuters.com/article/abc",
+               "https://sub.domain.blogspot.com/post", "not a url at all", "https://192.168.0.1/admin", "https://WWW.NYTIMES.COM/")
+
+def timed(operation, inputs):
+    """Runs operation(x) for every input; returns per-call latency stats and ops/sec."""
+    durations = []
+    for item in inputs:
+        start_time = time.perf_counter()
+        operation(item)
+        durations.append(time.perf_counter() - start_time)
+    total = sum(durations)
+    return dict(latency_summary(durations), ops_per_sec=len(durations) / total if total else 0.0, calls=len(durations))
+
+
+def bench_cache(args):
+    import numpy as np
+    from cache_manager import CacheManager
+    cache_manager = CacheManager(cache_dir="cache_data")
+    n = args.operations
+    queries = [f"benchmark query {i}" for i in range(n)]
+    result = [{"snippet": "x" * 200, "title": "t", "link": f"https://example.com/{i}"} for i in range(5)]
+    verdict = {"claim": "c", "analysis": "a" * 500, "evidence": [], "verdict": {"verdict": "True", "confidence_score": 90}}
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, 384)).astype(np.float32)
+    results = {
+        "search_set": timed(lambda query: cache_manager.cache_search_result(query, result), queries),
+        "search_get_hit": timed(cache_manager.get_search_result, queries),
+        "search_get_miss": timed(cache_manager.get_search_result, [f"missing {query}" for query in queries]),
+        "verdict_set": timed(lambda i: cache_manager.cache_verdict(f"claim {i}", verdict, embedding=vectors[i]), range(n)),
+        "verdict_get_hit": timed(lambda i: cache_manager.get_verdict(f"claim {i}"), range(n)),
+        "llm_set": timed(lambda query: cache_manager.cache_llm_response("verdict", query, "r" * 1000), queries),
+        "llm_get_hit": timed(lambda query: cache_manager.get_llm_response("verdict", query), queries),
+        # n stored claim embeddings; the first lookup also loads them into memory
+        "semantic_lookup": timed(lambda i: cache_manager.get_similar_verdict(vectors[i] + 0.01, 0.92, claim=f"claim {i}"), range(min(n, 1000))),
+    }
+    cache_manager.close()
+    return results
+
+
+def bench_kb_query(args):
+    from benchmarks.fakes import SyntheticEmbeddings
+    from knowledge_base import KnowledgeBase
+    with open("facts.jsonl", "w", encoding="utf-8") as f:
+        for i in range(args.kb_size):
+            f.write(json.dumps({"fact": f"Synthetic fact number {i} about topic {i % 97}."}) + "\n")
+    results = {}
+    for backend in args.kb_backends:
+        knowledge_base = KnowledgeBase(persist_directory=f"kb_{backend}", index_backend=backend, embeddings=SyntheticEmbeddings())
+        knowledge_base.ingest(["facts.jsonl"], batch_size=5000)
+        knowledge_base.query_knowledge_base("warm-up query")
+        results[backend] = timed(lambda i: knowledge_base.query_knowledge_base(f"Benchmark query {i}"), range(args.queries))
+        knowledge_base.close()
+    return results
+
+
+def bench_domain(args):
+    from benchmarks.fakes import FakeChatModel
+    from source_evaluator import SourceEvaluator
+    source_evaluator = SourceEvaluator(FakeChatModel(latency=0), reliability_db_path="cache_data/source_reliability.sqlite3")
+    urls = [URL_SAMPLES[i % len(URL_SAMPLES)] + (f"?n={i}" if i % 3 else "") for i in range(args.operations)]
+    return {"extract_domain": timed(source_evaluator.extract_domain, urls)}
+
+
+def print_report(results):
+    print(f"{'benchmark':<32} {'calls':>7} {'ops/s':>11} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9}")
+    for group, entries in results.items():
+        for name, stats in entries.items():
+            print(f"{group + '.' + name:<32} {stats['calls']:>7} {stats['ops_per_sec']:>11.0f} {stats['p50_ms'] * 1000:>9.1f} "
+                  f"{stats['p95_ms'] * 1000:>9.1f} {stats['p99_ms'] * 1000:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for CacheManager, KnowledgeBase queries and domain extraction.")
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--operations", type=int, default=5000, help="Calls per cache / domain operation.")
+    parser.add_argument("--kb-size", type=int, default=20_000, help="Facts in the knowledge base for kb_query.")
+    parser.add_argument("--kb-backends", nargs="+", choices=["chroma", "numpy"], default=["chroma", "numpy"])
+    parser.add_argument("--queries", type=int, default=500, help="Knowledge-base queries to time.")
+    parser.add_argument("--output", metavar="FILE", help="Save the results as JSON for later comparison.")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare against results saved by an earlier --output run.")
+    args = parser.parse_args()
+    # Relative paths given on the command line refer to where the script was started
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+
+    runners = {"cache": bench_cache, "kb_query": bench_kb_query, "domain": bench_domain}
+    results = {}
+    directory = tempfile.mkdtemp(prefix="micro_bench_")
+    previous_directory = os.getcwd()
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        os.chdir(directory)
+        for name in args.benchmarks:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull): # Per-call cache/KB prints
+                results[name] = runners[name](args)
+    finally:
+        os.chdir(previous_directory)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print_report(results)
+    if baseline:
+        compare_with_baseline(baseline, results)
+    if output:
+        save_results(output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""End-to-end FactChecker throughput with offline stand-ins for the LLM and web search.
+
+Drives a synthetic claim corpus through the sync (process_claim), streaming
+(stream_claim), async (aprocess_claim) and CLI batch (main_cli.batch_mode) paths.
+The LLM and search tool are the deterministic fakes in benchmarks/fakes.py, with
+configurable latency, so no API key or network is needed. Each mode runs in its
+own process and temporary working directory, starting with cold caches and an
+empty knowledge base.
+
+Reported per mode: claims/sec, claim latency percentiles, per-stage latency
+percentiles (from result["trace"]), how each claim was answered, LLM and search
+calls made, peak RSS, and growth of the cache and knowledge base.
+
+    python -m benchmarks.pipeline_benchmark --claims 100 --modes sync async batch --output run.json
+    python -m benchmarks.pipeline_benchmark --claims 100 --baseline run.json
+
+With --embeddings synthetic (the default) paraphrases get unrelated vectors, so the
+semantic cache and knowledge-base fast path only fire with --embeddings model. The
+same goes for adaptive search: synthetic snippets never cover a fact to check, so
+every claim runs --max-search-queries searches.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("sync", "stream", "async", "batch")
+
+def build_fact_checker(args):
+    from benchmarks.fakes import FakeChatModel, FakeSearchTool, SyntheticEmbeddings
+    from fact_checker import FactChecker
+    llm = FakeChatModel(latency=args.llm_latency, token_latency=args.llm_token_latency, seed=args.seed)
+    search_tool = FakeSearchTool(latency=args.search_latency, error_rate=args.search_error_rate, seed=args.seed)
+    fact_checker = FactChecker(
+        max_search_workers=args.workers,
+        search_rate=args.search_rate,
+        search_burst=max(4, args.workers),
+        kb_index_backend=args.kb_backend,
+        llm=llm,
+        search_tool=search_tool,
+        embeddings=SyntheticEmbeddings() if args.embeddings == "synthetic" else None,
+        adaptive_search=args.max_search_queries > 0,
+        max_search_queries=args.max_search_queries,
+    )
+    return fact_checker, llm, search_tool
+
+
+def answered_by(result):
+    spans = {span["name"]: span for span in result.get("trace", {}).get("spans", [])}
+    if spans.get("single_flight", {}).get("cache_hit"):
+        return "single_flight" # Joined a concurrent check of the same claim
+    if spans.get("verdict_cache", {}).get("cache_hit"):
+        return "verdict_cache"
+    if result.get("semantic_cache_match"):
+        return "semantic_cache"
+    if result.get("kb_fast_path"):
+        return "kb_fast_path"
+    return "full_check"
+
+
+def run_sync(fact_checker, claims, args):
+    records = []
+    for claim in claims:
+        start_time = time.perf_counter()
+        try:
+            result = fact_checker.process_claim(claim)
+        except Exception as e:
+            result = {"claim": claim, "error": str(e)}
+        records.append((result, time.perf_counter() - start_time, None))
+    return records
+
+
+def run_stream(fact_checker, claims, args):
+    records = []
+    for claim in claims:
+        start_time = time.perf_counter()
+        first_verdict = None
+        result = {"claim": claim, "error": "stream ended without a result"}
+        try:
+            for event in fact_checker.stream_claim(claim):
+                if event["type"] == "field" and event["name"] == "verdict" and first_verdict is None:
+                    first_verdict = time.perf_counter() - start_time
+                elif event["type"] == "result":
+                    result = event["result"]
+        except Exception as e:
+            result = {"claim": claim, "error": str(e)}
+        records.append((result, time.perf_counter() - start_time, first_verdict))
+    return records
+
+
+def run_async(fact_checker, claims, args):
+    async def check_all():
+        semaphore = asyncio.Semaphore(args.workers)
+
+        async def check(claim):
+            async with semaphore:
+                start_time = time.perf_counter()
+                try:
+                    result = await fact_checker.aprocess_claim(claim)
+                except Exception as e:
+                    result = {"claim": claim, "error": str(e)}
+                return result, time.perf_counter() - start_time, None
+
+        return await asyncio.gather(*(check(claim) for claim in claims))
+    return asyncio.run(check_all())
+
+
+def run_batch(fact_checker, claims, args):
+    import main_cli
+    with open("claims.txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(claims) + "\n")
+    main_cli.batch_mode(fact_checker, "claims.txt", "results.jsonl", workers=args.workers, input_format="text")
+    records = []
+    with open("results.jsonl", encoding="utf-8") as f:
+        for line in f:
+            result = json.loads(line)
+            records.append((result, result["processing_time"], None)) # batch_mode dedupes identical claims
+    return records
+
+
+def run_mode(args):
+    from benchmarks.fakes import make_claims
+    from benchmarks.reporting import latency_summary, peak_rss_mb
+
+    claims = make_claims(args.claims, repeat_ratio=args.repeat_ratio, paraphrase_ratio=args.paraphrase_ratio, seed=args.seed)
+    runner = {"sync": run_sync, "stream": run_stream, "async": run_async, "batch": run_batch}[args.mode]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        fact_checker, llm, search_tool = build_fact_checker(args)
+        fact_checker.knowledge_base.load() # Seeding the store isn't part of the measured run
+        cache_before = fact_checker.cache_manager.entry_counts()
+        kb_before = fact_checker.knowledge_base.count()
+        start_time = time.perf_counter()
+        records = runner(fact_checker, claims, args)
+        elapsed = time.perf_counter() - start_time
+        fact_checker.close() # Flushes queued knowledge-base writes
+        cache_after = fact_checker.cache_manager.entry_counts()
+        kb_after = fact_checker.knowledge_base.count()
+
+    stage_durations = {}
+    answers = {}
+    for result, _, _ in records:
+        for span in result.get("trace", {}).get("spans", []):
+            stage_durations.setdefault(span["name"], []).append(span["duration"])
+        outcome = "error" if "error" in result else answered_by(result)
+        answers[outcome] = answers.get(outcome, 0) + 1
+    first_verdicts = [first for _, _, first in records if first is not None]
+    return {
+        "mode": args.mode,
+        "claims": len(records),
+        "seconds": elapsed,
+        "claims_per_sec": len(records) / elapsed if elapsed else 0.0,
+        "latency": latency_summary([latency for _, latency, _ in records]),
+        "first_verdict": latency_summary(first_verdicts) if first_verdicts else None,
+        "stages": {name: dict(latency_summary(durations), count=len(durations)) for name, durations in stage_durations.items()},
+        "answered_by": answers,
+        "llm_calls": llm.calls,
+        "search_calls": search_tool.calls,
+        "peak_rss_mb": peak_rss_mb(),
+        "cache_entries": {"before": cache_before, "after": cache_after},
+        "kb_facts": {"before": kb_before, "after": kb_after},
+    }
+
+
+def run_phase(args, mode, directory):
+    # Each mode runs in its own process and directory: cold caches, fresh KB, clean peak-RSS
+    command = [sys.executable, "-m", "benchmarks.pipeline_benchmark", "--phase", mode, "--directory", directory]
+    for name in ("claims", "workers", "llm_latency", "llm_token_latency", "search_latency", "search_error_rate",
+                 "search_rate", "repeat_ratio", "paraphrase_ratio", "seed", "kb_backend", "embeddings", "max_search_queries"):
+        command += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+    output = subprocess.run(command, check=True, capture_output=True, text=True, cwd=REPO_ROOT).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def print_report(results):
+    print(f"{'mode':<7} {'claims':>6} {'secs':>7} {'claims/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'llm':>5} {'search':>6} {'rss MB':>7}  answered by")
+    for result in results.values():
+        latency = result["latency"]
+        answers = ", ".join(f"{name} {count}" for name, count in sorted(result["answered_by"].items()))
+        print(f"{result['mode']:<7} {result['claims']:>6} {result['seconds']:>7.1f} {result['claims_per_sec']:>9.2f} "
+              f"{latency['p50_ms']:>8.0f} {latency['p95_ms']:>8.0f} {latency['p99_ms']:>8.0f} "
+              f"{result['llm_calls']:>5} {result['search_calls']:>6} {result['peak_rss_mb']:>7.0f}  {answers}")
+        if result["first_verdict"]:
+            print(f"{'':<7} time to first verdict field: p50 {result['first_verdict']['p50_ms']:.0f} ms, "
+                  f"p95 {result['first_verdict']['p95_ms']:.0f} ms")
+
+    print(f"\n{'mode':<7} {'stage':<15} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for result in results.values():
+        for name, stage in sorted(result["stages"].items(), key=lambda item: -item[1]["mean_ms"] * item[1]["count"]):
+            print(f"{result['mode']:<7} {name:<15} {stage['count']:>6} {stage['p50_ms']:>8.1f} {stage['p95_ms']:>8.1f} {stage['mean_ms']:>8.1f}")
+
+    print(f"\n{'mode':<7} {'kb facts':>15}  cache entries (before -> after)")
+    for result in results.values():
+        before, after = result["cache_entries"]["before"], result["cache_entries"]["after"]
+        growth = ", ".join(f"{name} {before.get(name, 0)}->{count}" for name, count in sorted(after.items()))
+        print(f"{result['mode']:<7} {result['kb_facts']['before']:>7}->{result['kb_facts']['after']:<7}  {growth}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FactChecker end to end with offline LLM and search stand-ins.")
+    parser.add_argument("--claims", type=int, default=50, help="Size of the synthetic claim corpus.")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=["sync", "async", "batch"])
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent claims in async/batch modes, and search workers.")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds before the fake LLM's first token.")
+    parser.add_argument("--llm-token-latency", type=float, default=0.001, help="Extra seconds per generated token.")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="Seconds per fake search.")
+    parser.add_argument("--search-error-rate", type=float, default=0.0, help="Share of searches that fail.")
+    parser.add_argument("--search-rate", type=float, default=1000.0, help="Search rate limit (calls/sec); 2 reproduces the default limiter.")
+    parser.add_argument("--repeat-ratio", type=float, default=0.2, help="Share of claims that repeat an earlier one verbatim.")
+    parser.add_argument("--paraphrase-ratio", type=float, default=0.1, help="Share of claims that paraphrase an earlier one.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kb-backend", choices=["chroma", "numpy"], default="chroma")
+    parser.add_argument("--embeddings", choices=["synthetic", "model"], default="synthetic",
+                        help="Synthetic vectors (no model download) or the real sentence-transformer.")
+    parser.add_argument("--max-search-queries", type=int, default=6, help="Adaptive search query limit per claim (0: the fixed first three queries).")
+    parser.add_argument("--output", metavar="FILE", help="Save the results as JSON for later comparison.")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare against results saved by an earlier --output run.")
+    parser.add_argument("--phase", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--directory", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase:
+        sys.path.insert(0, REPO_ROOT) # The run happens inside the temporary directory
+        os.chdir(args.directory)
+        args.mode = args.phase
+        print(json.dumps(run_mode(args)))
+        return
+
+    results = {}
+    for mode in args.modes:
+        directory = tempfile.mkdtemp(prefix=f"pipeline_bench_{mode}_")
+        try:
+            results[mode] = run_phase(args, mode, directory)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    print_report(results)
+
+    from benchmarks.reporting import compare_with_baseline, save_results
+    if args.baseline:
+        compare_with_baseline(args.baseline, results)
+    if args.output:
+        save_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
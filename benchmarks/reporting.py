@@ -0,0 +1,60 @@
+"""Shared helpers for the benchmark scripts: percentiles, peak memory and run-over-run comparison."""
+import json
+import resource
+
+def percentile(values, pct):
+    # Nearest-rank percentile of an unsorted list (0.0 when empty)
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def latency_summary(seconds):
+    """p50/p95/p99/mean in milliseconds."""
+    return {
+        "p50_ms": percentile(seconds, 50) * 1000,
+        "p95_ms": percentile(seconds, 95) * 1000,
+        "p99_ms": percentile(seconds, 99) * 1000,
+        "mean_ms": sum(seconds) / len(seconds) * 1000 if seconds else 0.0,
+    }
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # KB on Linux
+
+
+def save_results(path, results):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Results written to {path}")
+
+
+def _flatten(value, prefix=""):
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}{key}."))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix[:-1]: value}
+    return {}
+
+
+def compare_with_baseline(path, results, threshold=5.0):
+    """Prints every numeric metric that moved more than `threshold` percent since the run saved at `path`."""
+    with open(path, encoding="utf-8") as f:
+        baseline = _flatten(json.load(f))
+    current = _flatten(results)
+    print(f"\nChanges of more than {threshold:.0f}% against {path}:")
+    changed = 0
+    for key in sorted(current):
+        before, after = baseline.get(key), current[key]
+        if not before or before == after:
+            continue
+        change = (after - before) / abs(before) * 100
+        if abs(change) >= threshold:
+            changed += 1
+            print(f"  {key:<60} {before:>12.3f} -> {after:>12.3f} ({change:+.1f}%)")
+    if not changed:
+        print("  none")
@@ -1,73 +1,315 @@
 import hashlib
 import os
 import pickle
+import sqlite3
+import threading
 import time
 
+import numpy as np
+
+from knowledge_base import statement_signature
+
 class CacheManager:
-    def __init__(self, cache_dir="./cache_data"): # Changed dir name slightly
+    # Default per-namespace entry caps; the least recently used entries are evicted beyond these
+    DEFAULT_MAX_ENTRIES = {"search": 200_000, "verdict": 100_000}
+
+    def __init__(self, cache_dir="./cache_data", expiration=24 * 60 * 60, max_entries=None, sweep_interval=10 * 60): # Changed dir name slightly
         self.cache_dir = cache_dir
         os.makedirs(self.cache_dir, exist_ok=True)
-        
-        self.search_cache_file = os.path.join(self.cache_dir, "search_cache.pkl")
-        self.search_cache = self._load_cache(self.search_cache_file)
-        
-        self.verdict_cache_file = os.path.join(self.cache_dir, "verdict_cache.pkl")
-        self.verdict_cache = self._load_cache(self.verdict_cache_file)
-        
-        self.expiration = 24 * 60 * 60  # 24 hours in seconds
-    
-    def _load_cache(self, cache_file):
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'rb') as f:
-                    return pickle.load(f)
-            except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError) as e:
-                print(f"Warning: Could not load cache file {cache_file}. Error: {e}. Creating new cache.")
-                return {}
-        return {}
-    
-    def _save_cache(self, cache_data, cache_file):
+
+        self.expiration = expiration  # 24 hours in seconds by default
+        self.max_entries = dict(self.DEFAULT_MAX_ENTRIES, **(max_entries or {}))
+        self.ttls = {} # Namespaces that expire on their own schedule instead of `expiration`
+
+        # Entries live in one SQLite table (WAL mode) so each insert is a single-row write
+        # and nothing is deserialized until it is actually read.
+        self.db_file = os.path.join(self.cache_dir, "cache.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_lru ON cache_entries (namespace, last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_created ON cache_entries (created_at)")
+        # Normalized claim embeddings for the semantic verdict tier, keyed like the verdict entries
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS verdict_embeddings (
+                key TEXT PRIMARY KEY,
+                claim TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_verdict_embeddings_created ON verdict_embeddings (created_at)")
+
+        # Approximate row counts per namespace; upserts over-count, which only makes eviction run early
+        self._counts = {}
+
+        # In-memory copy of verdict_embeddings, loaded on the first semantic lookup
+        self._semantic_keys = None
+        self._semantic_claims = None
+        self._semantic_matrix = None
+        self._semantic_pending = []
+
+        # Hit/miss counters, read by batch mode for its throughput summary
+        self.stats = {"search_hits": 0, "search_misses": 0, "verdict_hits": 0, "verdict_misses": 0, "semantic_hits": 0,
+                      "llm_hits": 0, "llm_misses": 0}
+        self.llm_stats = {} # Chain name -> {"hits", "misses"}
+        self._stats_lock = threading.Lock() # Lookups run on many threads; += on a dict entry isn't atomic
+
+        self._migrate_legacy_pickle("search", os.path.join(self.cache_dir, "search_cache.pkl"))
+        self._migrate_legacy_pickle("verdict", os.path.join(self.cache_dir, "verdict_cache.pkl"))
+
+        self._stop_sweeper = threading.Event()
+        self._sweeper = None
+        if sweep_interval:
+            self._sweeper = threading.Thread(target=self._sweep_loop, args=(sweep_interval,), daemon=True)
+            self._sweeper.start()
+
+    def _migrate_legacy_pickle(self, namespace, cache_file):
+        # One-off import of the old whole-dict pickle files; they are renamed afterwards
+        if not os.path.exists(cache_file):
+            return
         try:
-            with open(cache_file, 'wb') as f:
-                pickle.dump(cache_data, f)
-        except Exception as e:
-            print(f"Error saving cache to {cache_file}: {e}")
+            with open(cache_file, 'rb') as f:
+                legacy_cache = pickle.load(f)
+            rows = [
+                (namespace, key, pickle.dumps(result), timestamp, timestamp)
+                for key, (result, timestamp) in legacy_cache.items()
+                if (time.time() - timestamp) < self.expiration
+            ]
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+            os.replace(cache_file, cache_file + ".migrated")
+            print(f"Migrated {len(rows)} entries from {cache_file} into {self.db_file}.")
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError, ValueError, TypeError) as e:
+            print(f"Warning: Could not migrate cache file {cache_file}. Error: {e}. Ignoring it.")
+
+    def configure_namespace(self, namespace, ttl=None, max_entries=None):
+        if ttl is not None:
+            self.ttls[namespace] = ttl
+        if max_entries is not None:
+            self.max_entries[namespace] = max_entries
 
     def _get_hash(self, text):
         return hashlib.md5(text.encode('utf-8')).hexdigest()
-    
-    def get_search_result(self, query):
-        query_hash = self._get_hash(query)
-        if query_hash in self.search_cache:
-            result, timestamp = self.search_cache[query_hash]
-            if (time.time() - timestamp) < self.expiration:
-                print(f"Cache hit for search query: {query[:50]}...")
-                return result
+
+    def _get(self, namespace, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None:
+                return None, False
+            value, created_at = row
+            if (now - created_at) >= self.ttls.get(namespace, self.expiration):
+                self._conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+                return None, True
+            self._conn.execute(
+                "UPDATE cache_entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key)
+            )
+        return pickle.loads(value), False
+
+    def _set(self, namespace, key, value):
+        now = time.time()
+        blob = pickle.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, blob, now, now)
+            )
+            if namespace not in self._counts:
+                self._counts[namespace] = self._count(namespace)
             else:
-                print(f"Cache expired for search query: {query[:50]}...")
-                del self.search_cache[query_hash] # Remove expired entry
+                self._counts[namespace] += 1
+            max_entries = self.max_entries.get(namespace)
+            if max_entries and self._counts[namespace] > max_entries:
+                self._evict_lru(namespace, max_entries)
+
+    def _count(self, namespace):
+        return self._conn.execute("SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+    def _evict_lru(self, namespace, max_entries):
+        # Evict down to 90% of the cap so eviction is amortized over many inserts
+        target = int(max_entries * 0.9)
+        excess = self._count(namespace) - target
+        if excess > 0:
+            self._conn.execute(
+                """DELETE FROM cache_entries WHERE namespace = ? AND key IN (
+                       SELECT key FROM cache_entries WHERE namespace = ? ORDER BY last_access LIMIT ?
+                   )""",
+                (namespace, namespace, excess)
+            )
+            print(f"Evicted {excess} least recently used '{namespace}' cache entries.")
+            if namespace == "verdict":
+                self._conn.execute(
+                    "DELETE FROM verdict_embeddings WHERE key NOT IN (SELECT key FROM cache_entries WHERE namespace = 'verdict')"
+                )
+                self._reset_semantic_index()
+        self._counts[namespace] = self._count(namespace)
+
+    def sweep_expired(self):
+        now = time.time()
+        cutoff = now - self.expiration
+        with self._lock:
+            ttls = dict(self.ttls)
+            removed = self._conn.execute(
+                f"DELETE FROM cache_entries WHERE created_at < ? AND namespace NOT IN ({','.join('?' * len(ttls))})",
+                (cutoff, *ttls)
+            ).rowcount
+            for namespace, ttl in ttls.items():
+                removed += self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND created_at < ?", (namespace, now - ttl)
+                ).rowcount
+            if self._conn.execute("DELETE FROM verdict_embeddings WHERE created_at < ?", (cutoff,)).rowcount:
+                self._reset_semantic_index()
+            self._counts.clear() # Re-counted lazily on the next insert
+        if removed:
+            print(f"Cache sweep removed {removed} expired entries.")
+        return removed
+
+    def _sweep_loop(self, interval):
+        while not self._stop_sweeper.wait(interval):
+            try:
+                self.sweep_expired()
+            except sqlite3.Error as e:
+                print(f"Error during cache expiry sweep: {e}")
+
+    def entry_counts(self):
+        # Stored entries per namespace, including expired ones the sweeper hasn't removed yet
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT namespace, COUNT(*) FROM cache_entries GROUP BY namespace").fetchall())
+            counts["verdict_embeddings"] = self._conn.execute("SELECT COUNT(*) FROM verdict_embeddings").fetchone()[0]
+        return counts
+
+    def close(self):
+        self._stop_sweeper.set()
+        with self._lock:
+            self._conn.close()
+
+    def _record_stat(self, stat, chain=None):
+        with self._stats_lock:
+            self.stats[stat] += 1
+            if chain is not None:
+                chain_stats = self.llm_stats.setdefault(chain, {"hits": 0, "misses": 0})
+                chain_stats["hits" if stat == "llm_hits" else "misses"] += 1
+
+    def get_search_result(self, query):
+        result, expired = self._get("search", self._get_hash(query))
+        if result is not None:
+            print(f"Cache hit for search query: {query[:50]}...")
+            self._record_stat("search_hits")
+            return result
+        if expired:
+            print(f"Cache expired for search query: {query[:50]}...")
+        self._record_stat("search_misses")
         return None
-    
+
     def cache_search_result(self, query, result):
-        query_hash = self._get_hash(query)
-        self.search_cache[query_hash] = (result, time.time())
-        self._save_cache(self.search_cache, self.search_cache_file)
+        self._set("search", self._get_hash(query), result)
         print(f"Cached search result for query: {query[:50]}...")
-    
+
     def get_verdict(self, claim):
-        claim_hash = self._get_hash(claim)
-        if claim_hash in self.verdict_cache:
-            result, timestamp = self.verdict_cache[claim_hash]
-            if (time.time() - timestamp) < self.expiration:
-                print(f"Cache hit for verdict: {claim[:50]}...")
-                return result
-            else:
-                print(f"Cache expired for verdict: {claim[:50]}...")
-                del self.verdict_cache[claim_hash] # Remove expired entry
+        result, expired = self._get("verdict", self._get_hash(claim))
+        if result is not None:
+            print(f"Cache hit for verdict: {claim[:50]}...")
+            self._record_stat("verdict_hits")
+            return result
+        if expired:
+            print(f"Cache expired for verdict: {claim[:50]}...")
+        self._record_stat("verdict_misses")
         return None
-    
-    def cache_verdict(self, claim, result):
+
+    def cache_verdict(self, claim, result, embedding=None):
         claim_hash = self._get_hash(claim)
-        self.verdict_cache[claim_hash] = (result, time.time())
-        self._save_cache(self.verdict_cache, self.verdict_cache_file)
-        print(f"Cached verdict for claim: {claim[:50]}...")
\ No newline at end of file
+        self._set("verdict", claim_hash, result)
+        if embedding is not None:
+            vector = self._normalize(embedding)
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO verdict_embeddings (key, claim, vector, created_at) VALUES (?, ?, ?, ?)",
+                    (claim_hash, claim, vector.tobytes(), time.time())
+                )
+                if self._semantic_keys is not None:
+                    self._semantic_pending.append((claim_hash, claim, vector))
+        print(f"Cached verdict for claim: {claim[:50]}...")
+
+    def get_llm_response(self, chain, key):
+        response, _ = self._get(f"llm:{chain}", key)
+        if response is not None:
+            self._record_stat("llm_hits", chain)
+            return response
+        self._record_stat("llm_misses", chain)
+        return None
+
+    def cache_llm_response(self, chain, key, response):
+        self._set(f"llm:{chain}", key, response)
+
+    def _normalize(self, embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _reset_semantic_index(self):
+        self._semantic_keys = None
+        self._semantic_claims = None
+        self._semantic_matrix = None
+        self._semantic_pending = []
+
+    def _load_semantic_index(self):
+        # Called with self._lock held
+        if self._semantic_keys is None:
+            rows = self._conn.execute("SELECT key, claim, vector FROM verdict_embeddings").fetchall()
+            self._semantic_keys = [row[0] for row in rows]
+            self._semantic_claims = [row[1] for row in rows]
+            self._semantic_matrix = (
+                np.vstack([np.frombuffer(row[2], dtype=np.float32) for row in rows]) if rows else None
+            )
+        if self._semantic_pending:
+            new_vectors = np.vstack([vector for _, _, vector in self._semantic_pending])
+            self._semantic_matrix = new_vectors if self._semantic_matrix is None else np.vstack([self._semantic_matrix, new_vectors])
+            self._semantic_keys.extend(key for key, _, _ in self._semantic_pending)
+            self._semantic_claims.extend(claim for _, claim, _ in self._semantic_pending)
+            self._semantic_pending = []
+
+    def get_similar_verdict(self, embedding, threshold, top_k=5, claim=None):
+        """Returns (result, matched_claim, score) for the most similar cached claim
+        with cosine similarity >= threshold, or None. With claim given, a cached claim
+        only matches if it also agrees in negation and numbers (statement_signature)."""
+        query_vector = self._normalize(embedding)
+        with self._lock:
+            self._load_semantic_index()
+            if self._semantic_matrix is None or self._semantic_matrix.shape[1] != query_vector.shape[0]:
+                return None
+            scores = self._semantic_matrix @ query_vector
+            top_k = min(top_k, len(scores))
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+            candidates = [(self._semantic_keys[i], self._semantic_claims[i], float(scores[i])) for i in candidates]
+        signature = statement_signature(claim) if claim is not None else None
+        # Walk the best few in score order; the best one may have been evicted, expired or say the opposite
+        for claim_hash, matched_claim, score in sorted(candidates, key=lambda c: c[2], reverse=True):
+            if score < threshold:
+                break
+            if signature is not None and statement_signature(matched_claim) != signature:
+                continue
+            result, _ = self._get("verdict", claim_hash)
+            if result is not None:
+                print(f"Semantic cache hit (score {score:.3f}) for claim: {matched_claim[:50]}...")
+                self._record_stat("semantic_hits")
+                return result, matched_claim, score
+        return None
@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+class EmbeddingCache:
+    """Memoizing wrapper around a LangChain embeddings object.
+
+    Vectors live in a fixed-capacity, memory-mapped float32 matrix on disk and a
+    SQLite (WAL) index maps hash(model, text) to a row of that matrix. Several
+    worker processes can open the same directory and share the mapped pages
+    instead of each holding its own copy. When the matrix is full, the least
+    recently used row is reused.
+
+    Exposes embed_query/embed_documents (and async variants), so it can be passed
+    anywhere the wrapped embeddings object was used, including Chroma.
+    """
+    def __init__(self, embeddings, model_name, cache_dir="./cache_data/embeddings", max_entries=100_000):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.cache_dir = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.matrix_file = os.path.join(self.cache_dir, "vectors.f32")
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.cache_dir, "index.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                slot INTEGER NOT NULL UNIQUE,
+                checksum INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_lru ON entries (last_access)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+        self._matrix = None
+        self.capacity = max_entries
+        dim = self._get_meta("dim")
+        if dim:
+            self._open_matrix(dim)
+
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _get_meta(self, name):
+        row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, name, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value))
+
+    def _open_matrix(self, dim):
+        # The dimension is only known after the first embedding; an existing file keeps
+        # the capacity it was created with so all processes agree on the layout.
+        if os.path.exists(self.matrix_file):
+            self.capacity = os.path.getsize(self.matrix_file) // (dim * 4)
+            mode = "r+"
+        else:
+            mode = "w+"
+        self._matrix = np.memmap(self.matrix_file, dtype=np.float32, mode=mode, shape=(self.capacity, dim))
+
+    def _key(self, kind, text):
+        # Query and document embeddings are keyed separately; some models embed them differently
+        return hashlib.sha1(f"{self.model_name}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys):
+        if self._matrix is None or not keys:
+            return {}
+        found = {}
+        with self._lock:
+            rows = []
+            for start in range(0, len(keys), 500): # Stay under SQLite's bound-parameter limit
+                chunk = keys[start:start + 500]
+                rows.extend(self._conn.execute(
+                    f"SELECT key, slot, checksum FROM entries WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall())
+            for key, slot, checksum in rows:
+                vector = np.array(self._matrix[slot])
+                # A row reused by another process between the index read and the copy fails the checksum
+                if zlib.crc32(vector.tobytes()) == checksum:
+                    found[key] = vector
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE entries SET last_access = ? WHERE key = ?", [(now, key) for key in found])
+        return found
+
+    def _store(self, items):
+        if not items:
+            return
+        with self._lock:
+            if self._matrix is None:
+                dim = len(items[0][1])
+                self._set_meta("dim", dim)
+                self._open_matrix(dim)
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE") # Serializes slot allocation across processes
+            try:
+                for key, vector in items:
+                    vector = np.asarray(vector, dtype=np.float32)
+                    row = self._conn.execute("SELECT slot FROM entries WHERE key = ?", (key,)).fetchone()
+                    if row:
+                        slot = row[0]
+                    else:
+                        next_slot = self._get_meta("next_slot") or 0
+                        if next_slot < self.capacity:
+                            slot = next_slot
+                            self._set_meta("next_slot", next_slot + 1)
+                        else:
+                            slot = self._conn.execute("SELECT slot FROM entries ORDER BY last_access LIMIT 1").fetchone()[0]
+                            self._conn.execute("DELETE FROM entries WHERE slot = ?", (slot,))
+                            self.stats["evictions"] += 1
+                    self._matrix[slot] = vector
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO entries (key, slot, checksum, last_access) VALUES (?, ?, ?, ?)",
+                        (key, slot, zlib.crc32(vector.tobytes()), now)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def embed_documents(self, texts):
+        keys = [self._key("doc", text) for text in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        with self._lock:
+            self.stats["hits"] += len(texts) - sum(1 for key in keys if key in missing)
+            self.stats["misses"] += len(missing)
+        if missing:
+            # Everything not cached goes through the model in one batch
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            self._store(new_items)
+            found.update((key, np.asarray(vector, dtype=np.float32)) for key, vector in new_items)
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text):
+        key = self._key("query", text)
+        found = self._lookup([key])
+        with self._lock:
+            self.stats["hits" if key in found else "misses"] += 1
+        if key in found:
+            return found[key].tolist()
+        vector = self.embeddings.embed_query(text)
+        self._store([(key, vector)])
+        return list(vector)
+
+    async def aembed_documents(self, texts):
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text):
+        return await asyncio.to_thread(self.embed_query, text)
+
+    def close(self):
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+            self._conn.close()
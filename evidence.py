@@ -0,0 +1,57 @@
+from dataclasses import dataclass, asdict
+
+NO_EVIDENCE_TEXT = "No evidence gathered from web search."
+
+@dataclass(slots=True)
+class EvidenceRecord:
+    """One search result gathered for a claim."""
+    query: str
+    snippet: str
+    url: str = ""
+    domain: str = "unknown"
+    title: str = ""
+    search_time: float = 0.0 # Seconds spent on the search call that produced this result
+    cache_hit: bool = False
+    error: str = ""
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+def render_evidence(evidence):
+    """Renders evidence records as the text block used in LLM prompts and plain-text displays.
+
+    Records are grouped under their query in first-seen order. Strings (results
+    produced before evidence was structured) are returned unchanged.
+    """
+    if isinstance(evidence, str):
+        return evidence
+    if not evidence:
+        return NO_EVIDENCE_TEXT
+    by_query = {}
+    for record in evidence:
+        by_query.setdefault(record.query, []).append(record)
+    blocks = []
+    for query, records in by_query.items():
+        lines = []
+        for record in records:
+            if record.error:
+                lines.append(record.snippet)
+            elif record.url:
+                lines.append(f"[{record.domain}] {record.title}: {record.snippet} ({record.url})")
+            else:
+                lines.append(record.snippet)
+        result_text = "\n".join(lines)
+        blocks.append(f"Query: {query}\nResult:\n{result_text}\n---")
+    return "\n\n".join(blocks)
+
+
+def evidence_json_default(obj):
+    # json.dumps hook so results carrying EvidenceRecords can be written as JSON
+    if isinstance(obj, EvidenceRecord):
+        return obj.to_dict()
+    return str(obj)
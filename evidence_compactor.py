@@ -0,0 +1,118 @@
+import re
+
+import numpy as np
+
+CHARS_PER_TOKEN = 4 # Rough estimate for English text; avoids a tokenizer dependency
+NEAR_DUPLICATE_SIMILARITY = 0.95
+COVERAGE_SIMILARITY = 0.5 # A snippet at least this similar to a fact to check speaks to it
+COVERAGE_MIN_RESULTS = 2 # Distinct snippets needed before a fact counts as covered
+
+class EvidenceCompactor:
+    """Selects the evidence that goes into the verdict prompt.
+
+    Search results are deduplicated (same URL, same text, or near-identical
+    embeddings), ranked by cosine similarity to the claim and its facts to check,
+    and added best-first until the token budget is used. Everything left out is
+    listed in the report with the reason, so a verdict can be audited against the
+    full search output.
+
+    coverage() scores how well the results so far speak to each fact to check;
+    FactChecker uses it to decide whether another round of searches is needed.
+    """
+    def __init__(self, embeddings, token_budget=800):
+        self.embeddings = embeddings
+        self.token_budget = token_budget
+
+    def estimate_tokens(self, record):
+        # What render_evidence() emits for the record
+        text = f"[{record.domain}] {record.title}: {record.snippet} ({record.url})" if record.url else record.snippet
+        return max(1, len(text) // CHARS_PER_TOKEN)
+
+    def _normalize(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+    def _dropped(self, record, reason, score=None):
+        return {
+            "query": record.query,
+            "url": record.url,
+            "domain": record.domain,
+            "snippet": record.snippet[:160],
+            "reason": reason,
+            "score": round(score, 4) if score is not None else None,
+        }
+
+    def similarity_matrix(self, texts, targets):
+        """Cosine similarity of every text (rows) to every target (columns)."""
+        text_vectors = self._normalize(self.embeddings.embed_documents(list(texts)))
+        target_vectors = self._normalize([self.embeddings.embed_query(target) for target in targets])
+        return text_vectors @ target_vectors.T
+
+    def coverage(self, facts_to_check, evidence, threshold=COVERAGE_SIMILARITY, min_results=COVERAGE_MIN_RESULTS):
+        """How well the evidence so far speaks to each fact to check.
+
+        Returns one dict per fact: the best snippet similarity ("score"), how many
+        distinct snippets reach `threshold` ("support"), and "covered" once that is
+        at least `min_results`.
+        """
+        snippets = list(dict.fromkeys(record.snippet for record in evidence if not record.error and record.snippet.strip()))
+        if snippets:
+            scores = self.similarity_matrix(snippets, facts_to_check).T
+        else:
+            scores = np.zeros((len(facts_to_check), 0), dtype=np.float32)
+        coverage = []
+        for fact, fact_scores in zip(facts_to_check, scores):
+            support = int((fact_scores >= threshold).sum())
+            coverage.append({
+                "fact": fact,
+                "score": round(float(fact_scores.max()), 4) if fact_scores.size else 0.0,
+                "support": support,
+                "covered": support >= min_results,
+            })
+        return coverage
+
+    def compact(self, claim, evidence, facts_to_check=()):
+        """Returns (selected records in their original order, report dict)."""
+        dropped = []
+        candidates = []
+        seen_urls, seen_texts = set(), set()
+        for record in evidence:
+            text_key = " ".join(re.findall(r"\w+", record.snippet.lower()))
+            if record.error or not text_key:
+                dropped.append(self._dropped(record, "error" if record.error else "empty"))
+            elif (record.url and record.url in seen_urls) or text_key in seen_texts:
+                dropped.append(self._dropped(record, "duplicate")) # Same result returned for several queries
+            else:
+                seen_urls.add(record.url)
+                seen_texts.add(text_key)
+                candidates.append(record)
+
+        report = {"token_budget": self.token_budget, "candidates": len(evidence), "selected": 0, "tokens_used": 0, "dropped": dropped}
+        if not candidates:
+            return [], report
+
+        snippet_vectors = self._normalize(self.embeddings.embed_documents([record.snippet for record in candidates]))
+        targets = [claim] + [fact for fact in facts_to_check if fact]
+        target_vectors = self._normalize([self.embeddings.embed_query(target) for target in targets])
+        # Relevant if it speaks to the claim or to any one of its sub-facts
+        scores = (snippet_vectors @ target_vectors.T).max(axis=1)
+
+        selected = set()
+        kept_rows = []
+        tokens_used = 0
+        for row in np.argsort(-scores):
+            record, score = candidates[row], float(scores[row])
+            if kept_rows and float((snippet_vectors[kept_rows] @ snippet_vectors[row]).max()) >= NEAR_DUPLICATE_SIMILARITY:
+                dropped.append(self._dropped(record, "near_duplicate", score))
+                continue
+            tokens = self.estimate_tokens(record)
+            if self.token_budget and tokens_used + tokens > self.token_budget:
+                dropped.append(self._dropped(record, "over_budget", score))
+                continue # A shorter, less relevant snippet may still fit
+            tokens_used += tokens
+            kept_rows.append(row)
+            selected.add(id(record))
+
+        report["selected"] = len(kept_rows)
+        report["tokens_used"] = tokens_used
+        return [record for record in evidence if id(record) in selected], report
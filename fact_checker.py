@@ -1,28 +1,177 @@
+import asyncio
 import re
+import threading
 import time
-import random
 import json # For the fallback in process_claim, though verdict_generator handles primary JSON
-from langchain.prompts import PromptTemplate
-from langchain.schema.output_parser import StrOutputParser
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from llm_utils import init_llm, init_search_tool
-from source_evaluator import SourceEvaluator
-from knowledge_base import KnowledgeBase
-from verdict_generator import EnhancedVerdictGenerator
+import numpy as np
+
+from llm_utils import init_llm, init_search_tool, cache_llm, RateLimiter
 from cache_manager import CacheManager
+from evidence import EvidenceRecord
+from streaming_json import IncrementalJSONParser
+from single_flight import Abandoned, SingleFlight
+from tracing import Trace, TraceMetrics
+
+# Text form of verdicts learned into the knowledge base (see _fact_to_learn)
+VERDICT_FACT_PREFIXES = {"It is true that: ": "True", "It is false that: ": "False"}
 
 class FactChecker:
-    def __init__(self):
-        self.llm = init_llm()
-        self.search_tool = init_search_tool()
-        self.cache_manager = CacheManager()
-        
-        self.source_evaluator = SourceEvaluator(self.llm)
-        self.knowledge_base = KnowledgeBase() # Consider passing embeddings model name if configurable
-        
-        self.setup_claim_analyzer()
-        # EnhancedVerdictGenerator is initialized in setup_verdict_generator
-        self.setup_verdict_generator() 
+    # Heavy components (LLM client, search wrapper, embedding model, Chroma, LangChain chains)
+    # are built on first use or by warmup(), so constructing a FactChecker is cheap and a
+    # cached verdict can be served before the models have finished loading.
+    LAZY_COMPONENTS = ("llm", "search_tool", "knowledge_base", "source_evaluator", "claim_analyzer", "verdict_generator", "evidence_compactor")
+
+    def __init__(self, max_search_workers=4, search_rate=2.0, search_burst=4, search_max_results=5, semantic_cache_threshold=0.92,
+                 kb_index_backend="chroma", kb_fast_path_threshold=0.92, evidence_token_budget=800, llm_cache=True, llm_cache_ttls=None,
+                 trace_log=None, llm=None, search_tool=None, embeddings=None, adaptive_search=True, initial_search_queries=2,
+                 max_search_queries=6, coverage_threshold=0.5):
+        construct_start = time.perf_counter()
+        self.startup_timings = {} # Component name -> seconds spent importing and constructing it
+        self._components = {}
+        self._component_locks = {name: threading.Lock() for name in self.LAZY_COMPONENTS}
+        # Ready-made stand-ins (e.g. the offline fakes in benchmarks/) replace the LLM client,
+        # search wrapper and embedding model that would otherwise be built on first use
+        for name, component in (("llm", llm), ("search_tool", search_tool)):
+            if component is not None:
+                self._components[name] = component
+        self.embeddings = embeddings
+        self.ready = threading.Event() # Set once warmup() has loaded every component
+        self.warmup_error = None
+
+        # Searches for all queries of a claim are dispatched at once; the shared limiter
+        # replaces the old per-query sleep and also throttles across concurrent claims.
+        self.max_search_workers = max_search_workers
+        self.search_max_results = search_max_results
+        self.search_rate_limiter = RateLimiter(rate=search_rate, burst=search_burst)
+        self.cache_manager = self._timed("cache_manager", CacheManager)
+        # Paraphrased repeats are served from the verdict cache when the claim embedding's cosine
+        # similarity to a previously checked claim reaches this threshold (None disables the tier).
+        self.semantic_cache_threshold = semantic_cache_threshold
+        self.kb_index_backend = kb_index_backend # "chroma" or "numpy" (in-process matrix index)
+        # A claim this similar to one with a verdict already stored in the knowledge base is answered
+        # from that verdict, skipping analysis, search and the verdict LLM (None or 0 disables).
+        self.kb_fast_path_threshold = kb_fast_path_threshold
+        # Search results are deduplicated and ranked by relevance, and only the best that fit in
+        # this many (estimated) tokens go into the verdict prompt (None sends everything).
+        self.evidence_token_budget = evidence_token_budget
+        # Evidence is searched in rounds: the first initial_search_queries analysis queries (capped at
+        # max_search_queries), then follow-ups only for "Facts to Check" items that fewer than two
+        # distinct results speak to (cosine similarity >= coverage_threshold), until every fact is
+        # covered or max_search_queries have run. adaptive_search=False always runs the first three queries.
+        self.adaptive_search = adaptive_search
+        self.initial_search_queries = initial_search_queries
+        self.max_search_queries = max_search_queries
+        self.coverage_threshold = coverage_threshold
+        # Each chain talks to the LLM through a prompt-level cache (see llm_cache.py);
+        # llm_cache_ttls overrides DEFAULT_LLM_CACHE_TTLS per chain name.
+        self.llm_cache = llm_cache
+        self.llm_cache_ttls = llm_cache_ttls or {}
+        # Every checked claim gets a per-stage trace (result["trace"]); the aggregate is
+        # exported in Prometheus format and, with trace_log set, as JSON lines.
+        self.trace_metrics = TraceMetrics(trace_log=trace_log)
+        # One FactChecker may serve many threads (app sessions, service workers, batch mode). Identical
+        # claims and identical search queries that arrive while one is already being worked on wait
+        # for that run instead of repeating it.
+        self.claim_flight = SingleFlight()
+        self.search_flight = SingleFlight()
+        self.startup_timings["fact_checker (eager part)"] = time.perf_counter() - construct_start
+
+    def _timed(self, name, factory):
+        start_time = time.perf_counter()
+        component = factory()
+        self.startup_timings[name] = time.perf_counter() - start_time
+        return component
+
+    def _load(self, name, factory):
+        component = self._components.get(name)
+        if component is None:
+            with self._component_locks[name]:
+                component = self._components.get(name)
+                if component is None:
+                    component = self._timed(name, factory)
+                    self._components[name] = component
+        return component
+
+    @property
+    def llm(self):
+        return self._load("llm", init_llm)
+
+    @property
+    def search_tool(self):
+        return self._load("search_tool", init_search_tool)
+
+    @property
+    def knowledge_base(self):
+        return self._load("knowledge_base", self._create_knowledge_base)
+
+    @property
+    def source_evaluator(self):
+        return self._load("source_evaluator", self._create_source_evaluator)
+
+    @property
+    def claim_analyzer(self):
+        return self._load("claim_analyzer", self.setup_claim_analyzer)
+
+    @property
+    def verdict_generator(self):
+        return self._load("verdict_generator", self.setup_verdict_generator)
+
+    @property
+    def evidence_compactor(self):
+        return self._load("evidence_compactor", self._create_evidence_compactor)
+
+    # Modules that pull in LangChain / Chroma are imported inside the factories so that
+    # importing fact_checker stays cheap.
+    def _create_knowledge_base(self):
+        from knowledge_base import KnowledgeBase
+        return KnowledgeBase(index_backend=self.kb_index_backend, embeddings=self.embeddings) # Consider passing embeddings model name if configurable
+
+    def _create_evidence_compactor(self):
+        from evidence_compactor import EvidenceCompactor
+        return EvidenceCompactor(self.knowledge_base.embeddings, token_budget=self.evidence_token_budget)
+
+    def _chain_llm(self, chain):
+        # Wrapped even with caching off, so LLM token counts still reach the trace
+        cache_manager = self.cache_manager if self.llm_cache else None
+        return cache_llm(self.llm, cache_manager, chain, ttl=self.llm_cache_ttls.get(chain))
+
+    def _create_source_evaluator(self):
+        from source_evaluator import SourceEvaluator
+        return SourceEvaluator(self._chain_llm("source_evaluation"))
+
+    def warmup(self, background=True):
+        """Loads every lazy component, including the embedding model and vector store.
+
+        With background=True this returns immediately; `self.ready` is set when done.
+        """
+        if background:
+            threading.Thread(target=self.warmup, kwargs={"background": False}, daemon=True).start()
+            return self.ready
+        try:
+            for name in self.LAZY_COMPONENTS:
+                getattr(self, name)
+            self.knowledge_base.load()
+        except Exception as e:
+            self.warmup_error = e
+            print(f"Warm-up failed: {e}")
+        finally:
+            self.ready.set()
+        return self.ready
+
+    def startup_report(self):
+        lines = ["Startup timings (import + construction, nested loads included):"]
+        timings = dict(self.startup_timings)
+        knowledge_base = self._components.get("knowledge_base")
+        if knowledge_base is not None:
+            timings.update({f"knowledge_base.{name}": seconds for name, seconds in knowledge_base.load_timings.items()})
+        for name, seconds in timings.items():
+            lines.append(f"  {name:<36} {seconds * 1000:9.1f} ms")
+        not_loaded = [name for name in self.LAZY_COMPONENTS if name not in self._components]
+        if not_loaded:
+            lines.append(f"  not loaded yet: {', '.join(not_loaded)}")
+        return "\n".join(lines)
     
     def setup_claim_analyzer(self):
         claim_template = """
@@ -49,28 +198,195 @@ class FactChecker:
         - "<Query 3>"
         """
         # Removed the 5-7 query constraint, 3-5 is more typical for initial search
+        from langchain.prompts import PromptTemplate
+        from langchain.schema.output_parser import StrOutputParser
         
         claim_prompt = PromptTemplate(template=claim_template, input_variables=["claim"])
-        self.claim_analyzer = claim_prompt | self.llm | StrOutputParser()
+        return claim_prompt | self._chain_llm("claim_analysis") | StrOutputParser()
     
     def setup_verdict_generator(self):
-        self.verdict_generator = EnhancedVerdictGenerator(
-            self.llm, 
+        from verdict_generator import EnhancedVerdictGenerator
+        return EnhancedVerdictGenerator(
+            self._chain_llm("verdict"),
             self.source_evaluator, 
             self.knowledge_base
         )
     
-    def process_claim(self, claim):
-        cached_result = self.cache_manager.get_verdict(claim)
-        if cached_result:
-            print("Using cached verdict for claim.")
-            return cached_result
-            
-        print(f"\nProcessing claim: {claim}")
-        analysis_result_str = self.claim_analyzer.invoke({"claim": claim})
-        print("1. Claim Analysis Complete.")
-        print(f"   Analysis: {analysis_result_str[:200]}...") # Print snippet
-        
+    def close(self):
+        # Flushes the knowledge base's pending writes; call once when shutting down
+        knowledge_base = self._components.get("knowledge_base")
+        if knowledge_base is not None:
+            knowledge_base.close()
+
+    def _fetch_search(self, query):
+        self.search_rate_limiter.acquire() # Time spent waiting for the limiter shows up in the span
+        start_time = time.perf_counter()
+        results = self.search_tool.results(query, self.search_max_results)
+        return results, time.perf_counter() - start_time
+
+    async def _afetch_search(self, query):
+        await self.search_rate_limiter.aacquire()
+        start_time = time.perf_counter()
+        results = await asyncio.to_thread(self.search_tool.results, query, self.search_max_results)
+        return results, time.perf_counter() - start_time
+
+    def _run_search(self, query, trace):
+        with trace.span("search", query=query) as span:
+            search, shared = self.search_flight.do(query, self._fetch_search, query)
+            span.cache_hit = shared # Joined another claim's identical search
+            return search
+
+    def _to_evidence_records(self, query, search_results, search_time=0.0, cache_hit=False):
+        if isinstance(search_results, str): # Search results cached before evidence was structured
+            return [EvidenceRecord(query=query, snippet=search_results, search_time=search_time, cache_hit=cache_hit)]
+        records = []
+        for item in search_results:
+            url = item.get("link", "")
+            records.append(EvidenceRecord(
+                query=query,
+                snippet=item.get("snippet") or item.get("Result", ""), # "Result" holds DuckDuckGo's no-result message
+                url=url,
+                domain=self.source_evaluator.extract_domain(url) if url else "unknown",
+                title=item.get("title", ""),
+                search_time=search_time,
+                cache_hit=cache_hit
+            ))
+        return records or [EvidenceRecord(query=query, snippet="No results found.", search_time=search_time, cache_hit=cache_hit)]
+
+    def _search_error_record(self, query, e):
+        print(f"      Error searching for '{query}': {e}")
+        return EvidenceRecord(query=query, snippet=f"Error during search: {str(e)}", error=str(e))
+
+    def _cached_search_records(self, query, cached_search, trace):
+        with trace.span("search", query=query) as span:
+            span.cache_hit = True
+            return self._to_evidence_records(query, cached_search, cache_hit=True)
+
+    def retrieve_evidence(self, queries, trace=None):
+        trace = trace or Trace() # One "search" span per query
+        unique_queries = list(dict.fromkeys(queries)) # To avoid redundant searches if LLM repeats queries
+        records_by_query = {}
+        pending_queries = []
+        for query in unique_queries:
+            print(f"   Searching for: {query[:70]}...")
+            cached_search = self.cache_manager.get_search_result(query)
+            if cached_search:
+                records_by_query[query] = self._cached_search_records(query, cached_search, trace)
+            else:
+                pending_queries.append(query)
+
+        if pending_queries:
+            workers = max(1, min(self.max_search_workers, len(pending_queries)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(self._run_search, query, trace): query for query in pending_queries}
+                for future in as_completed(futures):
+                    query = futures[future]
+                    try:
+                        search_results, search_time = future.result()
+                        # Cache writes stay on this thread, filled in completion order
+                        self.cache_manager.cache_search_result(query, search_results)
+                        records_by_query[query] = self._to_evidence_records(query, search_results, search_time)
+                    except Exception as e:
+                        records_by_query[query] = [self._search_error_record(query, e)]
+
+        # Assemble in the original query order regardless of completion order
+        return [record for query in unique_queries for record in records_by_query[query]]
+
+    async def _arun_search(self, query, semaphore, trace):
+        print(f"   Searching for: {query[:70]}...")
+        # Cache reads and writes are SQLite calls, so they run off the event loop like the search itself
+        cached_search = await asyncio.to_thread(self.cache_manager.get_search_result, query)
+        if cached_search:
+            return self._cached_search_records(query, cached_search, trace)
+        async with semaphore:
+            try:
+                with trace.span("search", query=query) as span:
+                    (search_results, search_time), shared = await self.search_flight.ado(query, self._afetch_search, query)
+                    span.cache_hit = shared
+                    await asyncio.to_thread(self.cache_manager.cache_search_result, query, search_results)
+                    return self._to_evidence_records(query, search_results, search_time)
+            except Exception as e:
+                return [self._search_error_record(query, e)]
+
+    def _follow_up_queries(self, uncovered, queries, used, limit):
+        # Per uncovered fact, the first not yet run of: an analysis query about that fact, the fact
+        # itself, then the analysis query closest to it
+        remaining = [query for query in dict.fromkeys(queries) if query not in used]
+        facts = [item["fact"] for item in uncovered]
+        similarity = self.evidence_compactor.similarity_matrix(remaining, facts) if remaining else np.zeros((0, len(facts)))
+        follow_ups = []
+        for column, fact in enumerate(facts):
+            ranked = [remaining[row] for row in np.argsort(-similarity[:, column])]
+            related = ranked[:int((similarity[:, column] >= self.coverage_threshold).sum())]
+            fact_query = fact.rstrip("?").strip() # Facts to check are often phrased as questions
+            for query in related + [fact_query] + ranked:
+                if query not in used and query not in follow_ups:
+                    follow_ups.append(query)
+                    break
+        return follow_ups[:limit]
+
+    def _retrieval_round(self, facts, queries, used, evidence, rounds, trace):
+        """Scores coverage after a round of searches. Returns (queries for the next round, retrieval report); no queries means stop."""
+        with trace.span("coverage", round=rounds):
+            coverage = self.evidence_compactor.coverage(facts, evidence, self.coverage_threshold)
+            uncovered = [item for item in coverage if not item["covered"]]
+            next_queries = []
+            if not uncovered:
+                stop_reason = "covered"
+            elif len(used) >= self.max_search_queries:
+                stop_reason = "max_queries"
+            else:
+                next_queries = self._follow_up_queries(uncovered, queries, used, self.max_search_queries - len(used))
+                stop_reason = None if next_queries else "no_queries"
+        report = {"queries": list(used), "rounds": rounds, "stop_reason": stop_reason, "coverage": coverage}
+        return next_queries, report
+
+    def _search_plan(self, claim, analysis_result_str):
+        queries = self._extract_search_queries(analysis_result_str, claim)
+        facts = self._extract_facts_to_check(analysis_result_str) or [claim]
+        # The first round counts against max_search_queries too
+        first_round = max(1, min(self.initial_search_queries, self.max_search_queries))
+        return queries, facts, list(dict.fromkeys(queries))[:first_round]
+
+    def _log_retrieval(self, report):
+        covered = sum(item["covered"] for item in report["coverage"])
+        print(f"   Searched {len(report['queries'])} queries in {report['rounds']} round(s); "
+              f"{covered}/{len(report['coverage'])} facts to check covered ({report['stop_reason']}).")
+
+    def gather_evidence(self, claim, analysis_result_str, trace=None):
+        """Returns (evidence, retrieval report or None when adaptive search is off)."""
+        trace = trace or Trace()
+        if not self.adaptive_search:
+            return self.retrieve_evidence(self._extract_search_queries(analysis_result_str, claim)[:3], trace), None
+        queries, facts, batch = self._search_plan(claim, analysis_result_str)
+        evidence, used, rounds = [], [], 0
+        while batch:
+            evidence += self.retrieve_evidence(batch, trace)
+            used += batch
+            rounds += 1
+            batch, report = self._retrieval_round(facts, queries, used, evidence, rounds, trace)
+        self._log_retrieval(report)
+        return evidence, report
+
+    async def agather_evidence(self, claim, analysis_result_str, trace):
+        queries, facts, batch = self._search_plan(claim, analysis_result_str)
+        if not self.adaptive_search:
+            batch = list(dict.fromkeys(queries[:3]))
+        semaphore = asyncio.Semaphore(self.max_search_workers)
+        evidence, used, rounds, report = [], [], 0, None
+        while batch:
+            records_per_query = await asyncio.gather(*(self._arun_search(query, semaphore, trace) for query in batch))
+            evidence += [record for records in records_per_query for record in records]
+            used += batch
+            rounds += 1
+            if not self.adaptive_search:
+                break
+            batch, report = await asyncio.to_thread(self._retrieval_round, facts, queries, used, evidence, rounds, trace)
+        if report:
+            self._log_retrieval(report)
+        return evidence, report
+
+    def _extract_search_queries(self, analysis_result_str, claim):
         # Extract search queries robustly
         # Original regex: r'- "(.*)"' might miss queries not in quotes.
         # More robust: find lines starting with '-' under "Search Queries:"
@@ -92,52 +408,366 @@ class FactChecker:
             search_queries = [claim] # Fallback to searching the claim itself
 
         print(f"   Extracted {len(search_queries)} search queries: {search_queries[:3]}")
+        return search_queries
 
-        evidence_parts = []
-        unique_queries_processed = set() # To avoid redundant searches if LLM repeats queries
-        
-        # Limit queries to a reasonable number, e.g., first 3-5 unique ones
-        for query in search_queries[:3]: 
-            if query in unique_queries_processed:
+    def _extract_facts_to_check(self, analysis_result_str):
+        # The "- " lines between "Facts to Check:" and "Search Queries:" in the analysis
+        section = analysis_result_str.split("Facts to Check:", 1)[1] if "Facts to Check:" in analysis_result_str else ""
+        section = section.split("Search Queries:", 1)[0]
+        return [line.strip()[1:].strip() for line in section.splitlines() if line.strip().startswith("-") and line.strip()[1:].strip()]
+
+    def _compact_evidence(self, claim, analysis_result_str, evidence):
+        """Returns (evidence for the verdict prompt, budget report or None when compaction is off)."""
+        if self.evidence_token_budget is None or not evidence:
+            return evidence, None
+        prompt_evidence, report = self.evidence_compactor.compact(claim, evidence, self._extract_facts_to_check(analysis_result_str))
+        print(f"   Evidence budget: kept {report['selected']} of {report['candidates']} results "
+              f"(~{report['tokens_used']}/{report['token_budget']} tokens, {len(report['dropped'])} dropped)")
+        return prompt_evidence, report
+
+    def _fact_to_learn(self, claim, verdict_json):
+        # Add high-confidence facts to knowledge base. Returns (fact, metadata) or None; the
+        # metadata lets the knowledge-base fast path answer the claim again later.
+        if isinstance(verdict_json, dict) and verdict_json.get("confidence_score", 0) >= 75:
+            verdict_status = verdict_json.get("verdict", "").lower()
+            if verdict_status in ("true", "false"):
+                metadata = {"claim": claim, "verdict": verdict_status.capitalize(), "confidence_score": verdict_json["confidence_score"]}
+                return f"It is {verdict_status} that: {claim}", metadata
+        return None
+
+    def _stored_verdict(self, doc):
+        # (claim, verdict, confidence or None) for knowledge-base entries that record a verdict
+        metadata = doc.metadata or {}
+        if metadata.get("claim") and metadata.get("verdict"):
+            return metadata["claim"], metadata["verdict"], metadata.get("confidence_score")
+        for prefix, verdict in VERDICT_FACT_PREFIXES.items():
+            if doc.page_content.startswith(prefix): # Learned before verdict metadata was stored
+                return doc.page_content[len(prefix):], verdict, None
+        return None
+
+    def _knowledge_base_lookup(self, claim, claim_embedding):
+        """Answers the claim from a stored verdict for a near-identical claim, or returns None."""
+        knowledge_base = self.knowledge_base
+        hits = knowledge_base.query_knowledge_base_with_scores(claim, k=5, embedding=claim_embedding)
+        signature = knowledge_base.statement_signature(claim)
+        claim_vector = np.asarray(claim_embedding, dtype=np.float32)
+        claim_vector /= max(float(np.linalg.norm(claim_vector)), 1e-12)
+        matches = []
+        for doc, _ in hits:
+            stored = self._stored_verdict(doc)
+            if not stored or knowledge_base.statement_signature(stored[0]) != signature:
                 continue
-            unique_queries_processed.add(query)
+            # Scored claim against claim, without the "It is true that:" wrapper diluting the match
+            stored_vector = np.asarray(self._embed_claim(stored[0]), dtype=np.float32)
+            score = float(claim_vector @ stored_vector) / max(float(np.linalg.norm(stored_vector)), 1e-12)
+            if score >= self.kb_fast_path_threshold:
+                matches.append((score, doc.page_content) + stored)
+        if not matches:
+            return None
+        if len({match[3].lower() for match in matches}) > 1:
+            print("Knowledge base holds conflicting verdicts for this claim; running the full check.")
+            return None
+        score, fact, stored_claim, verdict, confidence = max(matches, key=lambda match: match[0])
+        print(f"Answering from knowledge base (score {score:.3f}): {fact}")
+        return {
+            "claim": claim,
+            "analysis": f"Answered from the knowledge base without web search: matches the previously verified claim \"{stored_claim}\".",
+            "evidence": [],
+            "verdict": {
+                "verdict": verdict,
+                "confidence_score": confidence if confidence is not None else 75, # Only verdicts with >= 75 are learned
+                "confidence_reasoning": f"Reuses the stored verdict of a claim with similarity {score:.3f}.",
+                "explanation": f"This claim matches a fact already verified and stored in the knowledge base: \"{fact}\"",
+                "key_evidence_points": [fact],
+                "supporting_sources_domains": [],
+                "contradicting_evidence_points": [],
+                "knowledge_base_relevance": "The verdict was taken directly from the knowledge base."
+            },
+            "kb_fast_path": True,
+            "knowledge_base_match": {"fact": fact, "matched_claim": stored_claim, "score": round(score, 4)}
+        }
 
-            print(f"   Searching for: {query[:70]}...")
-            cached_search = self.cache_manager.get_search_result(query)
-            if cached_search:
-                search_output = cached_search
-            else:
-                try:
-                    search_output = self.search_tool.run(query)
-                    self.cache_manager.cache_search_result(query, search_output)
-                    time.sleep(random.uniform(1.0, 2.0)) # Shorter delay, adjust if rate limited
-                except Exception as e:
-                    search_output = f"Error during search: {str(e)}"
-                    print(f"      Error searching for '{query}': {e}")
-            evidence_parts.append(f"Query: {query}\nResult:\n{search_output}\n---")
-        
-        combined_evidence = "\n\n".join(evidence_parts)
-        print("2. Evidence Retrieval Complete.")
-        if not combined_evidence:
-            combined_evidence = "No evidence gathered from web search."
+    def _embed_claim(self, claim):
+        # Same sentence-transformer model the knowledge base uses
+        return self.knowledge_base.embeddings.embed_query(claim)
+
+    def _semantic_cache_lookup(self, claim, claim_embedding):
+        match = self.cache_manager.get_similar_verdict(claim_embedding, self.semantic_cache_threshold, claim=claim)
+        if not match:
+            return None
+        cached_result, matched_claim, score = match
+        print(f"Using cached verdict for similar claim (score {score:.3f}).")
+        result = dict(cached_result)
+        result["claim"] = claim
+        result["semantic_cache_match"] = {"matched_claim": matched_claim, "score": round(score, 4)}
+        # Repeats of this wording are then exact hits. No embedding: the matched claim already covers it.
+        self.cache_manager.cache_verdict(claim, result)
+        return result
+
+    def _lookup_existing(self, claim, trace):
+        """Returns (result or None, claim embedding): exact cache, semantic cache, then the knowledge-base fast path."""
+        with trace.span("verdict_cache") as span:
+            cached_result = self.cache_manager.get_verdict(claim)
+            span.cache_hit = bool(cached_result)
+        if cached_result:
+            print("Using cached verdict for claim.")
+            return cached_result, None
+
+        claim_embedding = None
+        if self.semantic_cache_threshold is not None or self.kb_fast_path_threshold:
+            with trace.span("embed_claim"):
+                claim_embedding = self._embed_claim(claim)
+        if self.semantic_cache_threshold is not None:
+            with trace.span("semantic_cache") as span:
+                similar_result = self._semantic_cache_lookup(claim, claim_embedding)
+                span.cache_hit = bool(similar_result)
+            if similar_result:
+                return similar_result, claim_embedding
+        if self.kb_fast_path_threshold:
+            with trace.span("kb_fast_path") as span:
+                kb_result = self._knowledge_base_lookup(claim, claim_embedding)
+                span.cache_hit = bool(kb_result)
+            if kb_result:
+                self.cache_manager.cache_verdict(claim, kb_result, embedding=claim_embedding)
+                return kb_result, claim_embedding
+        return None, claim_embedding
+
+    def _learn_verdict(self, claim, verdict_json, trace):
+        learned = self._fact_to_learn(claim, verdict_json)
+        if learned:
+            with trace.span("kb_insert"):
+                self.knowledge_base.add_fact(*learned)
+
+    def _finish_trace(self, result, trace):
+        # Attached to a copy after caching, so a cached result never carries a stale trace
+        trace_dict = trace.to_dict()
+        self.trace_metrics.observe(trace_dict)
+        return dict(result, trace=trace_dict)
+
+    def _joined_result(self, result, trace):
+        # This caller waited on another caller's run of the same claim: one span for the wait, then its result
+        span = trace.record("single_flight", joined_trace=result.get("trace", {}).get("trace_id"))
+        span.cache_hit = True
+        return self._finish_trace(result, trace)
+
+    def process_claim(self, claim):
+        trace = Trace(claim)
+        result, shared = self.claim_flight.do(claim, self._process_claim, claim, trace)
+        return self._joined_result(result, trace) if shared else result
+
+    def _process_claim(self, claim, trace):
+        existing_result, claim_embedding = self._lookup_existing(claim, trace)
+        if existing_result:
+            return self._finish_trace(existing_result, trace)
+
+        print(f"\nProcessing claim: {claim}")
+        with trace.span("analysis"):
+            analysis_result_str = self.claim_analyzer.invoke({"claim": claim})
+        print("1. Claim Analysis Complete.")
+        print(f"   Analysis: {analysis_result_str[:200]}...") # Print snippet
         
-        verdict_json = self.verdict_generator.generate_verdict(claim, combined_evidence)
+        evidence, retrieval = self.gather_evidence(claim, analysis_result_str, trace)
+        print(f"2. Evidence Retrieval Complete. ({len(evidence)} results)")
+        with trace.span("ranking"):
+            prompt_evidence, evidence_budget = self._compact_evidence(claim, analysis_result_str, evidence)
+
+        # Sources and the KB are looked up here rather than inside generate_verdict so each gets its own span
+        with trace.span("sources"):
+            source_evaluations = self.source_evaluator.evaluate_sources(self.verdict_generator.select_sources_for_evaluation(prompt_evidence))
+        with trace.span("knowledge_base"):
+            knowledge_facts_list = self.knowledge_base.query_knowledge_base(claim)
+        with trace.span("verdict"):
+            verdict_json = self.verdict_generator.generate_verdict(claim, prompt_evidence, source_evaluations, knowledge_facts_list)
         print("3. Verdict Generation Complete.")
         
-        # Add high-confidence facts to knowledge base
-        if isinstance(verdict_json, dict) and verdict_json.get("confidence_score", 0) >= 75:
-            verdict_status = verdict_json.get("verdict", "").lower()
-            if verdict_status == "true":
-                self.knowledge_base.add_fact(f"It is true that: {claim}")
-            elif verdict_status == "false":
-                self.knowledge_base.add_fact(f"It is false that: {claim}")
+        self._learn_verdict(claim, verdict_json, trace)
         
         final_result = {
             "claim": claim,
             "analysis": analysis_result_str,
-            "evidence": combined_evidence,
+            "evidence": evidence, # List of EvidenceRecord; render_evidence() gives the text form
+            "evidence_budget": evidence_budget, # What the verdict prompt kept and dropped (None if off)
+            "retrieval": retrieval, # Queries run, rounds, stop reason and per-fact coverage (None if adaptive search is off)
             "verdict": verdict_json # This is already a dict from EnhancedVerdictGenerator
         }
         
-        self.cache_manager.cache_verdict(claim, final_result)
-        return final_result
\ No newline at end of file
+        self.cache_manager.cache_verdict(claim, final_result, embedding=claim_embedding)
+        return self._finish_trace(final_result, trace)
+
+    def stream_claim(self, claim):
+        """Generator version of process_claim for progressive display. Yields event dicts keyed by "type":
+
+        stage       -- {"stage", "status": "started"/"done", "elapsed"} for analysis, search, sources, knowledge_base, verdict
+        analysis    -- {"analysis"}: the claim analysis text
+        evidence    -- {"evidence", "evidence_budget", "retrieval"}: list of EvidenceRecord, and how it was selected and searched
+        token       -- {"text"}: raw verdict LLM output as it arrives
+        field       -- {"name", "value"}: a top-level verdict field that just completed (verdict, confidence_score, ...)
+        field_delta -- {"name", "text"}: newly generated text of a verdict string field
+        result      -- {"result"}: what process_claim would return; always the last event
+
+        Cached and knowledge-base answers produce only the result event, and so does joining
+        a check of the same claim that is already running (from any entry point).
+        """
+        trace = Trace(claim)
+        while True:
+            future, leader = self.claim_flight.join(claim)
+            if leader:
+                break
+            try:
+                result = future.result()
+            except Abandoned:
+                continue
+            yield {"type": "result", "result": self._joined_result(result, trace)}
+            return
+
+        result = error = None
+        try:
+            for event in self._stream_claim(claim, trace):
+                if event["type"] == "result":
+                    result = event["result"]
+                yield event
+        except BaseException as e: # Including GeneratorExit when the consumer stops early
+            error = e
+            raise
+        finally:
+            self.claim_flight.finish(claim, future, result, None if result is not None else error)
+
+    def _stream_claim(self, claim, trace):
+        existing_result, claim_embedding = self._lookup_existing(claim, trace)
+        if existing_result:
+            yield {"type": "result", "result": self._finish_trace(existing_result, trace)}
+            return
+
+        def stage(name, status, start_time=None):
+            return {"type": "stage", "stage": name, "status": status,
+                    "elapsed": time.perf_counter() - start_time if start_time is not None else 0.0}
+
+        print(f"\nProcessing claim: {claim}")
+        start_time = time.perf_counter()
+        yield stage("analysis", "started")
+        with trace.span("analysis"):
+            analysis_result_str = self.claim_analyzer.invoke({"claim": claim})
+        yield stage("analysis", "done", start_time)
+        yield {"type": "analysis", "analysis": analysis_result_str}
+
+        start_time = time.perf_counter()
+        yield stage("search", "started")
+        evidence, retrieval = self.gather_evidence(claim, analysis_result_str, trace)
+        yield stage("search", "done", start_time)
+
+        start_time = time.perf_counter()
+        yield stage("ranking", "started")
+        with trace.span("ranking"):
+            prompt_evidence, evidence_budget = self._compact_evidence(claim, analysis_result_str, evidence)
+        yield stage("ranking", "done", start_time)
+        yield {"type": "evidence", "evidence": evidence, "evidence_budget": evidence_budget, "retrieval": retrieval}
+
+        start_time = time.perf_counter()
+        yield stage("sources", "started")
+        with trace.span("sources"):
+            source_evaluations = self.source_evaluator.evaluate_sources(self.verdict_generator.select_sources_for_evaluation(prompt_evidence))
+        yield stage("sources", "done", start_time)
+
+        start_time = time.perf_counter()
+        yield stage("knowledge_base", "started")
+        with trace.span("knowledge_base"):
+            knowledge_facts_list = self.knowledge_base.query_knowledge_base(claim)
+        yield stage("knowledge_base", "done", start_time)
+
+        start_time = time.perf_counter()
+        yield stage("verdict", "started")
+        parser = IncrementalJSONParser()
+        streamed = {} # Field name -> text already sent as field_delta
+        chunks = []
+        # The span stays open across the yields below, so it includes the time the consumer spends rendering tokens
+        with trace.span("verdict"):
+            for chunk in self.verdict_generator.stream_verdict(claim, prompt_evidence, source_evaluations, knowledge_facts_list):
+                chunks.append(chunk)
+                yield {"type": "token", "text": chunk}
+                for name, value in parser.feed(chunk).items():
+                    if isinstance(value, str) and value[len(streamed.get(name, "")):]:
+                        yield {"type": "field_delta", "name": name, "text": value[len(streamed.get(name, "")):]}
+                    yield {"type": "field", "name": name, "value": value}
+                if parser.partial_key and parser.partial_value[len(streamed.get(parser.partial_key, "")):]:
+                    yield {"type": "field_delta", "name": parser.partial_key, "text": parser.partial_value[len(streamed.get(parser.partial_key, "")):]}
+                    streamed[parser.partial_key] = parser.partial_value
+            verdict_json = self.verdict_generator.parse_verdict_output("".join(chunks))
+        yield stage("verdict", "done", start_time)
+
+        self._learn_verdict(claim, verdict_json, trace)
+        final_result = {
+            "claim": claim,
+            "analysis": analysis_result_str,
+            "evidence": evidence,
+            "evidence_budget": evidence_budget,
+            "retrieval": retrieval,
+            "verdict": verdict_json
+        }
+        self.cache_manager.cache_verdict(claim, final_result, embedding=claim_embedding)
+        yield {"type": "result", "result": self._finish_trace(final_result, trace)}
+
+    async def aprocess_claim(self, claim):
+        trace = Trace(claim)
+        result, shared = await self.claim_flight.ado(claim, self._aprocess_claim, claim, trace)
+        return self._joined_result(result, trace) if shared else result
+
+    async def _aprocess_claim(self, claim, trace):
+        # The cache and fast-path lookups block (SQLite, embedding model), so they run off the event loop
+        existing_result, claim_embedding = await asyncio.to_thread(self._lookup_existing, claim, trace)
+        if existing_result:
+            return self._finish_trace(existing_result, trace)
+
+        async def query_knowledge_base():
+            # Runs as its own task, so its span overlaps the analysis and search spans
+            with trace.span("knowledge_base"):
+                return await self.knowledge_base.aquery_knowledge_base(claim)
+
+        print(f"\nProcessing claim: {claim}")
+        # The KB lookup only depends on the claim, so it overlaps with analysis and search
+        kb_task = asyncio.ensure_future(query_knowledge_base())
+        try:
+            with trace.span("analysis"):
+                analysis_result_str = await self.claim_analyzer.ainvoke({"claim": claim})
+            print("1. Claim Analysis Complete.")
+            print(f"   Analysis: {analysis_result_str[:200]}...") # Print snippet
+
+            evidence, retrieval = await self.agather_evidence(claim, analysis_result_str, trace)
+            with trace.span("ranking"):
+                prompt_evidence, evidence_budget = await asyncio.to_thread(self._compact_evidence, claim, analysis_result_str, evidence)
+            # All unknown source domains of the claim are then scored in one batched LLM call
+            with trace.span("sources"):
+                source_evaluations = await self.source_evaluator.aevaluate_sources(
+                    self.verdict_generator.select_sources_for_evaluation(prompt_evidence)
+                )
+            knowledge_facts_list = await kb_task
+        finally:
+            if not kb_task.done():
+                kb_task.cancel()
+
+        print(f"2. Evidence Retrieval Complete. ({len(evidence)} results)")
+
+        with trace.span("verdict"):
+            verdict_json = await self.verdict_generator.agenerate_verdict(
+                claim, prompt_evidence,
+                source_evaluations=source_evaluations,
+                knowledge_facts_list=knowledge_facts_list
+            )
+        print("3. Verdict Generation Complete.")
+
+        learned = self._fact_to_learn(claim, verdict_json)
+        if learned:
+            with trace.span("kb_insert"):
+                await self.knowledge_base.aadd_fact(*learned)
+
+        final_result = {
+            "claim": claim,
+            "analysis": analysis_result_str,
+            "evidence": evidence,
+            "evidence_budget": evidence_budget,
+            "retrieval": retrieval,
+            "verdict": verdict_json
+        }
+
+        # Pickles the result and may evict old entries
+        await asyncio.to_thread(self.cache_manager.cache_verdict, claim, final_result, embedding=claim_embedding)
+        return self._finish_trace(final_result, trace)
@@ -0,0 +1,138 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S" # What app.py stamps on each result
+
+class HistoryStore:
+    """Past fact checks for the app's history sidebar, newest first.
+
+    Every check is appended as two rows: a small summary (claim, verdict, confidence,
+    time) that the sidebar pages through and searches, and the pickled full result
+    in a separate table that is only read when that item is opened. Nothing is
+    trimmed, so the history grows without the old 50-item cap.
+    """
+    def __init__(self, db_path="./cache_data/history.sqlite3", legacy_file="fact_check_history.pkl"):
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock() # One store is shared by all app sessions
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS history_summary (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                claim TEXT NOT NULL,
+                verdict TEXT,
+                confidence INTEGER,
+                created_at REAL NOT NULL
+            )
+        """)
+        # Kept apart so paging and searching summaries never touch the large result blobs
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS history_records (
+                id INTEGER PRIMARY KEY,
+                record BLOB NOT NULL
+            )
+        """)
+        if legacy_file:
+            self._migrate_legacy_pickle(legacy_file)
+
+    def _summary_row(self, result, created_at):
+        verdict = result.get("verdict")
+        if not isinstance(verdict, dict):
+            verdict = {"verdict": str(verdict) if verdict else None}
+        confidence = verdict.get("confidence_score")
+        return (str(result.get("claim", "Unknown Claim")), verdict.get("verdict"),
+                int(confidence) if isinstance(confidence, (int, float)) else None, created_at)
+
+    def _insert(self, result, created_at):
+        cursor = self._conn.execute(
+            "INSERT INTO history_summary (claim, verdict, confidence, created_at) VALUES (?, ?, ?, ?)",
+            self._summary_row(result, created_at)
+        )
+        self._conn.execute("INSERT INTO history_records (id, record) VALUES (?, ?)", (cursor.lastrowid, pickle.dumps(result)))
+        return cursor.lastrowid
+
+    def _migrate_legacy_pickle(self, legacy_file):
+        # One-off import of the old whole-list pickle; it is renamed afterwards
+        if not os.path.exists(legacy_file):
+            return
+        try:
+            with open(legacy_file, 'rb') as f:
+                legacy_history = pickle.load(f)
+            with self._lock:
+                self._conn.execute("BEGIN")
+                try:
+                    for result in legacy_history: # Oldest first, like appends
+                        try:
+                            created_at = datetime.strptime(result.get("timestamp", ""), TIMESTAMP_FORMAT).timestamp()
+                        except (TypeError, ValueError):
+                            created_at = time.time()
+                        self._insert(result, created_at)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            os.replace(legacy_file, legacy_file + ".migrated")
+            print(f"Migrated {len(legacy_history)} history items from {legacy_file} into {self.db_path}.")
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError, ValueError, TypeError) as e:
+            print(f"Warning: Could not migrate history file {legacy_file}. Error: {e}. Ignoring it.")
+
+    def append(self, result):
+        """Stores a finished check and returns its id."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                item_id = self._insert(result, time.time())
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return item_id
+
+    def _where(self, search):
+        if not search:
+            return "", ()
+        # LIKE is case-insensitive for ASCII; % and _ in the search text are matched literally
+        pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return "WHERE claim LIKE ? ESCAPE '\\'", (pattern,)
+
+    def count(self, search=None):
+        where, params = self._where(search)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM history_summary {where}", params).fetchone()[0]
+
+    def page(self, offset=0, limit=20, search=None, claim_chars=80):
+        """Summaries newest first: dicts with id, claim (first claim_chars characters), verdict, confidence, created_at."""
+        where, params = self._where(search)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, substr(claim, 1, ?), verdict, confidence, created_at FROM history_summary {where} "
+                "ORDER BY id DESC LIMIT ? OFFSET ?",
+                (claim_chars, *params, limit, offset)
+            ).fetchall()
+        return [{"id": item_id, "claim": claim, "verdict": verdict, "confidence": confidence, "created_at": created_at}
+                for item_id, claim, verdict, confidence, created_at in rows]
+
+    def get(self, item_id):
+        """The full stored result, or None if it was cleared."""
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM history_records WHERE id = ?", (item_id,)).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM history_summary")
+            self._conn.execute("DELETE FROM history_records")
+            self._conn.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,15 +1,124 @@
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import asyncio
+import atexit
+import csv
+import hashlib
+import json
 import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+INGEST_TEXT_FIELDS = ("fact", "text", "content") # Tried in order when no text field is given
+INDEX_BACKENDS = ("chroma", "numpy")
+# Words that flip or qualify a statement; near-identical embeddings that differ in these are not duplicates
+POLARITY_WORDS = frozenset({"not", "no", "never", "nor", "cannot", "true", "false"})
+COMPACTION_COLUMN_BLOCK = 65536 # Columns of the similarity matrix computed at once during compaction
+MAX_FLUSH_BACKOFF = 300.0 # Seconds; longest wait between background retries of a failing flush
+
+def statement_signature(text):
+    # Negation and numbers. Embeddings of "X is true"/"X is false" or "45th"/"47th" are nearly
+    # identical, so statements are only treated as the same when these also agree.
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    return (frozenset(word for word in words if word in POLARITY_WORDS or word.endswith("n't")),
+            frozenset(word for word in words if any(c.isdigit() for c in word)))
 
 class KnowledgeBase:
-    def __init__(self, embeddings_model="all-MiniLM-L6-v2", persist_directory="./knowledge_base_db"):
-        self.embeddings = HuggingFaceEmbeddings(model_name=embeddings_model)
+    def __init__(self, embeddings_model="all-MiniLM-L6-v2", persist_directory="./knowledge_base_db", write_batch_size=32, write_flush_interval=5.0,
+                 embedding_cache_dir="./cache_data/embeddings", embedding_cache_size=100_000, index_backend="chroma",
+                 near_duplicate_threshold=0.95, embeddings=None, max_pending_facts=1024):
+        if index_backend not in INDEX_BACKENDS:
+            raise ValueError(f"Unknown index backend {index_backend!r}; expected one of {INDEX_BACKENDS}")
+        self.embeddings_model = embeddings_model
+        self.index_backend = index_backend
+        # New facts whose embedding is at least this similar (cosine) to a stored or queued fact
+        # with the same polarity/numbers are merged into it instead of appended (None disables)
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.embedding_cache_dir = embedding_cache_dir
+        self.embedding_cache_size = embedding_cache_size
         self.persist_directory = persist_directory
         os.makedirs(self.persist_directory, exist_ok=True) # Ensure directory exists
-        self.initialize_vector_db()
-        
+
+        # The embedding model, text splitter and Chroma store are loaded on first use (or by load()).
+        # A ready embeddings object (e.g. the benchmarks' synthetic one) skips loading the model.
+        self._embeddings = embeddings
+        self._text_splitter = None
+        self._vectordb = None
+        self._hash_conn = None
+        self._load_lock = threading.RLock()
+        self.load_timings = {}
+
+        # Write-behind queue: add_fact only enqueues; a background thread embeds and
+        # persists pending facts in batches once write_batch_size facts are waiting
+        # or write_flush_interval seconds have passed. While the store keeps failing, retries
+        # back off exponentially and at most max_pending_facts stay queued (oldest dropped first).
+        self.write_batch_size = write_batch_size
+        self.write_flush_interval = write_flush_interval
+        self.max_pending_facts = max_pending_facts
+        self._pending_facts = []
+        self._pending_metadatas = [] # Parallel to _pending_facts
+        self._pending_dropped = 0 # Total dropped from the front of the queue, so flush knows what it still owns
+        self._flush_failures = 0
+        self._retry_at = 0.0 # time.monotonic() before which the writer thread doesn't retry
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake_writer = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            with self._load_lock:
+                if self._embeddings is None:
+                    start_time = time.perf_counter()
+                    from langchain_community.embeddings import HuggingFaceEmbeddings
+                    from embedding_cache import EmbeddingCache
+                    # Memoized on disk: repeated queries/facts skip the CPU forward pass
+                    self._embeddings = EmbeddingCache(
+                        HuggingFaceEmbeddings(model_name=self.embeddings_model),
+                        model_name=self.embeddings_model,
+                        cache_dir=self.embedding_cache_dir,
+                        max_entries=self.embedding_cache_size
+                    )
+                    self.load_timings["embedding_model"] = time.perf_counter() - start_time
+        return self._embeddings
+
+    @property
+    def text_splitter(self):
+        if self._text_splitter is None:
+            with self._load_lock:
+                if self._text_splitter is None:
+                    from langchain.text_splitter import RecursiveCharacterTextSplitter
+                    self._text_splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=20) # Increased chunk size
+        return self._text_splitter
+
+    @property
+    def vectordb(self):
+        if self._vectordb is None:
+            with self._load_lock:
+                if self._vectordb is None:
+                    self.initialize_vector_db()
+        return self._vectordb
+
+    def load(self):
+        # Eagerly loads everything lazy; used by FactChecker.warmup()
+        return self.embeddings, self.text_splitter, self.vectordb
+
+    def _open_index(self, embeddings):
+        # Returns (index, is_new). Both backends expose add_texts/similarity_search/persist.
+        if self.index_backend == "numpy":
+            from numpy_index import NumpyIndex
+            index = NumpyIndex(embedding_function=embeddings, persist_directory=os.path.join(self.persist_directory, "numpy_index"))
+            return index, len(index) == 0
+        from langchain_community.vectorstores import Chroma
+        is_new = not os.path.exists(os.path.join(self.persist_directory, "chroma.sqlite3"))
+        return Chroma(persist_directory=self.persist_directory, embedding_function=embeddings), is_new
+
     def initialize_vector_db(self):
         # Initial facts - consider loading from a file for larger KBs
         initial_facts = [
@@ -23,37 +132,445 @@ class KnowledgeBase:
             "The capital of India is New Delhi.",
             "The capital of the United States is Washington, D.C.",
         ]
-        
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=20) # Increased chunk size
-        
-        # Check if DB already exists to avoid re-initializing with same data (basic check)
-        # A more robust check would involve versioning or checking content hash
-        if not os.path.exists(os.path.join(self.persist_directory, "chroma.sqlite3")) or not os.listdir(self.persist_directory):
-            docs = text_splitter.create_documents(initial_facts)
-            self.vectordb = Chroma.from_documents(
-                documents=docs,
-                embedding=self.embeddings,
-                persist_directory=self.persist_directory
-            )
-            self.vectordb.persist()
+
+        # Seed only a brand-new store; every chunk written through _write_chunks is
+        # recorded by content hash, so later ingests and flushes skip duplicates.
+        embeddings = self.embeddings # Loaded (and timed) on its own
+        start_time = time.perf_counter()
+        self._vectordb, is_new = self._open_index(embeddings)
+        if is_new:
+            self._write_chunks(initial_facts, source="seed", dedup=False) # Curated, and distinct by construction
+            self._vectordb.persist()
             print("Knowledge base initialized and persisted.")
         else:
-            self.vectordb = Chroma(
-                persist_directory=self.persist_directory,
-                embedding_function=self.embeddings
-            )
             print("Knowledge base loaded from existing directory.")
+        self.load_timings["vector_db"] = time.perf_counter() - start_time
+
+    def _content_hash(self, text):
+        # Whitespace and case differences don't make a fact new
+        return hashlib.sha1(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+
+    def _hashes(self):
+        if self._hash_conn is None:
+            with self._load_lock:
+                if self._hash_conn is None:
+                    # Kept next to the backend's own files so switching backends doesn't skip everything
+                    index_directory = os.path.join(self.persist_directory, "numpy_index") if self.index_backend == "numpy" else self.persist_directory
+                    os.makedirs(index_directory, exist_ok=True)
+                    conn = sqlite3.connect(os.path.join(index_directory, "content_hashes.sqlite3"), check_same_thread=False, isolation_level=None)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("CREATE TABLE IF NOT EXISTS chunk_hashes (hash TEXT PRIMARY KEY, source TEXT, added_at REAL NOT NULL, duplicate_of TEXT)")
+                    columns = [row[1] for row in conn.execute("PRAGMA table_info(chunk_hashes)")]
+                    if "duplicate_of" not in columns: # Registries created before near-duplicate merging
+                        conn.execute("ALTER TABLE chunk_hashes ADD COLUMN duplicate_of TEXT")
+                    self._hash_conn = conn
+        return self._hash_conn
+
+    def _known_hashes(self, hashes):
+        known = set()
+        conn = self._hashes()
+        for start in range(0, len(hashes), 500): # Stay under SQLite's bound-parameter limit
+            chunk = hashes[start:start + 500]
+            known.update(row[0] for row in conn.execute(
+                f"SELECT hash FROM chunk_hashes WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        return known
+
+    def statement_signature(self, text):
+        return statement_signature(text)
+
+    def _normalized_embeddings(self, texts):
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def _stored_id(self, doc):
+        # Id of a stored document, or None if the index can't tell. Entries written before
+        # content-hash ids have a uuid id and no content_hash metadata, so Chroma is asked.
+        content_hash = (doc.metadata or {}).get("content_hash")
+        if content_hash:
+            return content_hash
+        try:
+            matches = self.vectordb.get(where_document={"$contains": doc.page_content}, include=["documents"])
+        except TypeError: # Index without document filters
+            return None
+        return next((row_id for row_id, text in zip(matches["ids"], matches["documents"]) if text == doc.page_content), None)
+
+    def _find_near_duplicates(self, texts, ids):
+        """Returns ({position: id of the fact it duplicates}, {stored id: its metadata}) for chunks that should be merged, not appended.
+
+        A stored match whose id can't be resolved is still a duplicate, but is keyed by
+        its content hash and left out of the metadata dict, so it is not refreshed.
+        """
+        threshold = self.near_duplicate_threshold
+        vectors = self._normalized_embeddings(texts) # Cached, so the store's own embedding pass is free
+        signatures = [self.statement_signature(text) for text in texts]
+        duplicates = {}
+        stored_metadatas = {}
+
+        # Against the store: nearest stored chunks, rescored by exact cosine similarity
+        if hasattr(self.vectordb, "similarity_search_by_vectors"):
+            neighbours = [[doc for doc, _ in hits] for hits in self.vectordb.similarity_search_by_vectors(vectors, k=3)]
+        else:
+            neighbours = [self.vectordb.similarity_search_by_vector(vector.tolist(), k=3) for vector in vectors]
+        candidate_texts = list(dict.fromkeys(doc.page_content for docs in neighbours for doc in docs))
+        if candidate_texts:
+            candidate_vectors = dict(zip(candidate_texts, self._normalized_embeddings(candidate_texts)))
+            for position, docs in enumerate(neighbours):
+                for doc in docs:
+                    if (signatures[position] == self.statement_signature(doc.page_content)
+                            and float(vectors[position] @ candidate_vectors[doc.page_content]) >= threshold):
+                        stored_id = self._stored_id(doc)
+                        duplicates[position] = stored_id or self._content_hash(doc.page_content)
+                        if stored_id:
+                            stored_metadatas[stored_id] = dict(doc.metadata or {})
+                        break
+
+        # Within the batch: later chunks fold into the first kept one they match
+        similarities = vectors @ vectors.T
+        kept = []
+        for position in range(len(texts)):
+            if position in duplicates:
+                continue
+            matches = [kept[j] for j in np.nonzero(similarities[position, kept] >= threshold)[0]] if kept else []
+            match = next((other for other in matches if signatures[other] == signatures[position]), None)
+            if match is None:
+                kept.append(position)
+            else:
+                duplicates[position] = ids[match]
+        return duplicates, stored_metadatas
+
+    def _merged_metadata(self, kept, duplicate):
+        # The surviving entry keeps its own text and claim; it takes the newer timestamp and the higher confidence
+        merged = dict(kept)
+        if duplicate.get("updated_at", 0) > kept.get("updated_at", 0):
+            merged["updated_at"] = duplicate["updated_at"]
+        confidences = [m["confidence_score"] for m in (kept, duplicate) if isinstance(m.get("confidence_score"), (int, float))]
+        if confidences:
+            merged["confidence_score"] = max(confidences)
+        return merged
+
+    def _update_metadatas(self, ids, metadatas):
+        # Returns whether the index could take the update
+        if hasattr(self.vectordb, "update_metadatas"): # NumpyIndex
+            self.vectordb.update_metadatas(ids, metadatas)
+        elif hasattr(self.vectordb, "_collection"): # LangChain's Chroma wrapper has no metadata-only update
+            self.vectordb._collection.update(ids=ids, metadatas=metadatas)
+        else:
+            return False
+        return True
+
+    def _write_chunks(self, facts, source="", metadatas=None, dedup=True):
+        """Splits facts into chunks and writes the ones not already stored. Returns (added, skipped, merged).
+
+        Chunks are embedded in a single batch and stored under their content hash as
+        the vector id. Hashes are recorded only after the vector store write succeeds,
+        so an interrupted run resumes by re-reading the input and skipping them.
+        With dedup, near-duplicates of stored facts are recorded as aliases of the
+        existing entry instead of being written, and that entry's metadata takes
+        the newer timestamp and higher confidence of the two.
+        """
+        now = time.time()
+        texts, chunk_metadatas, ids = [], [], []
+        seen = set()
+        for i, fact in enumerate(facts):
+            for chunk in self.text_splitter.split_text(fact):
+                content_hash = self._content_hash(chunk)
+                if content_hash in seen: # Repeated within this batch
+                    continue
+                seen.add(content_hash)
+                metadata = dict(metadatas[i]) if metadatas else {}
+                metadata.update({"source": source or "user", "content_hash": content_hash, "updated_at": now})
+                texts.append(chunk)
+                chunk_metadatas.append(metadata)
+                ids.append(content_hash)
+        known = self._known_hashes(ids)
+        new = [i for i, content_hash in enumerate(ids) if content_hash not in known]
+        duplicates, stored_metadatas = {}, {}
+        if new and dedup and self.near_duplicate_threshold:
+            duplicates, stored_metadatas = self._find_near_duplicates([texts[i] for i in new], [ids[i] for i in new])
+        to_add = [i for position, i in enumerate(new) if position not in duplicates]
+        batch_rows = {ids[i]: i for i in to_add}
+        unrefreshed = 0 # Merges into stored entries whose metadata can't be updated
+        for position, kept_id in duplicates.items():
+            duplicate = chunk_metadatas[new[position]]
+            if kept_id in batch_rows:
+                chunk_metadatas[batch_rows[kept_id]] = self._merged_metadata(chunk_metadatas[batch_rows[kept_id]], duplicate)
+            elif kept_id in stored_metadatas:
+                stored_metadatas[kept_id] = self._merged_metadata(stored_metadatas[kept_id], duplicate)
+            else:
+                unrefreshed += 1
+        if to_add:
+            self.vectordb.add_texts(
+                [texts[i] for i in to_add],
+                metadatas=[chunk_metadatas[i] for i in to_add],
+                ids=[ids[i] for i in to_add]
+            )
+        if stored_metadatas and not self._update_metadatas(list(stored_metadatas), list(stored_metadatas.values())):
+            unrefreshed += sum(kept_id in stored_metadatas for kept_id in duplicates.values())
+        if unrefreshed:
+            print(f"Warning: {unrefreshed} merged facts could not update the metadata of the entry they duplicate.")
+        if new:
+            self._hashes().executemany(
+                "INSERT OR IGNORE INTO chunk_hashes (hash, source, added_at, duplicate_of) VALUES (?, ?, ?, ?)",
+                [(ids[i], source, now, duplicates.get(position)) for position, i in enumerate(new)]
+            )
+        return len(to_add), len(ids) - len(new), len(duplicates)
+
+    def compact(self, threshold=None, block_rows=256):
+        """Collapses clusters of near-duplicate chunks already in the store, keeping the first stored member.
+
+        Pairs at or above `threshold` cosine similarity (default: near_duplicate_threshold)
+        with the same polarity/number signature are linked, and each connected
+        cluster is reduced to one entry, whose metadata takes the newest timestamp
+        and highest confidence in the cluster. Removed hashes stay in the registry as
+        aliases, so re-ingesting them is still skipped. Returns a stats dict.
+        """
+        threshold = threshold or self.near_duplicate_threshold or 0.95
+        self.flush()
+        start_time = time.perf_counter()
+        data = self.vectordb.get(include=["embeddings", "documents", "metadatas"])
+        ids, texts = data["ids"], data["documents"]
+        stats = {"before": len(ids), "clusters": 0, "removed": 0}
+        if len(ids) < 2:
+            return stats
+        vectors = np.asarray(data["embeddings"], dtype=np.float32)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        signatures = [self.statement_signature(text) for text in texts]
+
+        parent = list(range(len(ids))) # Union-find; the root is always the lowest row
+        def find(row):
+            while parent[row] != row:
+                parent[row] = parent[parent[row]]
+                row = parent[row]
+            return row
+
+        # Upper triangle of the similarity matrix, one (block_rows x COMPACTION_COLUMN_BLOCK) tile at a time
+        for start in range(0, len(ids), block_rows):
+            block = vectors[start:start + block_rows]
+            for column in range(start, len(ids), COMPACTION_COLUMN_BLOCK):
+                rows, columns = np.nonzero(block @ vectors[column:column + COMPACTION_COLUMN_BLOCK].T >= threshold)
+                for row, other in zip(rows + start, columns + column):
+                    if other > row and signatures[row] == signatures[other]:
+                        root, other_root = find(row), find(other)
+                        if root != other_root:
+                            parent[max(root, other_root)] = min(root, other_root)
+
+        remove = [(ids[row], ids[find(row)]) for row in range(len(ids)) if find(row) != row]
+        if remove:
+            kept_metadatas = {}
+            for row in range(len(ids)):
+                root = find(row)
+                if root != row:
+                    kept = kept_metadatas.get(ids[root], data["metadatas"][root] or {})
+                    kept_metadatas[ids[root]] = self._merged_metadata(kept, data["metadatas"][row] or {})
+            if not self._update_metadatas(list(kept_metadatas), list(kept_metadatas.values())):
+                print(f"Warning: the index can't update metadata; {len(kept_metadatas)} surviving entries keep their old metadata.")
+            self.vectordb.delete(ids=[row_id for row_id, _ in remove])
+            self._hashes().executemany("UPDATE chunk_hashes SET duplicate_of = ? WHERE hash = ?",
+                                       [(kept_id, row_id) for row_id, kept_id in remove])
+            self.vectordb.persist()
+        stats["clusters"] = len({kept_id for _, kept_id in remove})
+        stats["removed"] = len(remove)
+        stats["elapsed"] = time.perf_counter() - start_time
+        print(f"Compaction removed {stats['removed']} near-duplicate chunks in {stats['clusters']} clusters "
+              f"({stats['before']} -> {stats['before'] - stats['removed']}) in {stats['elapsed']:.1f}s.")
+        return stats
+
+    def iter_facts(self, path, text_field=None):
+        """Streams (fact, metadata) pairs from a JSONL, CSV or plain-text file (one fact per line)."""
+        extension = os.path.splitext(path)[1].lower()
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            if extension in (".jsonl", ".ndjson"):
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    record = json.loads(line)
+                    if isinstance(record, str):
+                        yield record, {}
+                        continue
+                    field = text_field or next((name for name in INGEST_TEXT_FIELDS if name in record), None)
+                    if not field or not record.get(field):
+                        continue
+                    # Chroma metadata values must be scalars
+                    metadata = {key: value for key, value in record.items()
+                                if key != field and isinstance(value, (str, int, float, bool))}
+                    yield str(record[field]), metadata
+            elif extension == ".csv":
+                reader = csv.DictReader(f)
+                columns = reader.fieldnames or []
+                field = text_field or next((name for name in INGEST_TEXT_FIELDS if name in columns), columns[0] if columns else None)
+                for row in reader:
+                    if field and row.get(field):
+                        yield row[field], {key: value for key, value in row.items() if key != field and key and value}
+            else:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield line, {}
+
+    def ingest(self, paths, batch_size=512, text_field=None, dedup=False):
+        """Bulk-loads facts from files, skipping chunks whose content hash is already stored.
+
+        Near-duplicate merging is off by default here (it adds a search per chunk);
+        run compact() after a large load instead, or pass dedup=True.
+        Returns a dict with read/added/skipped/merged counts, elapsed seconds and docs/sec.
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        stats = {"read": 0, "added": 0, "skipped": 0, "merged": 0}
+        start_time = time.perf_counter()
+
+        def write_batch(facts, metadatas, source):
+            added, skipped, merged = self._write_chunks(facts, source=source, metadatas=metadatas, dedup=dedup)
+            stats["added"] += added
+            stats["skipped"] += skipped
+            stats["merged"] += merged
+            elapsed = time.perf_counter() - start_time
+            print(f"Ingested {stats['read']} facts ({stats['added']} chunks added, {stats['skipped']} already stored, {stats['merged']} merged) "
+                  f"- {stats['read'] / elapsed if elapsed else 0.0:.1f} docs/sec")
+
+        for path in paths:
+            source = os.path.basename(path)
+            facts, metadatas = [], []
+            for fact, metadata in self.iter_facts(path, text_field=text_field):
+                facts.append(fact)
+                metadatas.append(metadata)
+                stats["read"] += 1
+                if len(facts) >= batch_size:
+                    write_batch(facts, metadatas, source)
+                    facts, metadatas = [], []
+            if facts:
+                write_batch(facts, metadatas, source)
+        self.vectordb.persist()
+
+        stats["elapsed"] = time.perf_counter() - start_time
+        stats["docs_per_sec"] = stats["read"] / stats["elapsed"] if stats["elapsed"] else 0.0
+        print(f"Ingestion complete: {stats['read']} facts read, {stats['added']} chunks added, "
+              f"{stats['skipped']} skipped, {stats['merged']} merged in {stats['elapsed']:.1f}s ({stats['docs_per_sec']:.1f} docs/sec).")
+        return stats
+
+    def _match_pending_facts(self, query):
+        # Read-your-writes for facts that are queued but not yet embedded. They are matched
+        # by word overlap with the query instead of embedding them on the request path.
+        with self._pending_lock:
+            pending_facts = list(self._pending_facts)
+        if not pending_facts:
+            return []
+        query_words = set(re.findall(r"\w+", query.lower()))
+        if not query_words:
+            return []
+        scored = []
+        for fact in pending_facts:
+            overlap = len(query_words & set(re.findall(r"\w+", fact.lower()))) / len(query_words)
+            if overlap >= 0.5:
+                scored.append((overlap, fact))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [fact for _, fact in scored]
+
+    def _merge_results(self, pending_matches, stored_facts, k):
+        merged = []
+        for fact in pending_matches + stored_facts: # A fact can be in both while its flush is finishing
+            if fact not in merged:
+                merged.append(fact)
+        return merged[:k]
 
     def query_knowledge_base(self, query, k=3):
         if self.vectordb:
             docs = self.vectordb.similarity_search(query, k=k)
-            return [doc.page_content for doc in docs]
+            return self._merge_results(self._match_pending_facts(query), [doc.page_content for doc in docs], k)
         return []
-        
-    def add_fact(self, fact):
-        if self.vectordb:
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=20)
-            docs = text_splitter.create_documents([fact])
-            self.vectordb.add_documents(docs)
-            self.vectordb.persist() # Persist after adding new facts
-            print(f"Fact added to knowledge base: {fact}")
\ No newline at end of file
+
+    def count(self):
+        # Chunks stored in the index; facts still queued for the writer are not included
+        return len(self.vectordb.get(include=[])["ids"])
+
+    async def aquery_knowledge_base(self, query, k=3):
+        # The first access may load the embedding model and Chroma; keep that off the event loop
+        vectordb = self._vectordb or await asyncio.to_thread(getattr, self, "vectordb")
+        if vectordb:
+            # VectorStore.asimilarity_search runs the embedding + lookup in the default executor
+            docs = await vectordb.asimilarity_search(query, k=k)
+            return self._merge_results(self._match_pending_facts(query), [doc.page_content for doc in docs], k)
+        return []
+
+    def query_knowledge_base_with_scores(self, query, k=3, embedding=None):
+        """Returns up to k (document, cosine similarity) pairs from the index, best first.
+
+        Unlike query_knowledge_base this exposes the stored metadata and a score that
+        is comparable across backends. Facts still in the write-behind queue are not searched.
+        """
+        if embedding is None:
+            embedding = self.embeddings.embed_query(query)
+        query_vector = np.asarray(embedding, dtype=np.float32)
+        query_vector = query_vector / max(float(np.linalg.norm(query_vector)), 1e-12)
+        docs = self.vectordb.similarity_search_by_vector(query_vector.tolist(), k=k)
+        if not docs:
+            return []
+        # Rescored from the (cached) document embeddings; Chroma itself reports distances
+        scores = self._normalized_embeddings([doc.page_content for doc in docs]) @ query_vector
+        return sorted(zip(docs, scores.tolist()), key=lambda item: item[1], reverse=True)
+
+    def add_fact(self, fact, metadata=None):
+        # Only enqueues, so it never waits for the embedding model or the vector store
+        with self._pending_lock:
+            self._pending_facts.append(fact)
+            self._pending_metadatas.append(metadata or {})
+            overflow = len(self._pending_facts) - self.max_pending_facts
+            dropped = self._pending_facts[:overflow] if overflow > 0 else []
+            if dropped:
+                del self._pending_facts[:overflow]
+                del self._pending_metadatas[:overflow]
+                self._pending_dropped += overflow
+            queue_full = len(self._pending_facts) >= self.write_batch_size
+        for dropped_fact in dropped:
+            print(f"Warning: knowledge base write queue is full ({self.max_pending_facts} facts); dropped the oldest: {dropped_fact}")
+        if queue_full:
+            self._wake_writer.set()
+        print(f"Fact queued for knowledge base: {fact}")
+
+    async def aadd_fact(self, fact, metadata=None):
+        # Enqueueing never blocks, so this is safe to call from the event loop
+        self.add_fact(fact, metadata)
+
+    def flush(self):
+        """Embeds and persists all pending facts in one batch. Returns the number written."""
+        with self._flush_lock:
+            with self._pending_lock:
+                facts = list(self._pending_facts)
+                metadatas = list(self._pending_metadatas)
+                dropped_before = self._pending_dropped
+            if not facts:
+                return 0
+            try:
+                added, skipped, merged = self._write_chunks(facts, metadatas=metadatas) # One embedding pass for the whole batch
+                self.vectordb.persist()
+            except Exception as e:
+                self._flush_failures += 1
+                delay = min(self.write_flush_interval * 2 ** self._flush_failures, MAX_FLUSH_BACKOFF)
+                self._retry_at = time.monotonic() + delay
+                print(f"Error writing {len(facts)} pending facts to knowledge base (retrying in {delay:.1f}s): {e}")
+                return 0
+            self._flush_failures = 0
+            self._retry_at = 0.0
+            # Facts stay visible through the pending list until they are queryable in Chroma.
+            # Facts dropped by add_fact meanwhile came off the front of this batch.
+            with self._pending_lock:
+                written = max(0, len(facts) - (self._pending_dropped - dropped_before))
+                del self._pending_facts[:written]
+                del self._pending_metadatas[:written]
+            print(f"Flushed {len(facts)} facts to knowledge base ({added} chunks added, {skipped} already stored, {merged} merged into existing facts).")
+            return len(facts)
+
+    def _write_loop(self):
+        while not self._closed:
+            self._wake_writer.wait(self.write_flush_interval)
+            self._wake_writer.clear()
+            if time.monotonic() >= self._retry_at: # Backing off after failed flushes
+                self.flush()
+
+    def close(self):
+        # Flush anything still queued; safe to call more than once
+        self._closed = True
+        self._wake_writer.set()
+        self.flush()
@@ -0,0 +1,95 @@
+import hashlib
+import json
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.runnables import Runnable
+
+from tracing import record_llm_call
+
+class CachedLLM(Runnable):
+    """Drop-in Runnable around a chat model that caches responses per chain.
+
+    Responses are stored in the CacheManager under "llm:<chain>" and keyed on the
+    model's identifying parameters (model name, temperature, ...) plus the fully
+    rendered prompt, so a prompt that is re-sent verbatim never reaches the API.
+    invoke/ainvoke and stream/astream all read the cache. A streamed response is
+    stored only once it has been received completely. With cache_manager=None every
+    call goes to the model; either way each call's tokens and cache outcome are
+    reported to the active tracing span.
+    """
+    def __init__(self, llm, cache_manager, chain, ttl=None, max_entries=None):
+        self.llm = llm
+        self.cache_manager = cache_manager
+        self.chain = chain
+        if cache_manager is not None:
+            cache_manager.configure_namespace(f"llm:{chain}", ttl=ttl, max_entries=max_entries)
+        params = getattr(llm, "_identifying_params", None) or {"model": getattr(llm, "model", type(llm).__name__)}
+        self._model_key = json.dumps(params, sort_keys=True, default=str)
+
+    def _prompt_text(self, input):
+        if isinstance(input, str):
+            return input
+        if hasattr(input, "to_messages"): # PromptValue; chat models see it as messages
+            return json.dumps([[message.type, message.content] for message in input.to_messages()])
+        return json.dumps(input, default=str)
+
+    def _key(self, input, kwargs):
+        payload = json.dumps([self._model_key, self._prompt_text(input), kwargs], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key):
+        if self.cache_manager is None:
+            return None
+        return self.cache_manager.get_llm_response(self.chain, key)
+
+    def _store(self, key, input, response_text, usage=None):
+        record_llm_call(self._prompt_text(input), response_text, False, usage)
+        if self.cache_manager is not None:
+            self.cache_manager.cache_llm_response(self.chain, key, response_text)
+
+    def _hit(self, input, cached):
+        record_llm_call(self._prompt_text(input), cached, True)
+        return cached
+
+    def invoke(self, input, config=None, **kwargs):
+        key = self._key(input, kwargs)
+        cached = self._lookup(key)
+        if cached is not None:
+            return AIMessage(content=self._hit(input, cached))
+        response = self.llm.invoke(input, config, **kwargs)
+        self._store(key, input, response.content, getattr(response, "usage_metadata", None))
+        return response
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        key = self._key(input, kwargs)
+        cached = self._lookup(key)
+        if cached is not None:
+            return AIMessage(content=self._hit(input, cached))
+        response = await self.llm.ainvoke(input, config, **kwargs)
+        self._store(key, input, response.content, getattr(response, "usage_metadata", None))
+        return response
+
+    def stream(self, input, config=None, **kwargs):
+        key = self._key(input, kwargs)
+        cached = self._lookup(key)
+        if cached is not None:
+            yield AIMessageChunk(content=self._hit(input, cached))
+            return
+        parts = []
+        for chunk in self.llm.stream(input, config, **kwargs):
+            parts.append(chunk.content)
+            yield chunk
+        # Not reached if the consumer stops early or the stream fails, so partial output is never cached
+        self._store(key, input, "".join(parts))
+
+    async def astream(self, input, config=None, **kwargs):
+        key = self._key(input, kwargs)
+        cached = self._lookup(key)
+        if cached is not None:
+            yield AIMessageChunk(content=self._hit(input, cached))
+            return
+        parts = []
+        async for chunk in self.llm.astream(input, config, **kwargs):
+            parts.append(chunk.content)
+            yield chunk
+        self._store(key, input, "".join(parts))
@@ -1,8 +1,10 @@
+import asyncio
 import os
+import threading
+import time
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
-from langchain.tools import Tool
+# LangChain / Google GenAI / DuckDuckGo are imported inside the init functions: they are
+# slow to import and FactChecker only needs them once a claim actually reaches the pipeline.
 
 # Load environment variables when this module is imported
 # Ensures API keys are available for functions in this module
@@ -14,15 +16,73 @@ def init_llm():
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         raise ValueError("GOOGLE_API_KEY not found in environment variables. Did you create a .env file and load it?")
+    from langchain_google_genai import ChatGoogleGenerativeAI
     llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", google_api_key=api_key)
     return llm
 
+# How long a cached LLM response stays valid, per chain. Claim breakdowns and source
+# reliability change slowly; verdicts depend on fresh evidence and expire sooner.
+DEFAULT_LLM_CACHE_TTLS = {
+    "claim_analysis": 7 * 24 * 60 * 60,
+    "source_evaluation": 30 * 24 * 60 * 60,
+    "verdict": 24 * 60 * 60,
+}
+
+def cache_llm(llm, cache_manager, chain, ttl=None, max_entries=None):
+    """Wraps an LLM so that identical prompts sent by `chain` are answered from cache_manager.
+
+    With cache_manager=None nothing is cached, but the wrapper still reports each
+    call's tokens to the active tracing span.
+    """
+    from llm_cache import CachedLLM
+    if ttl is None:
+        ttl = DEFAULT_LLM_CACHE_TTLS.get(chain)
+    return CachedLLM(llm, cache_manager, chain, ttl=ttl, max_entries=max_entries)
+
 def init_search_tool():
-    """Initializes and returns the DuckDuckGo search tool."""
-    search = DuckDuckGoSearchAPIWrapper()
-    search_tool = Tool(
-        name="Web Search",
-        description="Useful for searching the web for current information",
-        func=search.run
-    )
-    return search_tool
\ No newline at end of file
+    """Initializes and returns the DuckDuckGo search wrapper.
+
+    FactChecker calls `results(query, max_results)`, which returns one dict per hit
+    with "snippet", "title" and "link" keys, so each result keeps its own URL.
+    """
+    from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
+    return DuckDuckGoSearchAPIWrapper()
+
+
+class RateLimiter:
+    """Thread-safe token bucket shared by all search workers (threads and coroutines).
+
+    `rate` is the sustained number of calls per second and `burst` is how many
+    calls may go out back-to-back before callers start waiting.
+    """
+    def __init__(self, rate=2.0, burst=4):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _try_acquire(self):
+        # Returns 0 when a token was taken, otherwise how long to wait before retrying
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        while True:
+            wait_time = self._try_acquire()
+            if not wait_time:
+                return
+            time.sleep(wait_time)
+
+    async def aacquire(self):
+        while True:
+            wait_time = self._try_acquire()
+            if not wait_time:
+                return
+            await asyncio.sleep(wait_time)
@@ -1,15 +1,164 @@
 from dotenv import load_dotenv
+import argparse
+import contextlib
+import sys
+import time
 import traceback
 import json # For pretty printing dict
+import math
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 
 # Load environment variables from .env file at the very beginning
 load_dotenv()
 
+_import_start = time.perf_counter()
 from fact_checker import FactChecker # Import after load_dotenv
+FACT_CHECKER_IMPORT_TIME = time.perf_counter() - _import_start
+from evidence import evidence_json_default
 
-def main():
-    fact_checker = FactChecker()
-    
+STAGE_LABELS = {
+    "analysis": "Analyzing claim...",
+    "search": "Searching the web...",
+    "ranking": "Ranking evidence...",
+    "sources": "Rating sources...",
+    "knowledge_base": "Checking the knowledge base...",
+    "verdict": "Generating verdict...",
+}
+STREAMED_VERDICT_FIELDS = {"confidence_reasoning": "CONFIDENCE REASONING: ", "explanation": "\nEXPLANATION:\n"} # Printed as they are generated
+
+def print_analysis(analysis):
+    print("\n======= CLAIM ANALYSIS =======")
+    print(analysis)
+
+def print_evidence(evidence, evidence_budget=None, retrieval=None):
+    print("\n======= EVIDENCE COLLECTED (Snippets) =======")
+    # Print only a summary of evidence to keep CLI clean
+    if isinstance(evidence, str): # Results cached before evidence was structured
+        evidence_summary = evidence
+        if len(evidence_summary) > 1000:
+            evidence_summary = evidence_summary[:1000] + "\n... (evidence truncated for display)"
+        print(evidence_summary)
+    else:
+        for record in evidence[:10]:
+            source = f"[{record.domain}] {record.title}" if record.url else "[no source]"
+            print(f"- {source}\n  {record.snippet[:200]}")
+        if len(evidence) > 10:
+            print(f"... ({len(evidence) - 10} more results truncated for display)")
+    if evidence_budget:
+        reasons = {}
+        for item in evidence_budget["dropped"]:
+            reasons[item["reason"]] = reasons.get(item["reason"], 0) + 1
+        dropped = ", ".join(f"{count} {reason.replace('_', ' ')}" for reason, count in reasons.items()) or "none"
+        print(f"(Verdict prompt used {evidence_budget['selected']} of {evidence_budget['candidates']} results, "
+              f"~{evidence_budget['tokens_used']}/{evidence_budget['token_budget']} tokens; left out: {dropped})")
+    if retrieval:
+        uncovered = [item["fact"] for item in retrieval["coverage"] if not item["covered"]]
+        print(f"(Searched {len(retrieval['queries'])} queries in {retrieval['rounds']} round(s), stopped: "
+              f"{retrieval['stop_reason'].replace('_', ' ')}" + (f"; weakly covered: {'; '.join(uncovered)})" if uncovered else ")"))
+
+def print_verdict_header(verdict, shown=()):
+    # Skips fields already printed while the verdict was streaming
+    if "verdict" not in shown:
+        print(f"VERDICT: {verdict.get('verdict', 'N/A')}")
+    if "confidence_score" not in shown:
+        print(f"CONFIDENCE: {verdict.get('confidence_score', 'N/A')}/100")
+    if "confidence_reasoning" not in shown:
+        print(f"CONFIDENCE REASONING: {verdict.get('confidence_reasoning', 'N/A')}")
+    if "explanation" not in shown:
+        print(f"\nEXPLANATION:\n{verdict.get('explanation', 'N/A')}")
+
+def print_verdict_details(verdict):
+    print("\nKEY EVIDENCE POINTS:")
+    for ev_point in verdict.get('key_evidence_points', []):
+        print(f"- {ev_point}")
+
+    print("\nSUPPORTING SOURCES DOMAINS:")
+    for source_domain in verdict.get('supporting_sources_domains', []):
+        print(f"- {source_domain}")
+
+    contradicting = verdict.get('contradicting_evidence_points', [])
+    if contradicting and contradicting[0] != 'No significant contradicting evidence found.':
+        print("\nCONTRADICTING EVIDENCE POINTS:")
+        for contradiction in contradicting:
+            print(f"- {contradiction}")
+
+    print(f"\nKNOWLEDGE BASE RELEVANCE:\n{verdict.get('knowledge_base_relevance', 'N/A')}")
+
+def print_result(result, streamed_fields=None):
+    """Prints a finished result. With streamed_fields, analysis, evidence and those verdict fields were already shown."""
+    if streamed_fields is None:
+        semantic_match = result.get("semantic_cache_match")
+        if semantic_match:
+            print(f"\n(Served from cache: similar to \"{semantic_match['matched_claim']}\", similarity {semantic_match['score']:.2f})")
+        kb_match = result.get("knowledge_base_match")
+        if result.get("kb_fast_path") and kb_match:
+            print(f"\n(Answered from knowledge base without web search: matches \"{kb_match['matched_claim']}\", similarity {kb_match['score']:.2f})")
+        print_analysis(result["analysis"])
+        print_evidence(result["evidence"], result.get("evidence_budget"), result.get("retrieval"))
+        print("\n======= VERDICT =======")
+
+    verdict = result["verdict"] # This should be a dictionary
+    if isinstance(verdict, dict):
+        print_verdict_header(verdict, streamed_fields or ())
+        print_verdict_details(verdict)
+    else: # Fallback if verdict is not a dict (e.g. parsing error message)
+        print("Could not parse verdict structure. Raw output:")
+        print(verdict)
+    if result.get("trace"):
+        print_trace(result["trace"])
+
+def print_trace(trace):
+    # One line per span, in start order; searches run concurrently so their times overlap
+    print(f"\nSTAGE TIMINGS ({trace['duration']:.2f}s total):")
+    for span in trace["spans"]:
+        details = []
+        if span["attributes"].get("query"):
+            details.append(span["attributes"]["query"][:40])
+        if span["cache_hit"] is not None:
+            details.append("cache hit" if span["cache_hit"] else "cache miss")
+        if span["llm_calls"]:
+            details.append(f"~{span['prompt_tokens']}+{span['response_tokens']} tokens")
+        if span["error"]:
+            details.append(f"ERROR {span['error']}")
+        print(f"  +{span['start']:6.2f}s {span['name']:<15} {span['duration']:6.2f}s  {'; '.join(details)}")
+
+def stream_claim_to_console(fact_checker, claim):
+    """Runs a claim through FactChecker.stream_claim, printing each part as soon as it is available."""
+    shown = set() # Verdict fields already printed
+    streaming_field = None
+    streamed = False
+    for event in fact_checker.stream_claim(claim):
+        kind = event["type"]
+        if kind == "stage" and event["status"] == "started":
+            streamed = True
+            if event["stage"] == "verdict":
+                print("\n======= VERDICT =======")
+            print(f"[{STAGE_LABELS.get(event['stage'], event['stage'])}]", flush=True)
+        elif kind == "analysis":
+            print_analysis(event["analysis"])
+        elif kind == "evidence":
+            print_evidence(event["evidence"], event.get("evidence_budget"), event.get("retrieval"))
+        elif kind == "field_delta" and event["name"] in STREAMED_VERDICT_FIELDS:
+            if streaming_field != event["name"]:
+                streaming_field = event["name"]
+                print(STREAMED_VERDICT_FIELDS[event["name"]], end="")
+            print(event["text"], end="", flush=True)
+        elif kind == "field":
+            if event["name"] == "verdict":
+                print(f"VERDICT: {event['value']}", flush=True)
+            elif event["name"] == "confidence_score":
+                print(f"CONFIDENCE: {event['value']}/100", flush=True)
+            elif event["name"] in STREAMED_VERDICT_FIELDS:
+                print()
+                streaming_field = None
+            else:
+                continue
+            shown.add(event["name"])
+        elif kind == "result":
+            print_result(event["result"], streamed_fields=shown if streamed else None)
+
+def interactive_mode(fact_checker):
     print("Welcome to the Enhanced LLM-Powered Autonomous Fact-Checker (CLI)")
     print("-----------------------------------------------------------------")
     
@@ -22,53 +171,225 @@ def main():
             print("Please enter a claim.")
             continue
             
-        print("\nProcessing claim, please wait...")
         try:
-            result = fact_checker.process_claim(claim)
-            
-            print("\n======= CLAIM ANALYSIS =======")
-            print(result["analysis"])
-            
-            print("\n======= EVIDENCE COLLECTED (Snippets) =======")
-            # Print only a summary of evidence to keep CLI clean
-            evidence_summary = result["evidence"]
-            if len(evidence_summary) > 1000:
-                evidence_summary = evidence_summary[:1000] + "\n... (evidence truncated for display)"
-            print(evidence_summary)
-            
-            print("\n======= VERDICT =======")
-            verdict = result["verdict"] # This should be a dictionary
-
-            if isinstance(verdict, dict):
-                print(f"VERDICT: {verdict.get('verdict', 'N/A')}")
-                print(f"CONFIDENCE: {verdict.get('confidence_score', 'N/A')}/100")
-                print(f"CONFIDENCE REASONING: {verdict.get('confidence_reasoning', 'N/A')}")
-                print(f"\nEXPLANATION:\n{verdict.get('explanation', 'N/A')}")
-                
-                print("\nKEY EVIDENCE POINTS:")
-                for ev_point in verdict.get('key_evidence_points', []):
-                    print(f"- {ev_point}")
-                
-                print("\nSUPPORTING SOURCES DOMAINS:")
-                for source_domain in verdict.get('supporting_sources_domains', []):
-                    print(f"- {source_domain}")
-
-                contradicting = verdict.get('contradicting_evidence_points', [])
-                if contradicting and contradicting[0] != 'No significant contradicting evidence found.':
-                    print("\nCONTRADICTING EVIDENCE POINTS:")
-                    for contradiction in contradicting:
-                        print(f"- {contradiction}")
-                
-                print(f"\nKNOWLEDGE BASE RELEVANCE:\n{verdict.get('knowledge_base_relevance', 'N/A')}")
-
-            else: # Fallback if verdict is not a dict (e.g. parsing error message)
-                print("Could not parse verdict structure. Raw output:")
-                print(verdict)
-            
+            stream_claim_to_console(fact_checker, claim)
         except Exception as e:
             print(f"\n--- An error occurred while processing the claim: {str(e)} ---")
             traceback.print_exc()
         print("\n-----------------------------------------------------------------")
 
+def read_claims(source, input_format="auto"):
+    """Yields claims from a plain-text (one per line) or JSONL stream.
+
+    JSONL lines may be bare strings or objects with a "claim" field.
+    """
+    for line in source:
+        line = line.strip()
+        if not line:
+            continue
+        if input_format == "jsonl" or (input_format == "auto" and line[0] in "{\""):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                if input_format == "jsonl":
+                    print(f"Warning: skipping malformed JSONL line: {line[:70]}...", file=sys.stderr)
+                    continue
+                record = line # Plain text that happens to start with a quote or brace
+            claim = record.get("claim") if isinstance(record, dict) else record
+        else:
+            claim = line
+        if isinstance(claim, str) and claim.strip():
+            yield claim.strip()
+
+def load_completed_claims(output_path):
+    # Claims already written to the output file are skipped when resuming a run
+    completed = set()
+    try:
+        with open(output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue # Partially written last line from an interrupted run
+                if isinstance(record, dict) and "claim" in record and "error" not in record:
+                    completed.add(record["claim"])
+    except FileNotFoundError:
+        pass
+    return completed
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)) # Nearest-rank
+    return sorted_values[index]
+
+def batch_mode(fact_checker, input_path, output_path=None, workers=4, input_format="auto"):
+    if input_path == "-":
+        claims = list(read_claims(sys.stdin, input_format))
+    else:
+        with open(input_path, "r", encoding="utf-8") as f:
+            claims = list(read_claims(f, input_format))
+
+    claims = list(dict.fromkeys(claims)) # Identical claims in one run only need one check
+    completed = load_completed_claims(output_path) if output_path else set()
+    pending = [claim for claim in claims if claim not in completed]
+    print(f"Batch: {len(claims)} claims read, {len(claims) - len(pending)} already done, {len(pending)} to check.", file=sys.stderr)
+
+    out = open(output_path, "a", encoding="utf-8") if output_path else sys.stdout
+    stats_before = dict(fact_checker.cache_manager.stats)
+    llm_stats_before = {chain: dict(counts) for chain, counts in fact_checker.cache_manager.llm_stats.items()}
+    latencies = []
+    errors = 0
+    kb_answers = 0
+    searches = [] # Queries run per fully checked claim
+    stopped_early = 0
+
+    def check(claim):
+        start_time = time.time()
+        try:
+            result = fact_checker.process_claim(claim)
+            record = dict(result)
+        except Exception as e:
+            record = {"claim": claim, "error": str(e)}
+        record["processing_time"] = time.time() - start_time
+        record["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return record
+
+    run_start = time.time()
+    try:
+        # Pipeline progress prints go to stderr so stdout stays valid JSONL
+        with contextlib.redirect_stdout(sys.stderr):
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+                futures = [executor.submit(check, claim) for claim in pending]
+                for future in as_completed(futures):
+                    record = future.result()
+                    out.write(json.dumps(record, default=evidence_json_default) + "\n")
+                    out.flush() # Each finished claim is durable, so an interrupted run can resume
+                    if "error" in record:
+                        errors += 1
+                    if record.get("kb_fast_path"):
+                        kb_answers += 1
+                    if record.get("retrieval"):
+                        searches.append(len(record["retrieval"]["queries"]))
+                        stopped_early += record["retrieval"]["stop_reason"] == "covered"
+                    latencies.append(record["processing_time"])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.time() - run_start
+    stats = fact_checker.cache_manager.stats
+    exact_hits = stats["verdict_hits"] - stats_before["verdict_hits"]
+    semantic_hits = stats["semantic_hits"] - stats_before["semantic_hits"]
+    verdict_hits = exact_hits + semantic_hits # Semantic lookups only happen after an exact miss
+    verdict_lookups = exact_hits + stats["verdict_misses"] - stats_before["verdict_misses"]
+    search_hits = stats["search_hits"] - stats_before["search_hits"]
+    search_lookups = search_hits + stats["search_misses"] - stats_before["search_misses"]
+    llm_hits = stats["llm_hits"] - stats_before["llm_hits"]
+    llm_lookups = llm_hits + stats["llm_misses"] - stats_before["llm_misses"]
+    llm_by_chain = []
+    for chain, counts in sorted(fact_checker.cache_manager.llm_stats.items()):
+        before = llm_stats_before.get(chain, {"hits": 0, "misses": 0})
+        hits = counts["hits"] - before["hits"]
+        llm_by_chain.append(f"{chain} {hits}/{hits + counts['misses'] - before['misses']}")
+    stage_means = [f"{name} {stage['duration_sum'] / stage['count']:.2f}s"
+                   for name, stage in fact_checker.trace_metrics.stages.items() if stage["count"]]
+    latencies.sort()
+
+    print("\n======= BATCH SUMMARY =======", file=sys.stderr)
+    print(f"Claims processed: {len(latencies)} ({errors} errors) in {elapsed:.1f}s", file=sys.stderr)
+    print(f"Throughput: {len(latencies) / elapsed * 60 if elapsed > 0 else 0:.1f} claims/min", file=sys.stderr)
+    print(f"Verdict cache hit rate: {verdict_hits / verdict_lookups * 100 if verdict_lookups else 0:.1f}% ({verdict_hits}/{verdict_lookups}; {exact_hits} exact, {semantic_hits} semantic)", file=sys.stderr)
+    print(f"Answered from knowledge-base verdicts (no search): {kb_answers}", file=sys.stderr)
+    if searches:
+        print(f"Search queries per checked claim: {sum(searches) / len(searches):.2f} mean, {max(searches)} max "
+              f"({stopped_early}/{len(searches)} stopped once every fact to check was covered)", file=sys.stderr)
+    print(f"Search cache hit rate: {search_hits / search_lookups * 100 if search_lookups else 0:.1f}% ({search_hits}/{search_lookups})", file=sys.stderr)
+    print(f"LLM cache hit rate: {llm_hits / llm_lookups * 100 if llm_lookups else 0:.1f}% ({llm_hits}/{llm_lookups}; {', '.join(llm_by_chain) or 'no calls'})", file=sys.stderr)
+    print(f"Latency p50: {percentile(latencies, 50):.2f}s | p95: {percentile(latencies, 95):.2f}s", file=sys.stderr)
+    print(f"Mean time per stage: {', '.join(stage_means) or 'n/a'}", file=sys.stderr)
+
+def warm_up(fact_checker):
+    print("Warming up (loading LLM client, search tool, embedding model and knowledge base)...")
+    fact_checker.warmup(background=False)
+    if fact_checker.warmup_error:
+        print(f"NOT READY: warm-up failed: {fact_checker.warmup_error}")
+    else:
+        print("READY")
+    print(f"Import of fact_checker: {FACT_CHECKER_IMPORT_TIME * 1000:.1f} ms")
+    print(fact_checker.startup_report())
+
+def main():
+    parser = argparse.ArgumentParser(description="Enhanced LLM-Powered Autonomous Fact-Checker (CLI)")
+    parser.add_argument("--batch", metavar="INPUT", help="Fact-check claims from a text or JSONL file ('-' for stdin) instead of prompting.")
+    parser.add_argument("--output", metavar="OUTPUT", help="Append JSONL results to this file (default: stdout). Claims already in it are skipped.")
+    parser.add_argument("--workers", type=int, default=4, help="Number of claims checked concurrently in batch mode.")
+    parser.add_argument("--format", dest="input_format", choices=["auto", "text", "jsonl"], default="auto", help="Input format for batch mode.")
+    parser.add_argument("--warmup", action="store_true", help="Load all models before starting and print a readiness signal with startup timings.")
+    parser.add_argument("--ingest", nargs="+", metavar="FILE", help="Bulk-load facts into the knowledge base from JSONL, CSV or text files, then exit. Re-runs skip facts already stored.")
+    parser.add_argument("--ingest-batch-size", type=int, default=512, help="Facts embedded and written per batch when ingesting.")
+    parser.add_argument("--text-field", help="JSONL key or CSV column holding the fact text (default: fact, text or content).")
+    parser.add_argument("--dedup", action="store_true", help="When ingesting, merge facts that are near-duplicates of stored ones instead of adding them (slower).")
+    parser.add_argument("--compact-kb", action="store_true", help="Collapse clusters of near-duplicate facts already in the knowledge base, then exit.")
+    parser.add_argument("--dedup-threshold", type=float, help="Cosine similarity at which facts count as near-duplicates (default: 0.95).")
+    parser.add_argument("--kb-fast-path-threshold", type=float, default=0.92, help="Answer claims this similar to one with a stored knowledge-base verdict without searching (0 disables).")
+    parser.add_argument("--evidence-budget", type=int, default=800, help="Approximate token budget for search evidence in the verdict prompt (0 sends all results).")
+    parser.add_argument("--max-search-queries", type=int, default=6, help="Most search queries per claim; follow-up rounds only search for facts the results don't cover yet.")
+    parser.add_argument("--no-adaptive-search", action="store_true", help="Always run the first three analysis queries instead of searching until the facts to check are covered.")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Send every prompt to the LLM instead of reusing cached responses for identical prompts.")
+    parser.add_argument("--trace-log", metavar="FILE", help="Append each claim's per-stage trace to this file as JSON lines.")
+    parser.add_argument("--metrics-port", type=int, help="Serve per-stage Prometheus metrics at http://127.0.0.1:PORT/metrics while running.")
+    parser.add_argument("--kb-backend", choices=["chroma", "numpy"], default="chroma", help="Knowledge-base vector index: Chroma or the in-process NumPy index.")
+    args = parser.parse_args()
+    checker_options = {
+        "kb_index_backend": args.kb_backend,
+        "kb_fast_path_threshold": args.kb_fast_path_threshold,
+        "evidence_token_budget": args.evidence_budget or None,
+        "adaptive_search": not args.no_adaptive_search,
+        "max_search_queries": args.max_search_queries,
+        "llm_cache": not args.no_llm_cache,
+        "trace_log": args.trace_log,
+    }
+
+    if args.ingest or args.compact_kb:
+        fact_checker = FactChecker(**checker_options)
+        knowledge_base = fact_checker.knowledge_base
+        if args.dedup_threshold:
+            knowledge_base.near_duplicate_threshold = args.dedup_threshold
+        try:
+            if args.ingest:
+                knowledge_base.ingest(args.ingest, batch_size=args.ingest_batch_size, text_field=args.text_field, dedup=args.dedup)
+            if args.compact_kb:
+                knowledge_base.compact()
+        except KeyboardInterrupt:
+            print("\nInterrupted; re-run the same command to resume.")
+        finally:
+            fact_checker.close()
+    elif args.batch:
+        with contextlib.redirect_stdout(sys.stderr): # Keep stdout clean for JSONL results
+            fact_checker = FactChecker(**checker_options)
+            if args.metrics_port:
+                fact_checker.trace_metrics.serve(args.metrics_port)
+            if args.warmup:
+                warm_up(fact_checker)
+        try:
+            batch_mode(fact_checker, args.batch, args.output, args.workers, args.input_format)
+        finally:
+            with contextlib.redirect_stdout(sys.stderr):
+                fact_checker.close()
+    else:
+        fact_checker = FactChecker(**checker_options)
+        if args.metrics_port:
+            fact_checker.trace_metrics.serve(args.metrics_port)
+        if args.warmup:
+            warm_up(fact_checker)
+        else:
+            # Models load in the background while the user types; cached claims are answered right away
+            fact_checker.warmup(background=True)
+        try:
+            interactive_mode(fact_checker)
+        finally:
+            fact_checker.close()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
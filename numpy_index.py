@@ -0,0 +1,286 @@
+import ast
+import asyncio
+import json
+import os
+import threading
+
+import numpy as np
+
+HEADER_SIZE = 128 # Fixed .npy header size so the row count can be rewritten in place on append
+SEARCH_BLOCK_ROWS = 65536 # Rows scored per block, bounds the temporary score matrix
+
+class _Document:
+    # Same page_content/metadata shape as LangChain's Document, without importing LangChain
+    __slots__ = ("page_content", "metadata")
+
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+    def __repr__(self):
+        return f"Document(page_content={self.page_content!r}, metadata={self.metadata!r})"
+
+
+class NumpyIndex:
+    """In-process vector index over a contiguous matrix of L2-normalized float32 embeddings.
+
+    Exposes the subset of the LangChain VectorStore interface KnowledgeBase uses
+    (add_texts, similarity_search, similarity_search_with_relevance_scores, persist),
+    so it can stand in for Chroma. Search is a blocked matrix product plus
+    argpartition top-k; cosine similarity is the score.
+
+    On disk: vectors.npy (opened memory-mapped, shared read-only between processes)
+    and metadata.jsonl (one {"id", "text", "metadata"} line per row). Rows added
+    since the last persist() live in an in-memory delta and are appended on persist.
+    Metadata changes to persisted rows are appended to metadata_updates.jsonl and
+    replayed on load.
+    """
+    def __init__(self, embedding_function, persist_directory):
+        self.embedding_function = embedding_function
+        self.persist_directory = persist_directory
+        os.makedirs(persist_directory, exist_ok=True)
+        self.vectors_file = os.path.join(persist_directory, "vectors.npy")
+        self.metadata_file = os.path.join(persist_directory, "metadata.jsonl")
+        self.updates_file = os.path.join(persist_directory, "metadata_updates.jsonl")
+
+        self._lock = threading.Lock()
+        self._base = None # Persisted rows, memory-mapped
+        self._delta = [] # Unpersisted row blocks
+        self._delta_rows = 0
+        self._texts = []
+        self._metadatas = []
+        self._ids = []
+        self._id_to_row = {}
+        self._persisted_rows = 0
+        self._load()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _load(self):
+        if not os.path.exists(self.vectors_file) or not os.path.exists(self.metadata_file):
+            return
+        base = np.load(self.vectors_file, mmap_mode="r")
+        valid_bytes = 0
+        with open(self.metadata_file, "rb") as f:
+            for line in f:
+                if len(self._ids) >= base.shape[0] or not line.endswith(b"\n"):
+                    break
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                valid_bytes += len(line)
+                self._id_to_row[row["id"]] = len(self._ids)
+                self._ids.append(row["id"])
+                self._texts.append(row["text"])
+                self._metadatas.append(row.get("metadata") or {})
+        if valid_bytes < os.path.getsize(self.metadata_file):
+            # Partially written tail from an interrupted persist; later appends start clean
+            with open(self.metadata_file, "r+b") as f:
+                f.truncate(valid_bytes)
+        # Vectors and sidecar are appended separately; only rows present in both count
+        self._base = base[:len(self._ids)]
+        self._persisted_rows = len(self._ids)
+        if os.path.exists(self.updates_file):
+            with open(self.updates_file, "rb") as f:
+                for line in f:
+                    try:
+                        update = json.loads(line)
+                    except json.JSONDecodeError: # Interrupted append
+                        break
+                    if update["id"] in self._id_to_row:
+                        self._metadatas[self._id_to_row[update["id"]]] = update["metadata"]
+
+    def _normalize(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add_texts(self, texts, metadatas=None, ids=None):
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [f"row-{len(self._ids) + i}" for i in range(len(texts))]
+        # Existing ids are kept as they are (content-hash ids make re-adds no-ops)
+        new = [i for i, row_id in enumerate(ids) if row_id not in self._id_to_row]
+        if not new:
+            return list(ids)
+        vectors = self._normalize(self.embedding_function.embed_documents([texts[i] for i in new]))
+        with self._lock:
+            keep = []
+            for position, i in enumerate(new):
+                if ids[i] in self._id_to_row: # Added concurrently while we were embedding
+                    continue
+                keep.append(position)
+                self._id_to_row[ids[i]] = len(self._ids)
+                self._ids.append(ids[i])
+                self._texts.append(texts[i])
+                self._metadatas.append(dict(metadatas[i]))
+            if keep:
+                self._delta.append(vectors[keep])
+                self._delta_rows += len(keep)
+        return list(ids)
+
+    def update_metadatas(self, ids, metadatas):
+        """Replaces the metadata of existing rows; unknown ids are ignored."""
+        with self._lock:
+            updates = []
+            for row_id, metadata in zip(ids, metadatas):
+                row = self._id_to_row.get(row_id)
+                if row is None:
+                    continue
+                self._metadatas[row] = dict(metadata)
+                if row < self._persisted_rows: # Unpersisted rows are written with their current metadata
+                    updates.append(json.dumps({"id": row_id, "metadata": self._metadatas[row]}) + "\n")
+            if updates:
+                with open(self.updates_file, "a", encoding="utf-8") as f:
+                    f.writelines(updates)
+
+    def _blocks(self):
+        # Caller holds the lock; the delta is collapsed into one block on demand
+        if len(self._delta) > 1:
+            self._delta = [np.vstack(self._delta)]
+        blocks = []
+        if self._base is not None and len(self._base):
+            blocks.append(self._base)
+        blocks.extend(self._delta)
+        return blocks
+
+    def _matrices(self):
+        # Snapshot of the searchable blocks
+        with self._lock:
+            return self._blocks()
+
+    def _top_k(self, query_vectors, k):
+        """Returns (rows, scores) arrays of shape (len(query_vectors), <=k), best first."""
+        queries = self._normalize(query_vectors)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        offset = 0
+        for matrix in self._matrices():
+            for start in range(0, matrix.shape[0], SEARCH_BLOCK_ROWS):
+                block = matrix[start:start + SEARCH_BLOCK_ROWS]
+                scores = queries @ block.T # (queries, rows) in one BLAS call
+                if scores.shape[1] > k:
+                    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                    scores = np.take_along_axis(scores, candidates, axis=1)
+                else:
+                    candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+                best_rows = np.hstack([best_rows, candidates + offset + start])
+                best_scores = np.hstack([best_scores, scores])
+                if best_scores.shape[1] > k: # Keep only the running top-k across blocks
+                    keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                    best_rows = np.take_along_axis(best_rows, keep, axis=1)
+                    best_scores = np.take_along_axis(best_scores, keep, axis=1)
+            offset += matrix.shape[0]
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def _results(self, rows, scores):
+        return [(_Document(self._texts[row], self._metadatas[row]), float(score)) for row, score in zip(rows, scores)]
+
+    def similarity_search_by_vectors(self, vectors, k=4):
+        """Batched search: one list of (document, cosine score) per query vector."""
+        if not self._ids or k <= 0:
+            return [[] for _ in vectors]
+        rows, scores = self._top_k(vectors, k)
+        return [self._results(r, s) for r, s in zip(rows, scores)]
+
+    def similarity_search_by_vector(self, embedding, k=4):
+        return [doc for doc, _ in self.similarity_search_by_vectors([embedding], k=k)[0]]
+
+    def similarity_search_with_relevance_scores(self, query, k=4):
+        return self.similarity_search_by_vectors([self.embedding_function.embed_query(query)], k=k)[0]
+
+    def similarity_search(self, query, k=4):
+        return [doc for doc, _ in self.similarity_search_with_relevance_scores(query, k=k)]
+
+    async def asimilarity_search(self, query, k=4):
+        return await asyncio.to_thread(self.similarity_search, query, k)
+
+    def get(self, include=("documents", "metadatas")):
+        """Chroma-style dump of every row: {"ids", "documents", "metadatas", "embeddings"}."""
+        with self._lock:
+            result = {"ids": list(self._ids)}
+            if "documents" in include:
+                result["documents"] = list(self._texts)
+            if "metadatas" in include:
+                result["metadatas"] = [dict(metadata) for metadata in self._metadatas]
+            if "embeddings" in include:
+                blocks = self._blocks()
+                result["embeddings"] = np.vstack(blocks) if blocks else np.empty((0, 0), dtype=np.float32)
+        return result
+
+    def delete(self, ids):
+        """Removes rows by id and rewrites both files. Meant for offline compaction, not the request path."""
+        with self._lock:
+            drop = {self._id_to_row[row_id] for row_id in ids if row_id in self._id_to_row}
+            if not drop:
+                return
+            blocks = self._blocks()
+            keep = [row for row in range(len(self._ids)) if row not in drop]
+            matrix = np.vstack(blocks)[keep]
+            self._ids = [self._ids[row] for row in keep]
+            self._texts = [self._texts[row] for row in keep]
+            self._metadatas = [self._metadatas[row] for row in keep]
+            self._id_to_row = {row_id: row for row, row_id in enumerate(self._ids)}
+
+            self._base = None
+            with open(self.vectors_file + ".tmp", "wb") as f:
+                self._write_header(f, len(keep), matrix.shape[1])
+                f.write(np.ascontiguousarray(matrix, dtype=np.float32).tobytes())
+            with open(self.metadata_file + ".tmp", "w", encoding="utf-8") as f:
+                for row in range(len(keep)):
+                    f.write(json.dumps({"id": self._ids[row], "text": self._texts[row], "metadata": self._metadatas[row]}) + "\n")
+            os.replace(self.vectors_file + ".tmp", self.vectors_file)
+            os.replace(self.metadata_file + ".tmp", self.metadata_file)
+            if os.path.exists(self.updates_file): # Folded into the rewritten sidecar
+                os.remove(self.updates_file)
+            self._base = np.load(self.vectors_file, mmap_mode="r")
+            self._persisted_rows = len(keep)
+            self._delta = []
+            self._delta_rows = 0
+
+    def _write_header(self, f, rows, dim):
+        header = repr({"descr": "<f4", "fortran_order": False, "shape": (rows, dim)})
+        header = header.ljust(HEADER_SIZE - 10 - 1) + "\n" # magic(6) + version(2) + length(2)
+        f.seek(0)
+        f.write(b"\x93NUMPY\x01\x00" + (HEADER_SIZE - 10).to_bytes(2, "little") + header.encode("latin1"))
+
+    def _file_rows(self):
+        # Rows on disk may exceed the sidecar if a previous persist was interrupted
+        with open(self.vectors_file, "rb") as f:
+            header = f.read(HEADER_SIZE)[10:].decode("latin1")
+        return ast.literal_eval(header)["shape"][0]
+
+    def persist(self):
+        """Appends unpersisted rows to vectors.npy and metadata.jsonl, then re-maps the file."""
+        with self._lock:
+            if not self._delta_rows:
+                return
+            delta = np.vstack(self._delta)
+            start_row = self._persisted_rows
+            end_row = start_row + len(delta)
+            dim = delta.shape[1]
+            if not os.path.exists(self.vectors_file):
+                with open(self.vectors_file, "wb") as f:
+                    self._write_header(f, 0, dim)
+            elif self._file_rows() != start_row:
+                # Drop vectors from an interrupted persist that never reached the sidecar
+                with open(self.vectors_file, "r+b") as f:
+                    f.truncate(HEADER_SIZE + start_row * dim * 4)
+            with open(self.vectors_file, "r+b") as f:
+                f.seek(HEADER_SIZE + start_row * dim * 4)
+                f.write(np.ascontiguousarray(delta, dtype=np.float32).tobytes())
+                f.flush()
+                self._write_header(f, end_row, dim) # Row count is updated last
+            with open(self.metadata_file, "a", encoding="utf-8") as f:
+                for row in range(start_row, end_row):
+                    f.write(json.dumps({"id": self._ids[row], "text": self._texts[row], "metadata": self._metadatas[row]}) + "\n")
+            self._base = np.load(self.vectors_file, mmap_mode="r")[:end_row]
+            self._persisted_rows = end_row
+            self._delta = []
+            self._delta_rows = 0
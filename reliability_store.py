@@ -0,0 +1,122 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class ReliabilityStore:
+    """Source reliability scores looked up through a reverse-label suffix index.
+
+    Seed scores (the hand-curated table) never expire. Scores learned from LLM
+    evaluations are persisted to SQLite with a timestamp and ignored once older
+    than `ttl` seconds. Evaluations of content without a recognizable domain are
+    cached by content hash.
+    """
+    _ENTRY = "\0" # Not a valid domain label, so it can't collide with a child node
+
+    def __init__(self, seed_data, db_path="./cache_data/source_reliability.sqlite3", ttl=30 * 24 * 60 * 60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Nested dicts keyed by reversed domain labels ("uk" -> "co" -> "bbc");
+        # an entry stored at a node is kept under the _ENTRY key.
+        self._index = {}
+        self._seed_domains = set()
+        for domain, scores in seed_data.items():
+            self._insert(domain, dict(scores), updated_at=None)
+            self._seed_domains.add(domain)
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS learned_sources (
+                domain TEXT PRIMARY KEY,
+                reliability REAL NOT NULL,
+                expertise REAL NOT NULL,
+                bias REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS content_evaluations (
+                content_hash TEXT PRIMARY KEY,
+                evaluation TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._load_learned()
+
+    def _labels(self, domain):
+        return [label for label in reversed(domain.lower().strip(".").split(".")) if label]
+
+    def _insert(self, domain, scores, updated_at):
+        node = self._index
+        for label in self._labels(domain):
+            node = node.setdefault(label, {})
+        node[self._ENTRY] = (domain, scores, updated_at)
+
+    def _load_learned(self):
+        cutoff = time.time() - self.ttl
+        rows = self._conn.execute(
+            "SELECT domain, reliability, expertise, bias, updated_at FROM learned_sources WHERE updated_at >= ?",
+            (cutoff,)
+        ).fetchall()
+        for domain, reliability, expertise, bias, updated_at in rows:
+            if domain not in self._seed_domains:
+                self._insert(domain, {"reliability": reliability, "expertise": expertise, "bias": bias}, updated_at)
+        if rows:
+            print(f"Loaded {len(rows)} learned source reliability scores.")
+
+    def lookup(self, host):
+        """Returns (matched_domain, scores) for the most specific known suffix of host, or None.
+
+        A single walk from the TLD inwards covers exact domains, subdomains
+        (news.bbc.com -> bbc.com) and TLD/ccSLD fallbacks (cdc.gov -> gov, ox.ac.uk -> ac.uk).
+        """
+        best = None
+        now = time.time()
+        with self._lock:
+            node = self._index
+            for label in self._labels(host):
+                node = node.get(label)
+                if node is None:
+                    break
+                entry = node.get(self._ENTRY)
+                if entry is not None:
+                    domain, scores, updated_at = entry
+                    if updated_at is None or (now - updated_at) < self.ttl:
+                        best = (domain, scores)
+        return best
+
+    def learn(self, domain, scores):
+        # Seed entries are curated and are not overridden by LLM evaluations
+        domain = domain.lower().strip(".")
+        if not domain or domain in self._seed_domains:
+            return
+        now = time.time()
+        scores = {key: scores[key] for key in ("reliability", "expertise", "bias")}
+        with self._lock:
+            self._insert(domain, scores, now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO learned_sources (domain, reliability, expertise, bias, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (domain, scores["reliability"], scores["expertise"], scores["bias"], now)
+            )
+
+    def get_content_evaluation(self, content_hash):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT evaluation, updated_at FROM content_evaluations WHERE content_hash = ?",
+                (content_hash,)
+            ).fetchone()
+        if row is None or (time.time() - row[1]) >= self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def set_content_evaluation(self, content_hash, evaluation):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO content_evaluations (content_hash, evaluation, updated_at) VALUES (?, ?, ?)",
+                (content_hash, json.dumps(evaluation), time.time())
+            )
@@ -0,0 +1,142 @@
+from evidence import render_evidence
+
+# Reasoning graph node colors, keyed by lower-cased verdict
+GRAPH_VERDICT_COLORS = {
+    "true": "#2E8B57", "false": "#DC143C",
+    "partially true": "#FFD700", "unverifiable": "#808080", "error": "#A9A9A9"
+}
+# Verdict card backgrounds
+CARD_VERDICT_COLORS = {"True": "#e6ffe6", "False": "#ffe6e6", "Partially True": "#fff0e6", "Unverifiable": "#f2f2f2", "Error": "#ffcccc"}
+EVIDENCE_COLUMNS = ["query", "domain", "title", "url", "cache_hit", "search_time"]
+SPAN_COLUMNS = ["label", "start", "duration", "cache", "llm_calls", "prompt_tokens", "response_tokens", "status", "error"]
+
+def extract_entities_from_analysis(analysis_text):
+    try:
+        if "Key Entities:" in analysis_text:
+            # Ensure we split correctly even if "Facts to Check:" is missing
+            parts = analysis_text.split("Key Entities:", 1)
+            if len(parts) > 1:
+                entities_section = parts[1].split("Facts to Check:")[0] # Take section before "Facts to Check:"
+                entities = [e.strip() for e in entities_section.splitlines() if e.strip() and not e.strip().startswith("- ") and not e.strip().lower().startswith("facts to check")]
+                # Further refine by splitting by comma if entities are on one line
+                refined_entities = []
+                for entity_line in entities:
+                    refined_entities.extend([e.strip() for e in entity_line.split(',') if e.strip()])
+                return [e for e in refined_entities if e][:5] # Limit for viz
+        return []
+    except Exception:
+        return []
+
+def extract_evidence_snippets(evidence, max_snippets=3):
+    snippets = []
+    if not evidence:
+        return snippets
+    if not isinstance(evidence, str):
+        # Structured evidence: the first result of each query
+        seen_queries = set()
+        for record in evidence:
+            if record.query in seen_queries:
+                continue
+            seen_queries.add(record.query)
+            snippets.append(f"Q: {record.query[:30].strip()}...\nA: {record.snippet[:70].strip()}...")
+            if len(snippets) >= max_snippets:
+                break
+        return snippets
+    # History items saved before evidence was structured still hold the combined string
+    query_blocks = evidence.split("Query:")[1:]
+    for block in query_blocks:
+        if "Result:" in block:
+            query_part, result_part = block.split("Result:", 1)
+            query_text = query_part.strip()
+            result_summary = "\n".join(result_part.strip().splitlines()[:3]) # First 3 lines of result
+            snippets.append(f"Q: {query_text[:30].strip()}...\nA: {result_summary[:70].strip()}...")
+            if len(snippets) >= max_snippets:
+                break
+    return snippets
+
+
+def reasoning_graph(claim_text, entities, evidence_snippets, verdict_text, confidence):
+    """Nodes and edges of the reasoning network as plain dicts (the keyword arguments of agraph's Node and Edge)."""
+    nodes = []
+    edges = []
+
+    claim_node_id = "claim_node"
+    nodes.append({"id": claim_node_id, "label": f"Claim: {claim_text[:50]}...", "size": 20, "color": "#FF6347"}) # Tomato Red
+
+    for i, entity in enumerate(entities):
+        entity_id = f"entity_{i}"
+        nodes.append({"id": entity_id, "label": f"Entity: {entity}", "size": 15, "color": "#4682B4"}) # Steel Blue
+        edges.append({"source": claim_node_id, "target": entity_id, "label": "mentions", "length": 150})
+
+    evidence_node_ids = []
+    for i, snippet in enumerate(evidence_snippets):
+        evidence_id = f"evidence_{i}"
+        evidence_node_ids.append(evidence_id)
+        nodes.append({"id": evidence_id, "label": snippet, "size": 18, "color": "#3CB371", "shape": "box"}) # Medium Sea Green
+        edges.append({"source": claim_node_id, "target": evidence_id, "label": "checked by", "length": 200})
+
+    verdict_node_id = "verdict_node"
+    nodes.append({"id": verdict_node_id, "label": f"Verdict: {verdict_text}", "size": 25,
+                  "color": GRAPH_VERDICT_COLORS.get(verdict_text.lower(), "#D3D3D3")}) # Default color
+
+    for ev_id in evidence_node_ids:
+        edges.append({"source": ev_id, "target": verdict_node_id, "label": "informs", "length": 150})
+
+    confidence_node_id = "confidence_node"
+    nodes.append({"id": confidence_node_id, "label": f"Confidence: {confidence}%", "size": 15, "color": "#BA55D3"}) # Medium Orchid
+    edges.append({"source": verdict_node_id, "target": confidence_node_id, "label": "has score", "length": 100})
+    return {"nodes": nodes, "edges": edges}
+
+
+def span_rows(trace):
+    # One row per span for the timing waterfall and table
+    rows = []
+    for span in (trace or {}).get("spans", []):
+        query = span["attributes"].get("query")
+        rows.append(dict(
+            span,
+            label=f"{span['name']}: {query[:40]}" if query else span["name"],
+            cache={True: "hit", False: "miss"}.get(span["cache_hit"], "n/a"),
+        ))
+    return rows
+
+
+def build_result_view(result):
+    """Everything the result panel shows, derived once from a FactChecker result.
+
+    app.py stores it under result["view"] when a check finishes, so it is saved in
+    the history with the result and the panel never re-parses analysis or evidence
+    text when it redraws.
+    """
+    claim_text = result.get("claim", "N/A")
+    analysis_text = result.get("analysis", "N/A")
+    evidence = result.get("evidence", "No evidence collected.")
+    verdict_data = result.get("verdict", {}) # Ensure verdict_data is a dict
+    if not isinstance(verdict_data, dict): # Handle case where verdict might be a string (e.g. error)
+        verdict_data = {"verdict": str(verdict_data), "confidence_score": 0, "explanation": "Could not parse verdict."}
+    verdict_value = verdict_data.get("verdict", "N/A")
+    confidence_value = verdict_data.get("confidence_score", 0)
+
+    evidence_text = render_evidence(evidence)
+    entities = extract_entities_from_analysis(analysis_text)
+    evidence_snippets = extract_evidence_snippets(evidence)
+    graph = None
+    if claim_text and analysis_text and evidence_text: # Ensure data is present
+        graph = reasoning_graph(claim_text, entities, evidence_snippets, str(verdict_value), confidence_value)
+
+    trace = result.get("trace")
+    return {
+        "claim": claim_text,
+        "analysis": analysis_text,
+        "verdict": verdict_data,
+        "verdict_value": verdict_value,
+        "confidence": confidence_value,
+        "card_color": CARD_VERDICT_COLORS.get(verdict_value, "#e6f7ff"), # Default blueish
+        "evidence_text": evidence_text,
+        "evidence_rows": [record.to_dict() for record in evidence] if not isinstance(evidence, str) and evidence else [],
+        "entities": entities,
+        "evidence_snippets": evidence_snippets,
+        "graph": graph,
+        "spans": span_rows(trace),
+        "trace_duration": trace["duration"] if trace else None,
+    }
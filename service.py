@@ -0,0 +1,271 @@
+from dotenv import load_dotenv
+import argparse
+import json
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Load environment variables from .env file at the very beginning
+load_dotenv()
+
+from fact_checker import FactChecker # Import after load_dotenv
+from evidence import evidence_json_default
+
+MAX_BODY_BYTES = 1 << 20
+
+
+class QueueFull(Exception):
+    pass
+
+
+class BatchTooLarge(Exception):
+    # More new claims than the queue can ever hold at once; retrying cannot help
+    pass
+
+
+class FactCheckService:
+    """Worker pool in front of one shared FactChecker, with a bounded queue and request coalescing.
+
+    submit() returns a Future. A claim that is already queued or running gets the
+    Future of that run instead of a new one, so concurrent identical requests cost
+    one pipeline run. When the queue holds queue_size claims, submit() raises
+    QueueFull and the HTTP layer answers 429.
+    """
+    def __init__(self, fact_checker, workers=4, queue_size=64):
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1") # Queue(maxsize=0) would be unbounded
+        self.fact_checker = fact_checker
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._in_flight = {} # Claim -> Future of the queued or running check
+        self._lock = threading.Lock()
+        self.stats = {"submitted": 0, "coalesced": 0, "rejected": 0, "completed": 0, "failed": 0}
+        self._threads = [threading.Thread(target=self._work, name=f"fact-check-worker-{i}", daemon=True) for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _work(self):
+        while True:
+            claim, future = self._queue.get()
+            try:
+                future.set_result(self.fact_checker.process_claim(claim))
+                outcome = "completed"
+            except Exception as e:
+                future.set_exception(e)
+                outcome = "failed"
+            # Until here, an identical claim still joins this run; afterwards it is served by the verdict cache
+            with self._lock:
+                self._in_flight.pop(claim, None)
+                self.stats[outcome] += 1
+            self._queue.task_done()
+
+    def submit_many(self, claims):
+        """Returns one Future per claim, or raises QueueFull (or BatchTooLarge) without queueing any of them."""
+        with self._lock:
+            futures = []
+            new = {}
+            for claim in claims:
+                future = self._in_flight.get(claim) or new.get(claim)
+                if future is None:
+                    future = new[claim] = Future()
+                else:
+                    self.stats["coalesced"] += 1
+                futures.append(future)
+            if len(new) > self._queue.maxsize:
+                self.stats["rejected"] += len(new)
+                raise BatchTooLarge(f"{len(new)} new claims in one request, but at most {self._queue.maxsize} can be queued")
+            # Only submitters add to the queue and they hold the lock, so this capacity can only grow
+            if new and self._queue.maxsize - self._queue.qsize() < len(new):
+                self.stats["rejected"] += len(new)
+                raise QueueFull(f"{self._queue.qsize()} claims queued (limit {self._queue.maxsize})")
+            for claim, future in new.items():
+                self._in_flight[claim] = future
+                self._queue.put_nowait((claim, future))
+            self.stats["submitted"] += len(new)
+        return futures
+
+    @property
+    def queue_capacity(self):
+        return self._queue.maxsize
+
+    def submit(self, claim):
+        return self.submit_many([claim])[0]
+
+    def health(self):
+        with self._lock:
+            in_flight = len(self._in_flight)
+        return {
+            "status": "error" if self.fact_checker.warmup_error else "ok",
+            "ready": self.fact_checker.ready.is_set(), # Cached claims are answered before models finish loading
+            "warmup_error": str(self.fact_checker.warmup_error) if self.fact_checker.warmup_error else None,
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self.queue_capacity,
+            "in_flight": in_flight,
+            "stats": dict(self.stats),
+        }
+
+    def render_prometheus(self):
+        lines = [
+            "# HELP factchecker_service_queue_depth Claims waiting for a worker.",
+            "# TYPE factchecker_service_queue_depth gauge",
+            f"factchecker_service_queue_depth {self._queue.qsize()}",
+            "# HELP factchecker_service_requests_total Claims received by the HTTP service, by outcome.",
+            "# TYPE factchecker_service_requests_total counter",
+        ]
+        lines.extend(f'factchecker_service_requests_total{{outcome="{name}"}} {count}' for name, count in self.stats.items())
+        return "\n".join(lines) + "\n" + self.fact_checker.trace_metrics.render_prometheus()
+
+
+class FactCheckRequestHandler(BaseHTTPRequestHandler):
+    # self.server carries service, request_timeout and max_batch (see make_server)
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, default=evidence_json_default).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_BODY_BYTES:
+            raise ValueError(f"Request body must be JSON of at most {MAX_BODY_BYTES} bytes")
+        return json.loads(self.rfile.read(length))
+
+    def _claim(self, value):
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError("Each claim must be a non-empty string")
+        return value.strip()
+
+    def _wait(self, futures, deadline):
+        results = []
+        for future in futures:
+            try:
+                results.append({"result": future.result(timeout=max(0.0, deadline - time.monotonic()))})
+            except FutureTimeoutError:
+                # The check keeps running; asking again later joins it or hits the verdict cache
+                results.append({"error": "Timed out waiting for the fact check; retry to collect the result", "status": 504})
+            except Exception as e:
+                results.append({"error": str(e), "status": 500})
+        return results
+
+    def do_GET(self):
+        service = self.server.service
+        path = self.path.split("?")[0]
+        if path == "/health":
+            health = service.health()
+            self._send_json(503 if health["status"] == "error" else 200, health)
+        elif path == "/metrics":
+            body = service.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint {path}"})
+
+    def do_POST(self):
+        service = self.server.service
+        path = self.path.split("?")[0]
+        if path not in ("/check", "/check/batch"):
+            self._send_json(404, {"error": f"Unknown endpoint {path}"})
+            return
+        try:
+            payload = self._read_json()
+            if not isinstance(payload, dict):
+                raise ValueError("Request body must be a JSON object")
+            if path == "/check":
+                claims = [self._claim(payload.get("claim"))]
+            else:
+                raw_claims = payload.get("claims")
+                if not isinstance(raw_claims, list) or not raw_claims:
+                    raise ValueError('"claims" must be a non-empty list of strings')
+                if len(raw_claims) > self.server.max_batch:
+                    raise ValueError(f"At most {self.server.max_batch} claims per batch")
+                claims = [self._claim(claim) for claim in raw_claims]
+            timeout = float(payload.get("timeout", self.server.request_timeout))
+            if not math.isfinite(timeout) or timeout <= 0:
+                raise ValueError('"timeout" must be a positive number of seconds')
+            timeout = min(timeout, self.server.request_timeout)
+        except (ValueError, TypeError) as e: # json.JSONDecodeError is a ValueError
+            self._send_json(400, {"error": str(e)})
+            return
+
+        try:
+            futures = service.submit_many(claims)
+        except BatchTooLarge as e:
+            self._send_json(413, {"error": str(e)})
+            return
+        except QueueFull as e:
+            self._send_json(429, {"error": f"Server busy: {e}"}, headers={"Retry-After": "5"})
+            return
+
+        results = self._wait(futures, time.monotonic() + timeout)
+        if path == "/check":
+            outcome = results[0]
+            if "result" in outcome:
+                self._send_json(200, outcome["result"])
+            else:
+                self._send_json(outcome["status"], {"claim": claims[0], "error": outcome["error"]})
+        else:
+            items = []
+            for claim, outcome in zip(claims, results):
+                items.append(outcome["result"] if "result" in outcome else {"claim": claim, "error": outcome["error"]})
+            self._send_json(200, {"results": items, "errors": sum("error" in outcome for outcome in results)})
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} - {format % args}")
+
+
+def make_server(service, host="127.0.0.1", port=8000, request_timeout=120.0, max_batch=100):
+    server = ThreadingHTTPServer((host, port), FactCheckRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.request_timeout = request_timeout
+    # A batch of more new claims than the queue holds could only ever get 429
+    server.max_batch = min(max_batch, service.queue_capacity)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP API for the fact-checker: POST /check, POST /check/batch, GET /health, GET /metrics.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=4, help="Claims checked concurrently.")
+    parser.add_argument("--queue-size", type=int, default=64, help="Claims that may wait for a worker before requests get 429.")
+    parser.add_argument("--request-timeout", type=float, default=120.0, help="Seconds a request waits for its result before 504; also caps a request's own timeout.")
+    parser.add_argument("--max-batch", type=int, default=100, help="Maximum claims per /check/batch request (at most --queue-size).")
+    parser.add_argument("--kb-backend", choices=["chroma", "numpy"], default="chroma", help="Knowledge-base vector index.")
+    parser.add_argument("--trace-log", metavar="FILE", help="Append each claim's per-stage trace to this file as JSON lines.")
+    args = parser.parse_args()
+    if args.workers < 1 or args.queue_size < 1 or args.max_batch < 1:
+        parser.error("--workers, --queue-size and --max-batch must be at least 1")
+    if not math.isfinite(args.request_timeout) or args.request_timeout <= 0:
+        parser.error("--request-timeout must be a positive number of seconds")
+    if args.max_batch > args.queue_size:
+        print(f"--max-batch {args.max_batch} exceeds --queue-size {args.queue_size}; batches are limited to {args.queue_size} claims.")
+
+    # One FactChecker shared by all workers: its caches and knowledge base are stores that
+    # several instances in one process would only contend for
+    fact_checker = FactChecker(max_search_workers=args.workers, kb_index_backend=args.kb_backend, trace_log=args.trace_log)
+    fact_checker.warmup(background=True)
+    service = FactCheckService(fact_checker, workers=args.workers, queue_size=args.queue_size)
+    server = make_server(service, args.host, args.port, args.request_timeout, args.max_batch)
+    print(f"Fact-check service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
+        fact_checker.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class Abandoned(Exception):
+    # Set on a flight whose leader stopped without an outcome (closed stream, cancelled task); joiners retry
+    pass
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) runs the work; callers that arrive while
+    it is in flight wait for the leader's result, or get its exception, instead of
+    repeating the work. Once the flight lands, the next call with that key runs again,
+    so this only deduplicates in-flight work and is not a cache.
+
+    Thread and asyncio callers share the same flights. A blocking do() must not join
+    a flight led by a coroutine on its own event loop.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {} # Key -> Future of the call in flight
+        self.stats = {"led": 0, "joined": 0}
+
+    def join(self, key):
+        """Returns (future, leader). A leader must call finish() for the future exactly once."""
+        with self._lock:
+            future = self._flights.get(key)
+            if future is None:
+                future = self._flights[key] = Future()
+                self.stats["led"] += 1
+                return future, True
+            self.stats["joined"] += 1
+            return future, False
+
+    def finish(self, key, future, result=None, error=None):
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+        if error is None:
+            future.set_result(result)
+        elif isinstance(error, Exception):
+            future.set_exception(error)
+        else: # KeyboardInterrupt, GeneratorExit, CancelledError: the leader's own business
+            future.set_exception(Abandoned(f"The in-flight call for {key!r} stopped before finishing"))
+
+    def do(self, key, fn, *args):
+        """Runs fn(*args) or joins the identical call in flight. Returns (result, shared)."""
+        while True:
+            future, leader = self.join(key)
+            if leader:
+                break
+            try:
+                return future.result(), True
+            except Abandoned:
+                continue
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result, False
+
+    async def ado(self, key, fn, *args):
+        """Async do(): awaits fn(*args), a coroutine function, or joins the identical call in flight."""
+        while True:
+            future, leader = self.join(key)
+            if leader:
+                break
+            try:
+                # shield: a cancelled joiner must not cancel the flight everyone else is waiting on
+                return await asyncio.shield(asyncio.wrap_future(future)), True
+            except Abandoned:
+                continue
+        try:
+            result = await fn(*args)
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result, False
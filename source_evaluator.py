@@ -1,13 +1,21 @@
+import hashlib
 import json
 import re
 from langchain.prompts import PromptTemplate
 from langchain.schema.output_parser import StrOutputParser
 
+from evidence import EvidenceRecord
+from reliability_store import ReliabilityStore
+
+DOMAIN_PATTERN = re.compile(r'(?:https?://)?(?:www\.)?([a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)')
+
 class SourceEvaluator:
-    def __init__(self, llm):
+    BATCH_CONTENT_CHARS = 2000 # Sample content sent per unknown domain in a batched evaluation
+
+    def __init__(self, llm, reliability_db_path="./cache_data/source_reliability.sqlite3", reliability_ttl=30 * 24 * 60 * 60):
         self.llm = llm
         
-        self.initialize_reliability_db()
+        self.initialize_reliability_db(reliability_db_path, reliability_ttl)
         
         self.evaluation_prompt = PromptTemplate(
             template="""
@@ -40,8 +48,46 @@ class SourceEvaluator:
         )
         
         self.evaluation_chain = self.evaluation_prompt | self.llm | StrOutputParser()
+
+        # Batched variant used by evaluate_sources: every unknown domain of a claim in one round trip
+        self.batch_evaluation_prompt = PromptTemplate(
+            template="""
+            Evaluate the reliability of each of the following sources based on the provided content.
+            
+            SOURCES (JSON array; each item has an "id", the extracted "domain" and sample "content"):
+            {sources}
+            
+            For each source, consider:
+            1. Credibility (official source, established news outlet, etc.)
+            2. Objectivity (neutral language vs. biased framing)
+            3. Evidence presentation (facts, citations, quotes)
+            4. Currency (recent vs. outdated information)
+            
+            Rate each source on a scale of 1-10 for:
+            - RELIABILITY SCORE (1=not reliable, 10=highly reliable)
+            - EXPERTISE SCORE (1=no expertise, 10=high expertise)
+            - BIAS SCORE (1=highly biased, 10=minimal bias)
+            
+            Respond with ONLY a JSON array containing one object per source, in this format:
+            [
+                {{
+                    "id": <id of the source>,
+                    "source_domain": "extracted domain or source name",
+                    "reliability_score": X,
+                    "expertise_score": X,
+                    "bias_score": X,
+                    "overall_score": X,
+                    "reasoning": "brief explanation"
+                }}
+            ]
+            """,
+            input_variables=["sources"]
+        )
+
+        self.batch_evaluation_chain = self.batch_evaluation_prompt | self.llm | StrOutputParser()
     
-    def initialize_reliability_db(self):
+    def initialize_reliability_db(self, db_path="./cache_data/source_reliability.sqlite3", ttl=30 * 24 * 60 * 60):
+        # Curated seed scores; scores learned from LLM evaluations live in the persistent store
         self.reliability_data = {
             "bbc.com": {"reliability": 8, "expertise": 8, "bias": 7},
             "nytimes.com": {"reliability": 8, "expertise": 8, "bias": 6},
@@ -52,75 +98,229 @@ class SourceEvaluator:
             "theonion.com": {"reliability": 1, "expertise": 5, "bias": 5}, # Satire
             "gov": {"reliability": 8, "expertise": 9, "bias": 6}, # Generic TLD
             "edu": {"reliability": 8, "expertise": 9, "bias": 7}, # Generic TLD
+            # ccSLD equivalents of the generic government/academic TLDs
+            "gov.uk": {"reliability": 8, "expertise": 9, "bias": 6},
+            "ac.uk": {"reliability": 8, "expertise": 9, "bias": 7},
+            "gov.in": {"reliability": 8, "expertise": 9, "bias": 6},
+            "ac.in": {"reliability": 8, "expertise": 9, "bias": 7},
+            "gov.au": {"reliability": 8, "expertise": 9, "bias": 6},
+            "edu.au": {"reliability": 8, "expertise": 9, "bias": 7},
         }
+        self.reliability_store = ReliabilityStore(self.reliability_data, db_path=db_path, ttl=ttl)
     
+    def extract_host(self, content):
+        match = DOMAIN_PATTERN.search(content)
+        return match.group(1).lower().strip(".") if match else None
+
     def extract_domain(self, content):
-        domains = re.findall(r'(?:https?://)?(?:www\.)?([a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)', content)
-        if domains:
+        return self._registrable_domain(self.extract_host(content))
+
+    def _registrable_domain(self, host):
+        if host:
             # Handle common subdomains like .co.uk, .ac.uk etc.
-            parts = domains[0].lower().split('.')
+            parts = host.split('.')
             if len(parts) > 2 and parts[-2] in ['co', 'com', 'org', 'net', 'ac', 'gov']: # e.g. bbc.co.uk
                 return ".".join(parts[-3:])
             return ".".join(parts[-2:]) # e.g. example.com or example.org
         return "unknown"
+
+    def _content_hash(self, content):
+        return hashlib.md5(content.encode('utf-8')).hexdigest()
     
+    def _source_parts(self, source):
+        # Evidence records carry the real result URL; bare strings only have free text to guess from
+        if isinstance(source, EvidenceRecord):
+            content = f"{source.title}\n{source.snippet}".strip()
+            return (self.extract_host(source.url) if source.url else None), content
+        return self.extract_host(source), source
+
+    def _lookup_known_source(self, host):
+        # Returns (domain, scores) with scores from the most specific known suffix of the
+        # source host (exact domain, parent domain, or TLD/ccSLD), or (domain, None)
+        if not host:
+            return "unknown", None
+        domain = self._registrable_domain(host)
+        match = self.reliability_store.lookup(host)
+        return domain, (match[1] if match else None)
+
+    def _known_source_evaluation(self, domain, data):
+        overall_score = (data["reliability"] + data["expertise"] + data["bias"]) / 3
+        return {
+            "source_domain": domain,
+            "reliability_score": data["reliability"],
+            "expertise_score": data["expertise"],
+            "bias_score": data["bias"],
+            "overall_score": round(overall_score, 2),
+            "reasoning": f"Pre-assessed source or TLD with known reliability metrics."
+        }
+
+    def _parse_llm_evaluation(self, domain, content, llm_result_str):
+        try:
+            evaluation = json.loads(llm_result_str)
+        except json.JSONDecodeError:
+            return self._neutral_evaluation(domain, llm_result_str)
+        evaluation = self._learn_from_evaluation(domain, evaluation)
+        self._remember_content_evaluation(domain, content, evaluation)
+        return evaluation
+
+    def _neutral_evaluation(self, domain, llm_result_str):
+        return {
+            "source_domain": domain,
+            "reliability_score": 5, "expertise_score": 5, "bias_score": 5,
+            "overall_score": 5,
+            "reasoning": f"Unable to parse LLM evaluation for '{domain}'. Using neutral score. LLM Output: {llm_result_str[:200]}..."
+        }
+
+    def _learn_from_evaluation(self, domain, evaluation):
+        # Scores are learned under the domain extracted from the evaluated source itself; a
+        # source_domain the LLM reports could name any site and is not used as the key
+        if domain != "unknown":
+            evaluation["source_domain"] = domain
+
+        # Update our database with this new source if it's not a generic TLD
+        if domain not in ["gov", "edu"] and domain != "unknown":
+            self.reliability_store.learn(domain, {
+                "reliability": evaluation["reliability_score"],
+                "expertise": evaluation["expertise_score"],
+                "bias": evaluation["bias_score"]
+            })
+        return evaluation
+
+    def _error_evaluation(self, content, e):
+        return {
+            "source_domain": self.extract_domain(content) or "error",
+            "reliability_score": 3, "expertise_score": 3, "bias_score": 3,
+            "overall_score": 3,
+            "reasoning": f"Error evaluating source: {str(e)}"
+        }
+
+    def _cached_evaluation(self, content, host):
+        domain, data = self._lookup_known_source(host)
+        if data:
+            # If data was found (pre-assessed, learned or TLD match)
+            return domain, self._known_source_evaluation(domain, data)
+        if domain == "unknown":
+            # No domain to key on, so previously evaluated content is cached by hash
+            return domain, self.reliability_store.get_content_evaluation(self._content_hash(content))
+        return domain, None
+
+    def _remember_content_evaluation(self, domain, content, evaluation):
+        if domain == "unknown":
+            self.reliability_store.set_content_evaluation(self._content_hash(content), evaluation)
+
     def evaluate_source(self, content):
         try:
-            domain = self.extract_domain(content)
-            
-            # Check TLDs like .gov or .edu first if domain is specific
-            matched_tld_data = None
-            for tld_key in ["gov", "edu"]:
-                if domain.endswith(f".{tld_key}"):
-                    matched_tld_data = self.reliability_data.get(tld_key)
-                    break
-            
-            if domain in self.reliability_data:
-                data = self.reliability_data[domain]
-            elif matched_tld_data:
-                data = matched_tld_data
-            else: # For unknown sources, evaluate content
-                llm_result_str = self.evaluation_chain.invoke({"content": content})
-                try:
-                    evaluation = json.loads(llm_result_str)
-                    # Ensure domain in evaluation matches extracted, or update if LLM provided one
-                    evaluated_domain = evaluation.get("source_domain", domain).lower()
-                    if evaluated_domain == "unknown" and domain != "unknown":
-                         evaluation["source_domain"] = domain
-                    else:
-                         domain = evaluated_domain
-
-                    # Update our database with this new source if it's not a generic TLD
-                    if domain not in ["gov", "edu"] and domain != "unknown":
-                         self.reliability_data[domain] = {
-                            "reliability": evaluation["reliability_score"],
-                            "expertise": evaluation["expertise_score"],
-                            "bias": evaluation["bias_score"]
-                        }
-                    return evaluation
-                except json.JSONDecodeError:
-                    return {
-                        "source_domain": domain,
-                        "reliability_score": 5, "expertise_score": 5, "bias_score": 5,
-                        "overall_score": 5,
-                        "reasoning": f"Unable to parse LLM evaluation for '{domain}'. Using neutral score. LLM Output: {llm_result_str[:200]}..."
-                    }
-
-            # If data was found (pre-assessed or TLD match)
-            overall_score = (data["reliability"] + data["expertise"] + data["bias"]) / 3
-            return {
-                "source_domain": domain,
-                "reliability_score": data["reliability"],
-                "expertise_score": data["expertise"],
-                "bias_score": data["bias"],
-                "overall_score": round(overall_score, 2),
-                "reasoning": f"Pre-assessed source or TLD with known reliability metrics."
-            }
+            domain, evaluation = self._cached_evaluation(content, self.extract_host(content))
+            if evaluation:
+                return evaluation
+            # For unknown sources, evaluate content
+            llm_result_str = self.evaluation_chain.invoke({"content": content})
+            return self._parse_llm_evaluation(domain, content, llm_result_str)
+        except Exception as e:
+            return self._error_evaluation(content, e)
 
+    async def aevaluate_source(self, content):
+        try:
+            domain, evaluation = self._cached_evaluation(content, self.extract_host(content))
+            if evaluation:
+                return evaluation
+            llm_result_str = await self.evaluation_chain.ainvoke({"content": content})
+            return self._parse_llm_evaluation(domain, content, llm_result_str)
         except Exception as e:
-            return {
-                "source_domain": self.extract_domain(content) or "error",
-                "reliability_score": 3, "expertise_score": 3, "bias_score": 3,
-                "overall_score": 3,
-                "reasoning": f"Error evaluating source: {str(e)}"
-            }
\ No newline at end of file
+            return self._error_evaluation(content, e)
+
+    def _plan_batch_evaluation(self, sources):
+        # Known domains are answered from the table; the rest are grouped by domain so each
+        # unknown domain is sent to the LLM once, with its first snippet as sample content.
+        evaluations = [None] * len(sources)
+        groups = {}
+        for i, source in enumerate(sources):
+            content = source.snippet if isinstance(source, EvidenceRecord) else source
+            try:
+                host, content = self._source_parts(source)
+                domain, evaluation = self._cached_evaluation(content, host)
+                if evaluation:
+                    evaluations[i] = evaluation
+                    continue
+                # Content without a domain can't be grouped by domain, only by identical content
+                group_key = domain if domain != "unknown" else f"unknown:{self._content_hash(content)}"
+                groups.setdefault(group_key, {"domain": domain, "content": content, "indices": []})["indices"].append(i)
+            except Exception as e:
+                evaluations[i] = self._error_evaluation(content, e)
+        return evaluations, list(groups.values())
+
+    def _batch_llm_input(self, groups):
+        sources = [
+            {"id": group_id, "domain": group["domain"], "content": group["content"][:self.BATCH_CONTENT_CHARS]}
+            for group_id, group in enumerate(groups)
+        ]
+        return {"sources": json.dumps(sources, indent=2)}
+
+    def _batch_item_group(self, item, groups):
+        # Index of the input group an LLM item answers, by its id or else by its domain; items
+        # that don't map back to exactly one input source are ignored (the group goes neutral)
+        try:
+            group_id = int(item["id"])
+            return group_id if 0 <= group_id < len(groups) else None
+        except (KeyError, TypeError, ValueError):
+            pass
+        domain = self._registrable_domain(str(item.get("source_domain") or "").lower().strip("."))
+        matches = [group_id for group_id, group in enumerate(groups) if domain != "unknown" and group["domain"] == domain]
+        return matches[0] if len(matches) == 1 else None
+
+    def _apply_batch_result(self, evaluations, groups, llm_result_str):
+        parsed_by_id = {}
+        try:
+            json_match = re.search(r'```(?:json)?\s*(.*?)\s*```', llm_result_str, re.DOTALL)
+            parsed = json.loads(json_match.group(1) if json_match else llm_result_str)
+            if isinstance(parsed, dict): # A single source may come back as a bare object
+                parsed = [parsed]
+            for item in parsed:
+                if isinstance(item, dict):
+                    group_id = self._batch_item_group(item, groups)
+                    if group_id is not None:
+                        parsed_by_id.setdefault(group_id, item)
+        except (json.JSONDecodeError, TypeError):
+            pass
+
+        for group_id, group in enumerate(groups):
+            item = parsed_by_id.get(group_id)
+            try:
+                if item:
+                    evaluation = self._learn_from_evaluation(group["domain"], dict(item))
+                    evaluation.pop("id", None)
+                    self._remember_content_evaluation(group["domain"], group["content"], evaluation)
+                else:
+                    evaluation = self._neutral_evaluation(group["domain"], llm_result_str)
+            except Exception as e:
+                evaluation = self._error_evaluation(group["content"], e)
+            for i in group["indices"]:
+                evaluations[i] = dict(evaluation)
+        return evaluations
+
+    def evaluate_sources(self, sources):
+        """Evaluates a list of EvidenceRecords (or raw snippet strings), one result per item."""
+        evaluations, groups = self._plan_batch_evaluation(sources)
+        if groups:
+            try:
+                llm_result_str = self.batch_evaluation_chain.invoke(self._batch_llm_input(groups))
+            except Exception as e:
+                for group in groups:
+                    for i in group["indices"]:
+                        evaluations[i] = self._error_evaluation(group["content"], e)
+                return evaluations
+            evaluations = self._apply_batch_result(evaluations, groups, llm_result_str)
+        return evaluations
+
+    async def aevaluate_sources(self, sources):
+        evaluations, groups = self._plan_batch_evaluation(sources)
+        if groups:
+            try:
+                llm_result_str = await self.batch_evaluation_chain.ainvoke(self._batch_llm_input(groups))
+            except Exception as e:
+                for group in groups:
+                    for i in group["indices"]:
+                        evaluations[i] = self._error_evaluation(group["content"], e)
+                return evaluations
+            evaluations = self._apply_batch_result(evaluations, groups, llm_result_str)
+        return evaluations
@@ -0,0 +1,81 @@
+import json
+
+class IncrementalJSONParser:
+    """Pulls top-level fields out of a JSON object while it is still being streamed.
+
+    feed() returns the fields whose values became complete with that chunk, so a
+    caller can show "verdict" and "confidence_score" long before the explanation
+    has finished. Text before the opening brace (e.g. a ```json fence) is ignored.
+    A string value that is still arriving is exposed as partial_key/partial_value.
+    """
+    _WHITESPACE = " \t\r\n"
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields = {}
+        self.partial_key = None
+        self.partial_value = ""
+        self.done = False
+        self._pos = None # Index just past the last consumed field (None until the "{" is seen)
+        self._decoder = json.JSONDecoder(strict=False) # LLMs sometimes emit raw newlines inside strings
+
+    def _skip(self, pos, chars):
+        while pos < len(self.buffer) and self.buffer[pos] in chars:
+            pos += 1
+        return pos
+
+    def _partial_string(self, start):
+        text = self.buffer[start + 1:]
+        if (len(text) - len(text.rstrip("\\"))) % 2: # Don't split an escape sequence
+            text = text[:-1]
+        try:
+            return json.loads(f'"{text}"', strict=False)
+        except ValueError:
+            pass
+        try:
+            # Half of a \uXXXX escape: leave it out until it completes, so partial values only grow
+            return json.loads(f'"{text[:text.rfind(chr(92) + "u")]}"', strict=False)
+        except ValueError:
+            return self.partial_value
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        completed = {}
+        if self._pos is None:
+            start = self.buffer.find("{")
+            if start < 0:
+                return completed
+            self._pos = start + 1
+        while not self.done:
+            pos = self._skip(self._pos, self._WHITESPACE + ",")
+            if pos >= len(self.buffer):
+                break
+            if self.buffer[pos] == "}":
+                self.done = True
+                break
+            try:
+                key, key_end = self._decoder.raw_decode(self.buffer, pos)
+            except ValueError:
+                break # Key still arriving
+            colon = self._skip(key_end, self._WHITESPACE)
+            if colon >= len(self.buffer) or self.buffer[colon] != ":":
+                break
+            value_start = self._skip(colon + 1, self._WHITESPACE)
+            if value_start >= len(self.buffer):
+                break
+            try:
+                value, value_end = self._decoder.raw_decode(self.buffer, value_start)
+            except ValueError:
+                if self.buffer[value_start] == '"':
+                    self.partial_key = key
+                    self.partial_value = self._partial_string(value_start)
+                break
+            # A number or literal at the very end of the buffer may still have more digits coming
+            if not isinstance(value, (str, list, dict)) and value_end >= len(self.buffer):
+                break
+            self.fields[key] = value
+            completed[key] = value
+            self.partial_key = None
+            self.partial_value = ""
+            self._pos = value_end
+        return completed
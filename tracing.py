@@ -0,0 +1,211 @@
+import contextvars
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 4 # Same estimate as evidence_compactor; used when the LLM reports no usage
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Span that LLM calls made on this thread / asyncio task are charged to (see record_llm_call)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN if text else 0
+
+def record_llm_call(prompt_text, response_text, cache_hit, usage=None):
+    """Adds one LLM call's token counts and cache outcome to the active span, if any."""
+    span = _current_span.get()
+    if span is None:
+        return
+    usage = usage or {}
+    span.llm_calls += 1
+    span.prompt_tokens += usage.get("input_tokens") or estimate_tokens(prompt_text)
+    span.response_tokens += usage.get("output_tokens") or estimate_tokens(response_text)
+    # A stage counts as a cache hit only if none of its LLM calls had to go to the API
+    span.cache_hit = cache_hit if span.cache_hit is None else (span.cache_hit and cache_hit)
+
+
+class Span:
+    __slots__ = ("name", "start", "duration", "attributes", "cache_hit", "error", "llm_calls", "prompt_tokens", "response_tokens")
+
+    def __init__(self, name, start, attributes):
+        self.name = name
+        self.start = start # Seconds since the trace started
+        self.duration = 0.0
+        self.attributes = attributes
+        self.cache_hit = None # True/False once the stage has consulted a cache
+        self.error = None
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration": round(self.duration, 6),
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "cache_hit": self.cache_hit,
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "response_tokens": self.response_tokens,
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """Timeline of the stages one claim went through.
+
+    Each `with trace.span(name):` block becomes a span with its duration, error
+    status, cache outcome and the tokens of the LLM calls made inside it. Spans may
+    be opened from worker threads (one per search). to_dict() is what ends up under
+    result["trace"].
+    """
+    def __init__(self, claim=""):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.claim = claim
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attributes):
+        span = Span(name, time.perf_counter() - self._start, attributes)
+        previous = _current_span.get()
+        _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - self._start - span.start
+            # set() rather than reset(token): a generator may be closed from another context
+            _current_span.set(previous)
+            with self._lock:
+                self.spans.append(span)
+
+    def record(self, name, **attributes):
+        """Adds a span covering the whole trace so far, for time spent outside span() (e.g. waiting on another thread)."""
+        span = Span(name, 0.0, attributes)
+        span.duration = time.perf_counter() - self._start
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        return {
+            "trace_id": self.trace_id,
+            "claim": self.claim,
+            "started_at": self.started_at,
+            "duration": round(time.perf_counter() - self._start, 6),
+            "spans": [span.to_dict() for span in spans],
+        }
+
+
+class TraceMetrics:
+    """Aggregates finished traces into per-stage counters and a duration histogram.
+
+    render_prometheus() returns the Prometheus text exposition format; serve() exposes
+    it at /metrics. With trace_log set, every trace is also appended to that file as
+    one JSON line.
+    """
+    def __init__(self, trace_log=None):
+        self.trace_log = trace_log
+        self.claims = 0
+        self.stages = {} # Stage name -> counters, bucket counts and duration sum
+        self._lock = threading.Lock()
+
+    def _stage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = {"count": 0, "errors": 0, "cache_hits": 0, "cache_misses": 0, "llm_calls": 0,
+                     "prompt_tokens": 0, "response_tokens": 0, "duration_sum": 0.0, "buckets": [0] * len(DURATION_BUCKETS)}
+            self.stages[name] = stage
+        return stage
+
+    def observe(self, trace):
+        """Records a trace dict (Trace.to_dict())."""
+        with self._lock:
+            self.claims += 1
+            for span in trace["spans"]:
+                stage = self._stage(span["name"])
+                stage["count"] += 1
+                stage["errors"] += span["status"] == "error"
+                if span["cache_hit"] is not None:
+                    stage["cache_hits" if span["cache_hit"] else "cache_misses"] += 1
+                stage["llm_calls"] += span["llm_calls"]
+                stage["prompt_tokens"] += span["prompt_tokens"]
+                stage["response_tokens"] += span["response_tokens"]
+                stage["duration_sum"] += span["duration"]
+                for i, bound in enumerate(DURATION_BUCKETS):
+                    if span["duration"] <= bound:
+                        stage["buckets"][i] += 1
+            if self.trace_log:
+                with open(self.trace_log, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(trace) + "\n")
+
+    def render_prometheus(self):
+        with self._lock:
+            stages = {name: dict(stage, buckets=list(stage["buckets"])) for name, stage in sorted(self.stages.items())}
+            claims = self.claims
+        lines = [
+            "# HELP factchecker_claims_total Claims traced since startup.",
+            "# TYPE factchecker_claims_total counter",
+            f"factchecker_claims_total {claims}",
+            "# HELP factchecker_stage_duration_seconds Time spent in each pipeline stage.",
+            "# TYPE factchecker_stage_duration_seconds histogram",
+        ]
+        for name, stage in stages.items():
+            for bound, count in zip(DURATION_BUCKETS, stage["buckets"]):
+                lines.append(f'factchecker_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'factchecker_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {stage["count"]}')
+            lines.append(f'factchecker_stage_duration_seconds_sum{{stage="{name}"}} {stage["duration_sum"]:.6f}')
+            lines.append(f'factchecker_stage_duration_seconds_count{{stage="{name}"}} {stage["count"]}')
+        counters = [
+            ("errors", "factchecker_stage_errors_total", "Stage executions that raised an error."),
+            ("cache_hits", "factchecker_stage_cache_hits_total", "Stage executions answered from a cache."),
+            ("cache_misses", "factchecker_stage_cache_misses_total", "Stage executions that missed every cache they consulted."),
+            ("llm_calls", "factchecker_stage_llm_calls_total", "LLM calls made by each stage, cached ones included."),
+        ]
+        for key, metric, description in counters:
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f'{metric}{{stage="{name}"}} {stage[key]}' for name, stage in stages.items())
+        lines.append("# HELP factchecker_stage_llm_tokens_total Prompt and response tokens per stage (estimated when the LLM reports no usage).")
+        lines.append("# TYPE factchecker_stage_llm_tokens_total counter")
+        for name, stage in stages.items():
+            lines.append(f'factchecker_stage_llm_tokens_total{{stage="{name}",kind="prompt"}} {stage["prompt_tokens"]}')
+            lines.append(f'factchecker_stage_llm_tokens_total{{stage="{name}",kind="response"}} {stage["response_tokens"]}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serves render_prometheus() at http://host:port/metrics from a daemon thread."""
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # Scrapes would otherwise flood the console
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"Serving Prometheus metrics at http://{host}:{port}/metrics")
+        return server
@@ -1,9 +1,14 @@
+import asyncio
 import json
 import re
 from langchain.prompts import PromptTemplate
 from langchain.schema.output_parser import StrOutputParser
 
+from evidence import render_evidence
+
 class EnhancedVerdictGenerator:
+    MAX_SOURCES_TO_EVALUATE = 5
+
     def __init__(self, llm, source_evaluator, knowledge_base):
         self.llm = llm
         self.source_evaluator = source_evaluator
@@ -50,47 +55,55 @@ class EnhancedVerdictGenerator:
         
         self.verdict_chain = self.verdict_prompt | self.llm | StrOutputParser()
     
-    def generate_verdict(self, claim, evidence_str):
-        source_evaluations = []
-        # Assuming evidence_str is a single string with "Query: ... Result: ..." blocks
-        # For source evaluation, we need to pass content that might contain a URL or source name
-        # A simple approach: evaluate based on the whole evidence string if individual sources aren't easily separable
-        # A better approach would be to parse evidence_str for distinct source snippets if possible.
-        
-        # For now, let's assume evidence_str might contain discernible source info or evaluate it as a whole
-        # If evidence_str is structured like: "Source: [URL/Name]\nContent: ...\n\nSource: ..."
-        # Then split and process. If not, evaluate the whole thing or skip fine-grained eval here.
-        # The current structure `evidence.append(f"Query: {query}\nResult: {search_result}\n")` makes it hard
-        # to isolate individual sources from DuckDuckGo results unless search_result itself is structured.
-        
-        # Let's try to extract domains from the evidence string if possible
-        temp_evidence_snippets = evidence_str.split("Query:")[1:] # Split by query
-        processed_snippets_for_eval = []
-        for snippet_block in temp_evidence_snippets:
-            # Try to get the result part for evaluation
-            if "Result:" in snippet_block:
-                result_part = snippet_block.split("Result:", 1)[1]
-                processed_snippets_for_eval.append(result_part.strip())
+    def select_sources_for_evaluation(self, evidence):
+        # Search errors carry no source to rate; the rest keep their real result URLs
+        return [record for record in evidence if not record.error and record.snippet][:self.MAX_SOURCES_TO_EVALUATE]
 
-        for snippet in processed_snippets_for_eval[:5]: # Evaluate up to 5 snippets
-            if snippet:
-                evaluation = self.source_evaluator.evaluate_source(snippet)
-                source_evaluations.append(evaluation)
-        
+    def _build_llm_input(self, claim, evidence, source_evaluations, knowledge_facts_list):
         source_reliability_summary = json.dumps(source_evaluations, indent=2)
-        
-        knowledge_facts_list = self.knowledge_base.query_knowledge_base(claim)
         knowledge_base_facts_str = "\n".join(knowledge_facts_list) if knowledge_facts_list else "No relevant facts found in knowledge base."
-
-        llm_input = {
+        return {
             "claim": claim,
-            "evidence": evidence_str,
+            "evidence": render_evidence(evidence), # Only the prompt needs the text form
             "knowledge_base_facts": knowledge_base_facts_str,
             "source_reliability": source_reliability_summary
         }
-        
+
+    def generate_verdict(self, claim, evidence, source_evaluations=None, knowledge_facts_list=None):
+        # Known domains come from the reliability table; unknown ones share a single LLM call.
+        # Callers that timed these steps separately pass their results in.
+        if source_evaluations is None:
+            source_evaluations = self.source_evaluator.evaluate_sources(self.select_sources_for_evaluation(evidence))
+        if knowledge_facts_list is None:
+            knowledge_facts_list = self.knowledge_base.query_knowledge_base(claim)
+
+        llm_input = self._build_llm_input(claim, evidence, source_evaluations, knowledge_facts_list)
         raw_verdict_output = self.verdict_chain.invoke(llm_input)
-        
+        return self.parse_verdict_output(raw_verdict_output)
+
+    def stream_verdict(self, claim, evidence, source_evaluations, knowledge_facts_list):
+        # Yields the raw verdict text as the LLM produces it; parse the joined text with parse_verdict_output
+        llm_input = self._build_llm_input(claim, evidence, source_evaluations, knowledge_facts_list)
+        yield from self.verdict_chain.stream(llm_input)
+
+    async def agenerate_verdict(self, claim, evidence, source_evaluations=None, knowledge_facts_list=None):
+        # Callers that already evaluated sources / queried the KB while searches were
+        # in flight pass the results in; anything missing is computed concurrently here.
+        pending = {}
+        if source_evaluations is None:
+            pending["sources"] = self.source_evaluator.aevaluate_sources(self.select_sources_for_evaluation(evidence))
+        if knowledge_facts_list is None:
+            pending["kb"] = self.knowledge_base.aquery_knowledge_base(claim)
+        if pending:
+            results = dict(zip(pending.keys(), await asyncio.gather(*pending.values())))
+            source_evaluations = list(results.get("sources", source_evaluations))
+            knowledge_facts_list = results.get("kb", knowledge_facts_list)
+
+        llm_input = self._build_llm_input(claim, evidence, source_evaluations, knowledge_facts_list)
+        raw_verdict_output = await self.verdict_chain.ainvoke(llm_input)
+        return self.parse_verdict_output(raw_verdict_output)
+
+    def parse_verdict_output(self, raw_verdict_output):
         try:
             # Try to extract JSON from the string if it's embedded in markdown
             json_match = re.search(r'```json\s*(.*?)\s*```', raw_verdict_output, re.DOTALL)